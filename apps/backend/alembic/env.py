@@ -13,7 +13,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.core.config import settings
 from app.database import Base
-from app.models import User, Listing, Offer, Escrow, VerificationRecord
+from app.models import User, Listing, Offer, Escrow, VerificationRecord, IndexerCursor, IndexerJournalEntry, ProcessedEvent, StoredContent
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -28,6 +28,14 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Postgres-only objects created by migrations but not mapped on the models
+UNMAPPED_OBJECTS = {("column", "search_vector"), ("index", "ix_listings_search_vector")}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping objects listed in UNMAPPED_OBJECTS."""
+    return not (reflected and compare_to is None and (type_, name) in UNMAPPED_OBJECTS)
+
 # Override sqlalchemy.url with environment variable
 config.set_main_option("sqlalchemy.url", str(settings.database_url))
 
@@ -48,6 +56,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -71,7 +80,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,32 @@
+"""add indexer cursors
+
+Revision ID: 6f7a8b9c0d1e
+Revises: f3e0d91517cf
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6f7a8b9c0d1e'
+down_revision: Union[str, None] = 'f3e0d91517cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'indexer_cursors',
+        sa.Column('chain_id', sa.Integer(), nullable=False),
+        sa.Column('contract_address', sa.String(length=42), nullable=False),
+        sa.Column('last_block', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('chain_id', 'contract_address')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('indexer_cursors')
@@ -0,0 +1,43 @@
+"""add indexer journal
+
+Revision ID: 7a8b9c0d1e2f
+Revises: 6f7a8b9c0d1e
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7a8b9c0d1e2f'
+down_revision: Union[str, None] = '6f7a8b9c0d1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('indexer_cursors', sa.Column('last_block_hash', sa.String(length=66), nullable=True))
+
+    op.create_table(
+        'indexer_journal',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('chain_id', sa.Integer(), nullable=False),
+        sa.Column('block_number', sa.BigInteger(), nullable=False),
+        sa.Column('block_hash', sa.String(length=66), nullable=False),
+        sa.Column('log_index', sa.Integer(), nullable=False),
+        sa.Column('tx_hash', sa.String(length=66), nullable=False),
+        sa.Column('event_name', sa.String(length=64), nullable=False),
+        sa.Column('undo', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('block_hash', 'log_index', name='uq_indexer_journal_block_hash_log_index')
+    )
+    op.create_index(op.f('ix_indexer_journal_block_number'), 'indexer_journal', ['block_number'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_indexer_journal_block_number'), table_name='indexer_journal')
+    op.drop_table('indexer_journal')
+    op.drop_column('indexer_cursors', 'last_block_hash')
@@ -0,0 +1,39 @@
+"""add indexer processed events
+
+Revision ID: 8b9c0d1e2f3a
+Revises: 7a8b9c0d1e2f
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8b9c0d1e2f3a'
+down_revision: Union[str, None] = '7a8b9c0d1e2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'indexer_processed_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('chain_id', sa.Integer(), nullable=False),
+        sa.Column('tx_hash', sa.String(length=66), nullable=False),
+        sa.Column('log_index', sa.Integer(), nullable=False),
+        sa.Column('block_number', sa.BigInteger(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('chain_id', 'tx_hash', 'log_index', name='uq_indexer_processed_events_tx_log')
+    )
+    op.create_index(
+        op.f('ix_indexer_processed_events_block_number'), 'indexer_processed_events', ['block_number'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_indexer_processed_events_block_number'), table_name='indexer_processed_events')
+    op.drop_table('indexer_processed_events')
@@ -0,0 +1,26 @@
+"""add listings keyset indexes
+
+Revision ID: ad1e2f3a4b5c
+Revises: 9c0d1e2f3a4b
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'ad1e2f3a4b5c'
+down_revision: Union[str, None] = '9c0d1e2f3a4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_listings_created_at_id', 'listings', ['created_at', 'id'], unique=False)
+    op.create_index('ix_listings_status_created_at_id', 'listings', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_status_created_at_id', table_name='listings')
+    op.drop_index('ix_listings_created_at_id', table_name='listings')
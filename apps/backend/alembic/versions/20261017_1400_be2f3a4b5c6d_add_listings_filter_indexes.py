@@ -0,0 +1,37 @@
+"""add listings filter indexes
+
+Revision ID: be2f3a4b5c6d
+Revises: ad1e2f3a4b5c
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'be2f3a4b5c6d'
+down_revision: Union[str, None] = 'ad1e2f3a4b5c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("status = 'active'")
+
+INDEXES = [
+    ('ix_listings_active_price_id', ['asking_price', 'id']),
+    ('ix_listings_active_mrr_id', ['mrr', 'id']),
+    ('ix_listings_active_annual_revenue_id', ['annual_revenue', 'id']),
+    ('ix_listings_active_type_created_at_id', ['asset_type', 'created_at', 'id']),
+    ('ix_listings_active_type_price_id', ['asset_type', 'asking_price', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, 'listings', columns, unique=False, postgresql_where=ACTIVE)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='listings')
@@ -0,0 +1,39 @@
+"""add listings search vector
+
+Revision ID: cf3a4b5c6d7e
+Revises: be2f3a4b5c6d
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf3a4b5c6d7e'
+down_revision: Union[str, None] = 'be2f3a4b5c6d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Asset name matches (A) rank above description matches (B)
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(asset_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        'listings',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True),
+    )
+    op.create_index(
+        'ix_listings_search_vector', 'listings', ['search_vector'], unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_search_vector', table_name='listings')
+    op.drop_column('listings', 'search_vector')
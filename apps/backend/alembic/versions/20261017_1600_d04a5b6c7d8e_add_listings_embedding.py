@@ -0,0 +1,33 @@
+"""add listings embedding
+
+Revision ID: d04a5b6c7d8e
+Revises: cf3a4b5c6d7e
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd04a5b6c7d8e'
+down_revision: Union[str, None] = 'cf3a4b5c6d7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match EMBEDDING_DIMENSIONS in app/models/listing.py
+DIMENSIONS = 768
+
+
+def upgrade() -> None:
+    # pgvector is enabled by the first migration (1a2b3c4d5e6f); HNSW needs pgvector >= 0.5
+    op.execute(f'ALTER TABLE listings ADD COLUMN embedding vector({DIMENSIONS})')
+    op.create_index(
+        'ix_listings_embedding', 'listings', ['embedding'], unique=False,
+        postgresql_using='hnsw', postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_embedding', table_name='listings')
+    op.drop_column('listings', 'embedding')
@@ -23,6 +23,9 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: str = "redis://localhost:6379"
+    listing_cache_enabled: bool = True  # cache GET /listings and listing details in Redis
+    listing_cache_ttl: int = 30  # seconds a cached listing response is fresh
+    listing_cache_stale_ttl: int = 300  # further seconds it is served while refreshed in the background
 
     @field_validator("database_url", mode="before")
     @classmethod
@@ -36,11 +39,28 @@ class Settings(BaseSettings):
     gemini_api_key: SecretStr
     coinbase_agentkit_key: Optional[str] = None
 
+    # Listing embeddings (similar listings, hybrid search)
+    listing_embeddings_enabled: bool = False  # embed listings with Gemini when created or edited
+    listing_embedding_model: str = "models/text-embedding-004"
+    listing_embedding_batch_size: int = 50  # listings per embedding request during backfill
+
     # IPFS/Lighthouse
     lighthouse_api_key: Optional[str] = None
+    lighthouse_node_url: str = "https://node.lighthouse.storage"
+    lighthouse_upload_timeout: float = 300.0  # seconds; uploads stream the whole file
+    lighthouse_max_concurrent_uploads: int = 4  # further uploads queue for a slot
     ipfs_gateway_url: str = "https://gateway.lighthouse.storage/ipfs/"
+    ipfs_fallback_gateways: str = ""  # comma-separated; raced against the primary when set
+    ipfs_hedge_delay: float = 0.5  # seconds before hedging to a gateway without latency history
+    ipfs_hedge_percentile: float = 0.9  # latency percentile after which the next gateway starts
     pinata_api_key: Optional[str] = None
     pinata_secret_key: Optional[str] = None
+    storage_cache_max_bytes: int = 128 * 1024 * 1024  # in-memory CID content cache budget
+    storage_cache_max_entry_bytes: int = 16 * 1024 * 1024  # larger files bypass the cache
+    storage_cache_ttl: Optional[int] = 3600  # seconds; None keeps entries until evicted
+    storage_disk_cache_dir: Optional[str] = None  # enables the shared on-disk CID cache
+    storage_disk_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    storage_verify_downloads: bool = False  # reject gateway content that doesn't hash to its CID
 
     # AgentKit & CDP
     cdp_api_key_name: Optional[str] = None
@@ -51,9 +71,34 @@ class Settings(BaseSettings):
     # Web3
     base_rpc_url: str = "https://mainnet.base.org"
     base_chain_id: int = 8453
+    base_ws_url: Optional[str] = None  # enables push-based log subscriptions in the indexer
     escrow_contract_address: Optional[str] = None
     marketplace_contract_address: Optional[str] = None
 
+    # Indexer
+    indexer_poll_interval: int = 15  # seconds between polls once caught up
+    indexer_deployment_block: Optional[int] = None  # first block to scan when no cursor exists
+    indexer_block_window: int = 500  # max blocks per eth_getLogs window
+    indexer_min_block_window: int = 1
+    indexer_confirmations: int = 0  # blocks to stay behind head
+    indexer_reorg_window: int = 64  # recent blocks whose events stay revertible
+    indexer_embedded: bool = True  # also run the indexer inside API workers
+    indexer_leader_retry_interval: int = 5  # seconds between standby lease attempts
+    indexer_ws_reconnect_interval: int = 5  # seconds before resubscribing after a dropped socket
+    indexer_backfill_workers: int = 4  # concurrent eth_getLogs calls during backfill
+    indexer_backfill_max_rps: float = 10  # RPC requests per second during backfill (0 = unlimited)
+    indexer_max_lag_blocks: int = 50  # /health/indexer reports lagging beyond this
+    indexer_health_rpc_timeout: float = 5  # seconds /health/indexer waits for the chain head
+    indexer_metrics_port: Optional[int] = None  # serve /metrics from the standalone worker
+
+    # Outbound HTTP (shared client pool)
+    http_client_http2: bool = True  # needs the h2 package; falls back to HTTP/1.1
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    http_max_connections_per_host: int = 20
+    http_timeout: float = 30.0
+
     # Passkeys (WebAuthn)
     rp_id: str = "localhost"
     rp_name: str = "Valyra"
@@ -84,6 +129,11 @@ class Settings(BaseSettings):
         """Parse CORS origins from comma-separated string."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
+    @property
+    def ipfs_fallback_gateways_list(self) -> List[str]:
+        """Parse fallback IPFS gateways from comma-separated string."""
+        return [gateway.strip() for gateway in self.ipfs_fallback_gateways.split(",") if gateway.strip()]
+
     @property
     def is_development(self) -> bool:
         """Check if running in development mode."""
@@ -0,0 +1,121 @@
+"""Shared pooled HTTP client for outbound requests.
+
+A single `httpx.AsyncClient` is reused for IPFS gateways, OAuth providers and
+other external APIs, so connections (and TLS sessions) are kept alive between
+requests instead of being re-established on every call. It is opened on
+application startup and closed on shutdown; code running outside the app
+(scripts, the standalone indexer) gets one lazily on first use.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees its per-host slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """Caps concurrent requests per origin on top of the pool-wide limits.
+
+    httpx only limits connections for the whole pool, so one slow gateway could
+    otherwise take every connection. A slot is held until the response body is
+    closed, which also covers streamed responses.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[Tuple[bytes, bytes, Optional[int]], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin = (request.url.raw_scheme, request.url.raw_host, request.url.port)
+        semaphore = self._semaphores.get(origin)
+        if semaphore is None:
+            semaphore = self._semaphores[origin] = asyncio.Semaphore(self._max_per_host)
+
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        if response.is_closed:
+            # Body was already read into memory, nothing is left to hold the slot for
+            semaphore.release()
+        else:
+            response.stream = _ReleasingStream(response.stream, semaphore.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build a pooled client configured from settings.
+
+    HTTP/2 is used when enabled and the optional `h2` package is installed;
+    otherwise the client falls back to HTTP/1.1 keep-alive.
+    """
+    http2 = settings.http_client_http2 and HTTP2_AVAILABLE
+    if settings.http_client_http2 and not HTTP2_AVAILABLE:
+        logger.warning("h2 not installed. Shared HTTP client will use HTTP/1.1.")
+
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    return httpx.AsyncClient(
+        transport=PerHostLimitTransport(transport, settings.http_max_connections_per_host),
+        timeout=settings.http_timeout,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it if it isn't open yet."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
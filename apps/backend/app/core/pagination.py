@@ -0,0 +1,34 @@
+"""Opaque cursor tokens for keyset pagination.
+
+A cursor holds the sort key of the last row on a page; the next page starts
+strictly after it. Tokens are URL-safe base64 of a JSON array, so clients
+treat them as opaque strings.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode a row's sort key values, which must be JSON-serializable."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a token from `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
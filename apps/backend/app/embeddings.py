@@ -0,0 +1,42 @@
+"""Listing embedding maintenance.
+
+``python -m app.embeddings backfill`` embeds every listing that has no
+embedding yet, for example after enabling ``LISTING_EMBEDDINGS_ENABLED`` on
+an existing database. It can be stopped and rerun; embedded listings are
+skipped. ``--force`` re-embeds everything, e.g. after changing
+``LISTING_EMBEDDING_MODEL``.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional, Sequence
+
+from app.core.config import settings
+from app.services.listing_embeddings import listing_embedder
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.embeddings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill", help="Embed listings that have no embedding")
+    backfill.add_argument("--batch-size", type=int, default=settings.listing_embedding_batch_size,
+                          help="Listings per embedding request")
+    backfill.add_argument("--force", action="store_true", help="Re-embed listings that already have one")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    try:
+        asyncio.run(listing_embedder.backfill(batch_size=args.batch_size, force=args.force))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Standalone on-chain indexer worker.
+
+Run with ``python -m app.indexer``. Any number of workers can be started;
+they elect a single leader through a Postgres advisory lock and the others
+stand by to take over if it stops. Set ``INDEXER_EMBEDDED=false`` on the API
+to keep uvicorn workers from joining the election.
+
+``python -m app.indexer backfill`` rebuilds indexed state from chain history,
+starting at ``--from-block`` (default ``INDEXER_DEPLOYMENT_BLOCK``) and
+resuming from stored cursors if it was interrupted.
+
+Set ``INDEXER_METRICS_PORT`` to expose Prometheus metrics at ``/metrics``.
+"""
+import argparse
+import asyncio
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.indexer import indexer
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int) -> ThreadingHTTPServer:
+    """Serve the metrics registry from a daemon thread."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.indexer")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="Follow the chain as leader or standby (default)")
+
+    backfill = commands.add_parser("backfill", help="Replay historical events up to head")
+    backfill.add_argument("--from-block", type=int, default=settings.indexer_deployment_block,
+                          help="First block for contracts without a cursor")
+    backfill.add_argument("--to-block", type=int, default=None, help="Stop at this block instead of head")
+    backfill.add_argument("--workers", type=int, default=settings.indexer_backfill_workers,
+                          help="Concurrent eth_getLogs requests")
+    backfill.add_argument("--max-rps", type=float, default=settings.indexer_backfill_max_rps,
+                          help="RPC requests per second, 0 for unlimited")
+
+    args = parser.parse_args(argv)
+    if args.command == "backfill" and args.from_block is None:
+        parser.error("backfill needs --from-block or INDEXER_DEPLOYMENT_BLOCK")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the indexer until interrupted, or backfill history and exit."""
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    if settings.indexer_metrics_port:
+        serve_metrics(settings.indexer_metrics_port)
+
+    if args.command == "backfill":
+        job = indexer.backfill(
+            from_block=args.from_block,
+            to_block=args.to_block,
+            workers=args.workers,
+            max_rps=args.max_rps,
+        )
+    else:
+        job = indexer.start()
+
+    try:
+        asyncio.run(job)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
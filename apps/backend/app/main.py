@@ -2,6 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.routes import health_router, auth, listings_router, users_router, upload, agent_router, valuation_router, verification_router, disputes_router
 
 from app import __version__
@@ -32,11 +33,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
 import asyncio
+from app.core.http import get_http_client, close_http_client
 from app.services.indexer import indexer
+from app.services.listing_cache import listing_cache
 
 # Startup event
 @app.on_event("startup")
@@ -46,8 +50,12 @@ async def startup_event():
     print(f"📊 Environment: {settings.environment}")
     print(f"🔗 Database: {str(settings.database_url).split('@')[1] if '@' in str(settings.database_url) else 'configured'}")
     
-    # Start Indexer
-    asyncio.create_task(indexer.start())
+    # Open the shared outbound HTTP pool
+    get_http_client()
+
+    # Start Indexer (leader election keeps a single active instance across workers)
+    if settings.indexer_embedded:
+        asyncio.create_task(indexer.start())
 
 
 # Shutdown event
@@ -55,6 +63,8 @@ async def startup_event():
 async def shutdown_event():
     """Execute on application shutdown."""
     print("👋 Valyra Backend API shutting down...")
+    await close_http_client()
+    await listing_cache.close()
 
 
 # Register routers
@@ -4,5 +4,7 @@ from app.models.listing import Listing
 from app.models.offer import Offer
 from app.models.escrow import Escrow
 from app.models.verification import VerificationRecord
+from app.models.indexer import IndexerCursor, IndexerJournalEntry, ProcessedEvent
+from app.models.storage import StoredContent
 
-__all__ = ["User", "Listing", "Offer", "Escrow", "VerificationRecord"]
+__all__ = ["User", "Listing", "Offer", "Escrow", "VerificationRecord", "IndexerCursor", "IndexerJournalEntry", "ProcessedEvent", "StoredContent"]
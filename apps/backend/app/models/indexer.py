@@ -0,0 +1,70 @@
+"""Indexer state models."""
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON, UniqueConstraint
+from app.database import Base
+
+
+class IndexerCursor(Base):
+    """Last fully processed block for a watched contract."""
+
+    __tablename__ = "indexer_cursors"
+
+    chain_id = Column(Integer, primary_key=True)
+    contract_address = Column(String(42), primary_key=True)
+    last_block = Column(BigInteger, nullable=False)
+    # Hash of last_block when it was indexed, used to detect reorgs
+    last_block_hash = Column(String(66), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<IndexerCursor {self.contract_address} @ {self.last_block}>"
+
+
+class IndexerJournalEntry(Base):
+    """Undo record for an event applied within the reorg window.
+
+    `undo` is an ordered list of row operations that revert the event's
+    database changes; entries older than the reorg window are pruned.
+    """
+
+    __tablename__ = "indexer_journal"
+    __table_args__ = (
+        UniqueConstraint("block_hash", "log_index", name="uq_indexer_journal_block_hash_log_index"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chain_id = Column(Integer, nullable=False)
+    block_number = Column(BigInteger, nullable=False, index=True)
+    block_hash = Column(String(66), nullable=False)
+    log_index = Column(Integer, nullable=False)
+    tx_hash = Column(String(66), nullable=False)
+    event_name = Column(String(64), nullable=False)
+    undo = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<IndexerJournalEntry {self.event_name} @ {self.block_number}:{self.log_index}>"
+
+
+class ProcessedEvent(Base):
+    """Marker for an on-chain log that has already been applied.
+
+    The unique key makes ingestion idempotent: re-delivered logs (lookback
+    rescans, overlapping windows, retries) hit the constraint instead of
+    running their handler again.
+    """
+
+    __tablename__ = "indexer_processed_events"
+    __table_args__ = (
+        UniqueConstraint("chain_id", "tx_hash", "log_index", name="uq_indexer_processed_events_tx_log"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chain_id = Column(Integer, nullable=False)
+    tx_hash = Column(String(66), nullable=False)
+    log_index = Column(Integer, nullable=False)
+    block_number = Column(BigInteger, nullable=False, index=True)
+    processed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ProcessedEvent {self.tx_hash}:{self.log_index}>"
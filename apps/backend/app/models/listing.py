@@ -3,10 +3,14 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, Text, Numeric, DateTime, Enum, ForeignKey, JSON, Boolean, Integer
+from sqlalchemy import Column, String, Text, Numeric, DateTime, Enum, ForeignKey, JSON, Boolean, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
+from app.models.types import Vector
+
+# Size of the Gemini text embeddings stored in Listing.embedding
+EMBEDDING_DIMENSIONS = 768
 
 
 class AssetType(PyEnum):
@@ -40,10 +44,32 @@ class ListingStatus(PyEnum):
     PAUSED = "paused"
 
 
+_ACTIVE = text("status = 'active'")
+
+
 class Listing(Base):
     """Listing model representing digital assets for sale."""
     
     __tablename__ = "listings"
+    __table_args__ = (
+        # Keyset pagination on GET /listings, newest first, with and without a status filter
+        Index("ix_listings_created_at_id", "created_at", "id"),
+        Index("ix_listings_status_created_at_id", "status", "created_at", "id"),
+        # Buyer-facing queries browse active listings: one ordered index per sort,
+        # plus asset_type prefixes for the most common filter
+        Index("ix_listings_active_price_id", "asking_price", "id", postgresql_where=_ACTIVE),
+        Index("ix_listings_active_mrr_id", "mrr", "id", postgresql_where=_ACTIVE),
+        Index("ix_listings_active_annual_revenue_id", "annual_revenue", "id", postgresql_where=_ACTIVE),
+        Index("ix_listings_active_type_created_at_id", "asset_type", "created_at", "id", postgresql_where=_ACTIVE),
+        Index("ix_listings_active_type_price_id", "asset_type", "asking_price", "id", postgresql_where=_ACTIVE),
+        # GET /listings/search uses a generated `search_vector` tsvector column with a
+        # GIN index. Both are Postgres-only and created by migration cf3a4b5c6d7e.
+        # Approximate nearest-neighbour search for similar listings and hybrid search
+        Index(
+            "ix_listings_embedding", "embedding",
+            postgresql_using="hnsw", postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
@@ -87,6 +113,9 @@ class Listing(Base):
     # Status
     status = Column(Enum(ListingStatus, values_callable=lambda x: [e.value for e in x]), default=ListingStatus.DRAFT, nullable=False)
     
+    # Semantic search; filled in the background from name, description and tech stack
+    embedding = deferred(Column(Vector(EMBEDDING_DIMENSIONS), nullable=True))
+
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,24 @@
+"""Storage models."""
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime
+from app.database import Base
+
+
+class StoredContent(Base):
+    """Content already pinned on Lighthouse, keyed by its locally computed CID.
+
+    Uploads look their CID up here first so identical files are only sent once.
+    `pinned_cid` is the CID Lighthouse returned, which differs from `cid` if
+    it chunked the file differently; that is the CID the content is served under.
+    """
+
+    __tablename__ = "stored_contents"
+
+    cid = Column(String(128), primary_key=True)
+    pinned_cid = Column(String(128), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StoredContent {self.cid}>"
@@ -0,0 +1,36 @@
+"""Custom column types."""
+from typing import List, Optional
+
+from sqlalchemy.types import UserDefinedType
+
+
+class Vector(UserDefinedType):
+    """pgvector ``vector(n)`` column holding a list of floats.
+
+    Values are sent and read in pgvector's text form (``[1,2,3]``), so the
+    pgvector Python package isn't needed. Other databases (SQLite in tests)
+    store the same text.
+    """
+
+    cache_ok = True
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def get_col_spec(self, **kw) -> str:
+        return f"vector({self.dimensions})"
+
+    def bind_processor(self, dialect):
+        def process(value: Optional[List[float]]) -> Optional[str]:
+            if value is None:
+                return None
+            return "[" + ",".join(repr(float(v)) for v in value) + "]"
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value: Optional[str]) -> Optional[List[float]]:
+            if value is None:
+                return None
+            body = value.strip("[]")
+            return [float(v) for v in body.split(",")] if body else []
+        return process
@@ -1,9 +1,15 @@
 """Health check endpoints."""
+import asyncio
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from app.core.config import settings
+from app.core.metrics import registry
 from app.database import get_db
+from app.models.indexer import IndexerCursor
+from app.services.indexer import indexer
 from app import __version__
 
 router = APIRouter(tags=["health"])
@@ -38,3 +44,54 @@ async def health_check_db(db: Session = Depends(get_db)):
             status_code=503,
             detail=f"Database connection failed: {str(e)}"
         )
+
+
+@router.get("/health/indexer")
+async def health_check_indexer(db: Session = Depends(get_db)):
+    """Indexer health: cursor position and lag behind the chain head.
+
+    Returns 503 when the RPC node is unreachable, nothing has been indexed yet,
+    or the slowest contract is more than `indexer_max_lag_blocks` behind.
+    """
+    if not indexer.escrow_contract and not indexer.marketplace_contract:
+        return {"status": "disabled", "timestamp": datetime.utcnow().isoformat()}
+
+    try:
+        head = await asyncio.wait_for(
+            indexer.call_rpc("eth_blockNumber", indexer.w3.eth.block_number),
+            timeout=settings.indexer_health_rpc_timeout
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"RPC node unavailable: {str(e) or type(e).__name__}"
+        )
+
+    cursors = db.query(IndexerCursor).filter(IndexerCursor.chain_id == settings.base_chain_id).all()
+    contracts = {
+        cursor.contract_address: {
+            "last_block": cursor.last_block,
+            "blocks_behind": max(0, head - cursor.last_block),
+            "updated_at": cursor.updated_at.isoformat() if cursor.updated_at else None,
+        }
+        for cursor in cursors
+    }
+    lag = max((c["blocks_behind"] for c in contracts.values()), default=None)
+    # Staying `indexer_confirmations` behind head is intentional, not lag
+    healthy = lag is not None and lag <= settings.indexer_max_lag_blocks + settings.indexer_confirmations
+
+    body = {
+        "status": "healthy" if healthy else "lagging",
+        "chain_id": settings.base_chain_id,
+        "head_block": head,
+        "blocks_behind": lag,
+        "contracts": contracts,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    return JSONResponse(status_code=200 if healthy else 503, content=body)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this process."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,22 +1,38 @@
+import logging
+from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session, undefer
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.database import get_db
-from app.models.listing import Listing, ListingStatus
+from app.models.listing import AssetType, Listing, ListingStatus, RevenueTrend
 from app.models.user import User
-from app.schemas.listing import ListingCreate, ListingUpdate, ListingResponse
+from app.schemas.listing import (
+    ListingCreate, ListingFilters, ListingSearchResult, ListingSort, ListingUpdate, ListingResponse,
+    SimilarListing,
+)
+from app.services.listing_cache import CachedResponse, listing_cache
+from app.services.listing_embeddings import EMBEDDED_FIELDS, listing_embedder
+from app.services.listing_query import apply_filters, nearest, paginate, search
 from app.dependencies import get_current_user
 from fastapi.encoders import jsonable_encoder
 from app.websockets import manager
 from app.core.rate_limiter import limiter
 from fastapi import Request
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
+_LISTINGS = TypeAdapter(List[ListingResponse])
+
 @router.post("/", response_model=ListingResponse, status_code=status.HTTP_201_CREATED)
 async def create_listing(
     listing_data: ListingCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -30,6 +46,10 @@ async def create_listing(
     db.add(new_listing)
     db.commit()
     db.refresh(new_listing)
+
+    await listing_cache.invalidate()
+    if listing_embedder.is_enabled():
+        background_tasks.add_task(listing_embedder.refresh, new_listing.id)
     
     # Broadcast new listing
     listing_data = jsonable_encoder(new_listing)
@@ -41,31 +61,201 @@ async def create_listing(
     return new_listing
 
 
+def listing_filters(
+    status: Optional[ListingStatus] = None,
+    asset_type: Optional[List[AssetType]] = Query(None, description="Repeat to match any of several types"),
+    revenue_trend: Optional[List[RevenueTrend]] = Query(None, description="Repeat to match any of several trends"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    min_mrr: Optional[Decimal] = Query(None, ge=0),
+    max_mrr: Optional[Decimal] = Query(None, ge=0),
+    min_annual_revenue: Optional[Decimal] = Query(None, ge=0),
+    max_annual_revenue: Optional[Decimal] = Query(None, ge=0),
+    domain_included: Optional[bool] = None,
+    source_code_included: Optional[bool] = None,
+    customer_data_included: Optional[bool] = None,
+) -> ListingFilters:
+    """Collect listing filters from query parameters."""
+    try:
+        return ListingFilters(
+            status=status,
+            asset_type=asset_type,
+            revenue_trend=revenue_trend,
+            min_price=min_price,
+            max_price=max_price,
+            min_mrr=min_mrr,
+            max_mrr=max_mrr,
+            min_annual_revenue=min_annual_revenue,
+            max_annual_revenue=max_annual_revenue,
+            domain_included=domain_included,
+            source_code_included=source_code_included,
+            customer_data_included=customer_data_included,
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_context=False))
+
+
 @router.get("/", response_model=List[ListingResponse])
 @limiter.limit("100/minute")
 async def get_listings(
     request: Request,
-    skip: int = Query(0, ge=0),
+    sort: ListingSort = ListingSort.NEWEST,
+    cursor: Optional[str] = Query(None, description="Token from the previous page's X-Next-Cursor header"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
-    status: Optional[ListingStatus] = None,
+    filters: ListingFilters = Depends(listing_filters),
     db: Session = Depends(get_db)
 ):
     """
-    Get a list of listings with optional filtering.
+    Get a list of listings with optional filtering and sorting.
+
+    Ranges apply to price, MRR and annual revenue; `asset_type` and
+    `revenue_trend` may be repeated to match any of several values. Pages are
+    keyed on the sort column and id: pass the X-Next-Cursor header of one page
+    as `cursor` to get the next, which costs the same however deep it is. The
+    header is absent on the last page. `skip` still works but scans every
+    skipped row.
+
+    Pages are served from the listing cache and invalidated by any listing change.
     """
-    query = db.query(Listing)
-    
-    if status:
-        query = query.filter(Listing.status == status)
-        
-    listings = query.offset(skip).limit(limit).all()
-    return listings
+    def build(db: Session) -> CachedResponse:
+        query = apply_filters(db.query(Listing), filters)
+
+        if skip and not cursor:
+            query = query.offset(skip)
+
+        try:
+            listings, next_cursor = paginate(query, sort, limit, cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return CachedResponse(_LISTINGS.dump_json(_LISTINGS.validate_python(listings, from_attributes=True)), headers)
+
+    params = {
+        "sort": sort.value,
+        "cursor": cursor,
+        "skip": skip,
+        "limit": limit,
+        **filters.model_dump(mode="json", exclude_none=True),
+    }
+    cached = await listing_cache.get_list(params, build, db)
+    return cached.to_response()
+
+
+@router.get("/search", response_model=List[ListingSearchResult])
+@limiter.limit("100/minute")
+async def search_listings(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match in asset name and description"),
+    hybrid: bool = Query(False, description="Also match listings by meaning (needs listing embeddings enabled)"),
+    limit: int = Query(20, ge=1, le=100),
+    filters: ListingFilters = Depends(listing_filters),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over listing names and descriptions.
+
+    Every word must match, and the last letters of a word may be left out
+    ("analy" finds "analytics"). Results are ordered by relevance, with name
+    matches ranked above description matches, and accept the same filters as
+    GET /listings. `highlights` holds the asset name and a description excerpt
+    with matched words wrapped in <mark> tags.
+
+    With `hybrid=true`, listings whose embedding is close to the query's are
+    merged into the keyword results, so related listings are found even
+    without shared words. Those have no highlights. When embeddings are
+    disabled or the embedding request fails, the search is keyword-only.
+    """
+    embedding = None
+    if hybrid and listing_embedder.is_enabled():
+        try:
+            embedding = await listing_embedder.embed_query(q)
+        except Exception as e:
+            logger.warning(f"Hybrid search fell back to keywords: {e}")
+
+    hits = search(db, q, filters, limit, embedding=embedding)
+    return [
+        ListingSearchResult(
+            listing=ListingResponse.model_validate(hit.listing, from_attributes=True),
+            rank=hit.rank,
+            highlights=hit.highlights,
+        )
+        for hit in hits
+    ]
+
+
+@router.get("/{listing_id}", response_model=ListingResponse)
+@limiter.limit("100/minute")
+async def get_listing(
+    request: Request,
+    listing_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a single listing. Served from the listing cache.
+    """
+    def build(db: Session) -> CachedResponse:
+        listing = db.query(Listing).filter(Listing.id == listing_id).first()
+        if not listing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Listing not found"
+            )
+        return CachedResponse(ListingResponse.model_validate(listing, from_attributes=True).model_dump_json().encode())
+
+    cached = await listing_cache.get_detail(listing_id, build, db)
+    return cached.to_response()
+
+
+@router.get("/{listing_id}/similar", response_model=List[SimilarListing])
+@limiter.limit("100/minute")
+async def get_similar_listings(
+    request: Request,
+    listing_id: UUID,
+    limit: int = Query(10, ge=1, le=50),
+    filters: ListingFilters = Depends(listing_filters),
+    db: Session = Depends(get_db)
+):
+    """
+    Listings most similar to this one by name, description and tech stack.
+
+    Useful for finding comparable deals; combine with `status=sold` for
+    past sales. Accepts the same filters as GET /listings. Empty until the
+    listing has been embedded.
+    """
+    listing = (
+        db.query(Listing)
+        .options(undefer(Listing.embedding))
+        .filter(Listing.id == listing_id)
+        .first()
+    )
+    if not listing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Listing not found"
+        )
+    if listing.embedding is None:
+        return []
+
+    matches = nearest(db, listing.embedding, filters, limit, exclude_id=listing.id)
+    return [
+        SimilarListing(
+            listing=ListingResponse.model_validate(match, from_attributes=True),
+            similarity=similarity,
+        )
+        for match, similarity in matches
+    ]
 
 
 @router.put("/{listing_id}", response_model=ListingResponse)
 async def update_listing(
     listing_id: UUID,
     listing_update: ListingUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -94,6 +284,10 @@ async def update_listing(
     db.commit()
     db.refresh(listing)
 
+    await listing_cache.invalidate([listing.id])
+    if listing_embedder.is_enabled() and any(field in update_data for field in EMBEDDED_FIELDS):
+        background_tasks.add_task(listing_embedder.refresh, listing.id)
+
     # Broadcast listing update
     listing_data = jsonable_encoder(listing)
     await manager.broadcast({
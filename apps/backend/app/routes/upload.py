@@ -1,13 +1,22 @@
 """File upload router for handling uploads to IPFS via Lighthouse."""
-from typing import Dict, Any
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from app.services.storage_service import storage_service
+import httpx
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from app.services.cid import CidBuilder, is_cid
+from app.services.storage_service import RangeNotSatisfiable, storage_service
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 # Constants
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_BATCH_FILES = 20
+BATCH_UPLOAD_CONCURRENCY = 4
 ALLOWED_CONTENT_TYPES = [
     "image/jpeg",
     "image/png",
@@ -17,6 +26,71 @@ ALLOWED_CONTENT_TYPES = [
 ]
 
 
+@dataclass
+class CheckedUpload:
+    """An upload that passed validation, with what was learned reading it."""
+
+    file: UploadFile
+    size: int
+    sha256: str
+    cid: str
+
+
+async def check_upload(file: UploadFile) -> CheckedUpload:
+    """Validate an upload's type and size, hashing it on the way.
+
+    The file is read in chunks so an oversized one is rejected as soon as it
+    crosses the limit without ever being held whole, then rewound so it can be
+    streamed to Lighthouse.
+
+    Raises:
+        HTTPException: 400 for a disallowed type, 413 for a file over the limit
+    """
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_CONTENT_TYPES)}",
+        )
+
+    digest = hashlib.sha256()
+    cid = CidBuilder()
+    file_size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        file_size += len(chunk)
+        if file_size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB",
+            )
+        digest.update(chunk)
+        cid.update(chunk)
+
+    await file.seek(0)
+    return CheckedUpload(file=file, size=file_size, sha256=digest.hexdigest(), cid=cid.cid())
+
+
+async def store_upload(upload: CheckedUpload) -> Dict[str, Any]:
+    """Upload a checked file through StorageService and format the result."""
+    result = await storage_service.upload_stream(
+        upload.file.file,
+        filename=upload.file.filename or "upload",
+        content_type=upload.file.content_type or "application/octet-stream",
+        size=upload.size,
+        cid=upload.cid,
+    )
+
+    # Ensure return format matches expected schema
+    return {
+        "cid": f"ipfs://{result['cid']}" if not result['cid'].startswith("ipfs://") else result['cid'],
+        "url": result['url'],
+        "filename": result['filename'],
+        "size": result['size'],
+        "content_type": result['content_type'],
+        "sha256": upload.sha256,
+        "deduplicated": result['deduplicated'],
+    }
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = File(...)
@@ -27,44 +101,10 @@ async def upload_file(
     Validates file type and size before uploading.
     Returns the IPFS CID and a gateway URL.
     """
-    # 1. Validate Content Type
-    if file.content_type not in ALLOWED_CONTENT_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_CONTENT_TYPES)}",
-        )
+    upload = await check_upload(file)
 
-    # 2. Validate File Size
-    # Read file content to check size
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB",
-        )
-        
-    # Reset file cursor for uploading if needed, though we have content in memory now
-    await file.seek(0)
-    
-    # 3. Upload to Lighthouse via StorageService
     try:
-        result = await storage_service.upload(
-            file_bytes=content,
-            filename=file.filename or "upload",
-            content_type=file.content_type or "application/octet-stream"
-        )
-        
-        # Ensure return format matches expected schema
-        return {
-            "cid": f"ipfs://{result['cid']}" if not result['cid'].startswith("ipfs://") else result['cid'],
-            "url": result['url'],
-            "filename": result['filename'],
-            "size": result['size'],
-            "content_type": result['content_type'],
-        }
-            
+        return await store_upload(upload)
     except RuntimeError as e:
         # Catch configuration or upload errors from StorageService
         raise HTTPException(
@@ -76,3 +116,112 @@ async def upload_file(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal upload error: {str(e)}",
         )
+
+
+@router.post("/batch", status_code=status.HTTP_201_CREATED)
+async def upload_batch(
+    response: Response,
+    files: List[UploadFile] = File(...),
+) -> Dict[str, Any]:
+    """
+    Upload several files to IPFS via Lighthouse at once.
+
+    Every file is validated before any is uploaded, so one bad file rejects
+    the whole batch. Uploads then run concurrently, and each file gets its
+    own result. Responds 201 when all succeeded and 207 when some failed.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per batch",
+        )
+
+    uploads = []
+    for file in files:
+        try:
+            uploads.append(await check_upload(file))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"{file.filename}: {e.detail}")
+
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+
+    async def store(upload: CheckedUpload) -> Dict[str, Any]:
+        async with semaphore:
+            return await store_upload(upload)
+
+    # Identical files in one batch are uploaded once
+    tasks: Dict[str, asyncio.Future] = {}
+    for upload in uploads:
+        if upload.cid not in tasks:
+            tasks[upload.cid] = asyncio.ensure_future(store(upload))
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results = []
+    for upload in uploads:
+        task = tasks[upload.cid]
+        if task.exception() is not None:
+            results.append({
+                "filename": upload.file.filename,
+                "status": "failed",
+                "error": str(task.exception()),
+            })
+        else:
+            results.append({
+                **task.result(),
+                "filename": upload.file.filename,
+                "status": "uploaded",
+            })
+
+    failed = sum(1 for result in results if result["status"] == "failed")
+    if failed:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return {"uploaded": len(results) - failed, "failed": failed, "results": results}
+
+
+@router.get("/{cid}")
+async def download_file(
+    cid: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+) -> StreamingResponse:
+    """
+    Stream a file from IPFS by CID.
+
+    Bytes are relayed as they arrive from the gateway (or from cache) instead
+    of being buffered first. Single byte ranges are supported via the Range header.
+    Only a bare CIDv0 or base32 CIDv1 is accepted (without the ``ipfs://``
+    prefix), so the value can't address anything else on the gateway.
+    """
+    if not is_cid(cid):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid CID",
+        )
+
+    try:
+        stream = await storage_service.open_stream(cid, range_header)
+    except RangeNotSatisfiable as e:
+        headers = {"Content-Range": f"bytes */{e.size}"} if e.size is not None else None
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers=headers,
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == status.HTTP_404_NOT_FOUND:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"IPFS gateway error: {e.response.status_code}",
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"IPFS gateway unavailable: {str(e)}",
+        )
+
+    return StreamingResponse(
+        stream.body,
+        status_code=stream.status_code,
+        media_type=stream.media_type,
+        headers=stream.headers,
+    )
@@ -1,8 +1,9 @@
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from datetime import datetime
+from enum import Enum
 from uuid import UUID
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 from app.models.listing import AssetType, RevenueTrend, ListingStatus, VerificationStatus
 
 class ListingBase(BaseModel):
@@ -76,3 +77,50 @@ class ListingResponse(ListingBase):
 
     class Config:
         orm_mode = True
+
+
+class ListingSearchResult(BaseModel):
+    """A listing returned by GET /listings/search."""
+    listing: ListingResponse
+    rank: float
+    # HTML-escaped text with matched words wrapped in <mark> tags
+    highlights: Dict[str, str]
+
+
+class SimilarListing(BaseModel):
+    """A listing returned by GET /listings/{id}/similar."""
+    listing: ListingResponse
+    similarity: float  # cosine similarity of the embeddings, 1 is identical
+
+
+class ListingSort(str, Enum):
+    """Orderings offered by GET /listings."""
+    NEWEST = "newest"
+    PRICE_ASC = "price_asc"
+    PRICE_DESC = "price_desc"
+    MRR_DESC = "mrr_desc"
+    REVENUE_DESC = "revenue_desc"
+
+
+class ListingFilters(BaseModel):
+    """Filters for GET /listings. Unset fields don't filter."""
+    status: Optional[ListingStatus] = None
+    asset_type: Optional[List[AssetType]] = None
+    revenue_trend: Optional[List[RevenueTrend]] = None
+    min_price: Optional[Decimal] = Field(None, ge=0)
+    max_price: Optional[Decimal] = Field(None, ge=0)
+    min_mrr: Optional[Decimal] = Field(None, ge=0)
+    max_mrr: Optional[Decimal] = Field(None, ge=0)
+    min_annual_revenue: Optional[Decimal] = Field(None, ge=0)
+    max_annual_revenue: Optional[Decimal] = Field(None, ge=0)
+    domain_included: Optional[bool] = None
+    source_code_included: Optional[bool] = None
+    customer_data_included: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_ranges(self) -> "ListingFilters":
+        for name in ("price", "mrr", "annual_revenue"):
+            low, high = getattr(self, f"min_{name}"), getattr(self, f"max_{name}")
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"min_{name} cannot exceed max_{name}")
+        return self
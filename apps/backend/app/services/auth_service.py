@@ -2,6 +2,7 @@
 import httpx
 from typing import Optional, Dict, Any
 from app.core.config import settings
+from app.core.http import get_http_client
 
 
 
@@ -9,6 +10,20 @@ from app.core.config import settings
 class GoogleAuthService:
     """Service for Google OAuth flow."""
 
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """Initialize the service.
+
+        Args:
+            http_client: HTTP client to send requests with. If None, uses the shared pool.
+        """
+        # httpx's default, kept from before the shared pool (whose default is http_timeout)
+        self.timeout = 5.0  # seconds
+        self._http_client = http_client
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
     @staticmethod
     def get_auth_url(state: str) -> str:
         """Generate Google OAuth URL."""
@@ -27,37 +42,35 @@ class GoogleAuthService:
         query_string = "&".join([f"{k}={v}" for k, v in params.items()])
         return f"https://accounts.google.com/o/oauth2/v2/auth?{query_string}"
 
-    @staticmethod
-    async def exchange_code(code: str) -> str:
+    async def exchange_code(self, code: str) -> str:
         """Exchange code for access token."""
         if not settings.google_client_secret:
              raise ValueError("Google Client Secret not configured")
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "client_id": settings.google_client_id,
-                    "client_secret": settings.google_client_secret.get_secret_value(),
-                    "code": code,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": settings.google_redirect_uri
-                }
-            )
-            response.raise_for_status()
-            return response.json().get("access_token")
+        response = await self.http.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "client_id": settings.google_client_id,
+                "client_secret": settings.google_client_secret.get_secret_value(),
+                "code": code,
+                "grant_type": "authorization_code",
+                "redirect_uri": settings.google_redirect_uri
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("access_token")
 
-    @staticmethod
-    async def get_user_info(access_token: str) -> str:
+    async def get_user_info(self, access_token: str) -> str:
         """Get Google User ID using access token."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            response.raise_for_status()
-            user_info = response.json()
-            return user_info.get("id")
+        response = await self.http.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        user_info = response.json()
+        return user_info.get("id")
 
 # Global instances
 google_auth = GoogleAuthService()
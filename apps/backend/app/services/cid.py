@@ -0,0 +1,201 @@
+"""Local IPFS CID computation for UnixFS files.
+
+Builds the same DAG that Lighthouse (and kubo with default settings) produce
+when a file is added: 256 KiB fixed-size chunks wrapped in dag-pb UnixFS leaf
+nodes, combined in a balanced tree of at most 174 links per node, addressed
+by a CIDv0 (base58btc sha2-256 multihash). Only the block hashes are kept,
+so computing the CID of a large file needs a single chunk of memory.
+"""
+
+import base64
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+CHUNK_SIZE = 256 * 1024
+MAX_LINKS = 174
+
+_SHA2_256 = 0x12
+_DAG_PB = 0x70
+_RAW = 0x55
+_UNIXFS_FILE = 2
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# CIDv0 (base58btc) or CIDv1 in lowercase base32, the two forms gateways serve
+_CID_PATTERN = re.compile(r"Qm[1-9A-HJ-NP-Za-km-z]{44}|b[a-z2-7]{58,120}")
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _multihash(block: bytes) -> bytes:
+    return bytes([_SHA2_256, 32]) + hashlib.sha256(block).digest()
+
+
+def b58encode(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    padding = len(data) - len(data.lstrip(b"\0"))
+    return "1" * padding + encoded
+
+
+def b58decode(text: str) -> bytes:
+    number = 0
+    for char in text:
+        number = number * 58 + _BASE58_ALPHABET.index(char)
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    padding = len(text) - len(text.lstrip("1"))
+    return b"\0" * padding + body
+
+
+# (multihash, cumulative serialized size, file bytes covered)
+_Link = Tuple[bytes, int, int]
+
+
+def _leaf(chunk: bytes) -> _Link:
+    unixfs = _uint_field(1, _UNIXFS_FILE)
+    if chunk:
+        unixfs += _field(2, chunk)
+    unixfs += _uint_field(3, len(chunk))
+    block = _field(1, unixfs)
+    return _multihash(block), len(block), len(chunk)
+
+
+def _parent(children: List[_Link]) -> _Link:
+    # dag-pb puts Links (field 2) before Data (field 1)
+    links = b"".join(
+        _field(2, _field(1, digest) + _field(2, b"") + _uint_field(3, tsize))
+        for digest, tsize, _ in children
+    )
+    filesize = sum(size for _, _, size in children)
+    unixfs = _uint_field(1, _UNIXFS_FILE) + _uint_field(3, filesize)
+    unixfs += b"".join(_uint_field(4, size) for _, _, size in children)
+    block = links + _field(1, unixfs)
+    return _multihash(block), len(block) + sum(tsize for _, tsize, _ in children), filesize
+
+
+class CidBuilder:
+    """Incrementally computes the CIDv0 of a file fed in arbitrary pieces."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._leaves: List[_Link] = []
+        self.size = 0
+
+    def update(self, data: bytes) -> None:
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= CHUNK_SIZE:
+            self._leaves.append(_leaf(bytes(self._buffer[:CHUNK_SIZE])))
+            del self._buffer[:CHUNK_SIZE]
+
+    def multihash(self) -> bytes:
+        """Multihash of the root block for everything fed so far."""
+        leaves = list(self._leaves)
+        if self._buffer or not leaves:
+            leaves.append(_leaf(bytes(self._buffer)))
+
+        level = leaves
+        while len(level) > 1:
+            level = [_parent(level[i:i + MAX_LINKS]) for i in range(0, len(level), MAX_LINKS)]
+        return level[0][0]
+
+    def cid(self) -> str:
+        return b58encode(self.multihash())
+
+
+def compute_cid(content: bytes) -> str:
+    """CIDv0 that Lighthouse assigns to `content` when added as a file."""
+    builder = CidBuilder()
+    builder.update(content)
+    return builder.cid()
+
+
+def _decode(cid: str) -> Optional[Tuple[int, bytes]]:
+    """(codec, multihash) of a CIDv0 or base32 CIDv1, or None if unsupported."""
+    try:
+        if cid.startswith("Qm") and len(cid) == 46:
+            return _DAG_PB, b58decode(cid)
+        if cid.startswith("b"):
+            text = cid[1:].upper()
+            raw = base64.b32decode(text + "=" * (-len(text) % 8))
+            version, offset = _read_varint(raw, 0)
+            codec, offset = _read_varint(raw, offset)
+            if version == 1:
+                return codec, raw[offset:]
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+def is_cid(text: str) -> bool:
+    """Whether `text` is a well-formed CIDv0 or base32 CIDv1 and nothing else.
+
+    Used to vet CIDs from requests before they become part of a gateway URL.
+    """
+    if not _CID_PATTERN.fullmatch(text):
+        return False
+    decoded = _decode(text)
+    if decoded is None:
+        return False
+    _, multihash = decoded
+    try:
+        _, offset = _read_varint(multihash, 0)
+        length, offset = _read_varint(multihash, offset)
+    except IndexError:
+        return False
+    return length > 0 and len(multihash) - offset == length
+
+
+def verify_cid(cid: str, content: bytes) -> Optional[bool]:
+    """Check that `content` hashes to `cid`.
+
+    Returns None when the CID can't be checked locally: a hash other than
+    sha2-256 or a codec other than dag-pb and raw. Content added with
+    non-default chunking has a different dag-pb CID and fails verification.
+    """
+    decoded = _decode(cid)
+    if decoded is None:
+        return None
+    codec, multihash = decoded
+    if multihash[:1] != bytes([_SHA2_256]):
+        return None
+    if codec == _RAW:
+        return multihash == _multihash(content)
+    if codec == _DAG_PB:
+        builder = CidBuilder()
+        builder.update(content)
+        return multihash == builder.multihash()
+    return None
@@ -0,0 +1,328 @@
+"""Bounded in-memory and on-disk caches for immutable IPFS content."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from app.core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "valyra_content_cache_requests", "Content cache lookups by result", ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "valyra_content_cache_evictions", "Entries dropped from the content cache", ["cache", "reason"]
+)
+CACHE_BYTES = Gauge("valyra_content_cache_bytes", "Bytes held by the content cache", ["cache"])
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness since creation or last clear."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    rejected: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ContentCache:
+    """Byte-budgeted LRU cache with a per-entry TTL.
+
+    Entries are evicted least-recently-used first once the total size would
+    exceed `max_bytes`. Values larger than `max_entry_bytes` are never cached,
+    so one big file can't flush everything else. Safe to share between the
+    event loop and worker threads.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        max_entry_bytes: Optional[int] = None,
+        name: str = "memory",
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Total size budget in bytes. 0 disables caching.
+            ttl: Seconds an entry stays valid. None means no expiry.
+            max_entry_bytes: Largest value accepted. Defaults to `max_bytes`.
+            name: Label used for this cache's metrics.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_bytes if max_entry_bytes is None else min(max_entry_bytes, max_bytes)
+        self.name = name
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[str, tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._size = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value and mark it recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key, "expired")
+                entry = None
+
+            if entry is None:
+                self._stats.misses += 1
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return entry[0]
+
+    def set(self, key: str, value: bytes) -> bool:
+        """Store a value, evicting least-recently-used entries to make room.
+
+        Returns:
+            False if the value is too large to cache.
+        """
+        size = len(value)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self._stats.rejected += 1
+                return False
+
+            if key in self._entries:
+                self._remove(key, None)
+
+            while self._entries and self._size + size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest, "evicted")
+
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._size += size
+            self._publish_size()
+            return True
+
+    def pop(self, key: str) -> Optional[bytes]:
+        """Remove and return a value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._remove(key, None)
+            return entry[0]
+
+    def clear(self) -> None:
+        """Drop every entry and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._stats = CacheStats()
+            self._publish_size()
+
+    def stats(self) -> CacheStats:
+        """Snapshot of hit/miss/eviction counters and current size."""
+        with self._lock:
+            return CacheStats(
+                **{**self._stats.to_dict(), "entries": len(self._entries), "size_bytes": self._size}
+            )
+
+    def _expired(self, entry) -> bool:
+        expires_at = entry[1]
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def _remove(self, key: str, reason: Optional[str]) -> None:
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+        if reason == "evicted":
+            self._stats.evictions += 1
+        elif reason == "expired":
+            self._stats.expirations += 1
+        if reason:
+            CACHE_EVICTIONS.inc(cache=self.name, reason=reason)
+        self._publish_size()
+
+    def _publish_size(self) -> None:
+        CACHE_BYTES.set(self._size, cache=self.name)
+
+
+class DiskContentCache:
+    """Content-addressed file cache shared by every worker on a host.
+
+    Each key is stored at ``<directory>/<h[:2]>/<h[2:4]>/<h>``, where ``h`` is
+    the SHA-256 of the key. Sharding keeps directories small, and hashing keeps
+    arbitrary keys out of the path. Writes go to a temp file in the same shard
+    and are renamed into place, so readers in other processes never see a
+    partial file.
+
+    Eviction is least-recently-used by mtime, which hits refresh. Several
+    processes share the directory, so the running size is only a local
+    estimate. Once it passes `max_bytes`, the directory is rescanned and the
+    oldest files are removed until usage drops to `low_watermark` of the budget.
+
+    All methods block on disk I/O; call them from a worker thread.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, low_watermark: float = 0.9, name: str = "disk"):
+        """Initialize the cache.
+
+        Args:
+            directory: Root directory, created if missing.
+            max_bytes: Total size budget in bytes.
+            low_watermark: Fraction of `max_bytes` to shrink to when evicting.
+            name: Label used for this cache's metrics.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self.name = name
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = self._scan_size()
+        CACHE_BYTES.set(self._size, cache=self.name)
+
+    def path_for(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value and refresh its recency, or None."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self._record("miss")
+            return None
+
+        self._record("hit")
+        return value
+
+    def set(self, key: str, value: bytes) -> bool:
+        """Atomically write a value, evicting old files if over budget.
+
+        Returns:
+            False if the value is larger than the whole budget.
+        """
+        if len(value) > self.max_bytes:
+            with self._lock:
+                self._stats.rejected += 1
+            return False
+
+        path = self.path_for(key)
+        if os.path.exists(path):
+            # Content is immutable per key; just refresh recency
+            os.utime(path)
+            return True
+
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=shard, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._size += len(value)
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Remove least-recently-used files until under the low watermark."""
+        files = sorted(self._scan(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in files)
+        target = self.max_bytes * self.low_watermark
+        evicted = 0
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._size = total
+            self._stats.evictions += evicted
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name, reason="evicted")
+            logger.info(f"Evicted {evicted} files from disk cache {self.directory}")
+        CACHE_BYTES.set(total, cache=self.name)
+
+    def clear(self) -> None:
+        """Delete every cached file and reset statistics."""
+        for path, _, _ in self._scan():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size = 0
+            self._stats = CacheStats()
+        CACHE_BYTES.set(0, cache=self.name)
+
+    def stats(self) -> CacheStats:
+        """Snapshot of hit/miss/eviction counters and estimated size."""
+        with self._lock:
+            return CacheStats(**{**self._stats.to_dict(), "size_bytes": self._size})
+
+    def _record(self, result: str) -> None:
+        with self._lock:
+            if result == "hit":
+                self._stats.hits += 1
+            else:
+                self._stats.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, result=result)
+
+    def _scan(self) -> list:
+        """(path, mtime, size) for every cached file, skipping in-flight temp files."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._scan())
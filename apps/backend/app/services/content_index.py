@@ -0,0 +1,42 @@
+"""Index of content already pinned on Lighthouse, keyed by CID."""
+
+import logging
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import SessionLocal
+from app.models.storage import StoredContent
+
+logger = logging.getLogger(__name__)
+
+
+class ContentIndex:
+    """Records which CIDs have been uploaded so duplicates can be skipped.
+
+    The index only saves work, so database errors are logged and treated as
+    a miss rather than failing the upload. All methods block on the
+    database; call them from a worker thread.
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or SessionLocal
+
+    def lookup(self, cid: str) -> Optional[str]:
+        """CID that content with the local CID `cid` is pinned under, or None."""
+        try:
+            with self.session_factory() as db:
+                stored = db.get(StoredContent, cid)
+                return stored.pinned_cid if stored is not None else None
+        except SQLAlchemyError as e:
+            logger.warning(f"Content index lookup failed for {cid}: {e}")
+            return None
+
+    def add(self, cid: str, pinned_cid: str, size: int, content_type: Optional[str] = None) -> None:
+        try:
+            with self.session_factory() as db:
+                db.merge(StoredContent(cid=cid, pinned_cid=pinned_cid, size=size, content_type=content_type))
+                db.commit()
+        except SQLAlchemyError as e:
+            # Most likely a concurrent upload of the same content won the insert
+            logger.warning(f"Failed to record {cid} in content index: {e}")
@@ -1,15 +1,23 @@
 import asyncio
 import logging
-from typing import Dict, Any, Optional
-from web3 import Web3
+import time
+from collections import deque
+from typing import Dict, Optional
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, WebSocketProvider
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from app.database import SessionLocal
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 from app.models.listing import Listing, ListingStatus
 from app.models.escrow import Escrow, EscrowState
-from app.models.offer import Offer, OfferStatus
 from app.models.user import User
+from app.models.indexer import IndexerCursor, IndexerJournalEntry, ProcessedEvent
+from app.services.indexer_journal import JournalRecorder, revert_entry
+from app.services.leader_election import LeaderLease
+from app.services.listing_cache import listing_cache
 
 logger = logging.getLogger(__name__)
 
@@ -111,9 +119,174 @@ MARKETPLACE_ABI = [
     }
 ]
 
+# Blocks re-scanned on first start when neither a cursor nor a deployment block is known
+DEFAULT_LOOKBACK_BLOCKS = 10
+
+CHAIN_HEAD = Gauge("valyra_indexer_chain_head_block", "Latest block number reported by the RPC node")
+CURSOR_BLOCK = Gauge("valyra_indexer_cursor_block", "Last indexed block per contract", ["contract"])
+BLOCKS_BEHIND = Gauge("valyra_indexer_blocks_behind", "Blocks between chain head and the slowest cursor")
+LAST_PROGRESS = Gauge(
+    "valyra_indexer_last_progress_timestamp_seconds", "Unix time the indexer last committed a window"
+)
+EVENTS_DECODED = Counter("valyra_indexer_events_decoded", "Contract events decoded from logs", ["event"])
+EVENTS_DUPLICATE = Counter(
+    "valyra_indexer_events_duplicate", "Re-delivered events skipped as already processed", ["event"]
+)
+HANDLER_SECONDS = Histogram("valyra_indexer_handler_seconds", "Event handler run time", ["event"])
+RPC_REQUESTS = Counter("valyra_indexer_rpc_requests", "RPC calls made by the indexer", ["method"])
+RPC_ERRORS = Counter("valyra_indexer_rpc_errors", "RPC calls that raised", ["method"])
+RPC_SECONDS = Histogram("valyra_indexer_rpc_seconds", "RPC call latency", ["method"])
+DB_COMMIT_SECONDS = Histogram("valyra_indexer_db_commit_seconds", "Time to commit one indexed window")
+REORGS = Counter("valyra_indexer_reorgs", "Chain reorganisations rolled back")
+
+# Dialect-specific INSERT constructs that support ON CONFLICT DO NOTHING
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _event_key(event) -> tuple:
+    return AsyncWeb3.to_hex(event["transactionHash"]), event["logIndex"]
+
+
+class RpcRateLimiter:
+    """Spaces RPC calls evenly so concurrent tasks stay under a request rate."""
+
+    def __init__(self, max_per_second: float):
+        self.interval = 1 / max_per_second if max_per_second > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Sleep until the caller may send its next request."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class EventBatch:
+    """A window of decoded events sharing one session and bulk-preloaded rows.
+
+    Listings are loaded by `on_chain_id` and users by `wallet_address` with one
+    IN query each, so handlers look rows up in memory instead of per event.
+    Already-processed event keys are loaded the same way, so duplicate
+    deliveries are skipped without running their handler.
+    """
+
+    def __init__(self, db: Session, events: list, chain_id: int, journal_from: Optional[int] = None):
+        self.db = db
+        self.chain_id = chain_id
+        # Events at or above this block are journaled so a reorg can revert them
+        self.journal_from = journal_from
+        self.recorder = JournalRecorder(db) if journal_from is not None else None
+        self.listings: Dict[int, Listing] = {}
+        self.users: Dict[str, User] = {}
+        # Local listings awaiting their on-chain id, keyed by (seller wallet, title)
+        self.unlinked_listings: Dict[tuple, Listing] = {}
+        # (tx_hash, log_index) of events already applied on this chain
+        self.processed: set = set()
+        # Ids of listings changed by handlers, for cache invalidation after commit
+        self.changed_listings: set = set()
+
+        listing_ids = {e["args"]["listingId"] for e in events if "listingId" in e["args"]}
+        wallets = {
+            e["args"][key] for e in events
+            for key in ("buyer", "seller") if key in e["args"]
+        }
+        created = [
+            (e["args"]["seller"], e["args"]["title"])
+            for e in events if e["event"] == "ListingCreated"
+        ]
+
+        tx_hashes = {_event_key(e)[0] for e in events}
+        if tx_hashes:
+            self.processed = set(db.query(ProcessedEvent.tx_hash, ProcessedEvent.log_index).filter(
+                ProcessedEvent.chain_id == chain_id,
+                ProcessedEvent.tx_hash.in_(tx_hashes)
+            ).all())
+        if listing_ids:
+            for listing in db.query(Listing).filter(Listing.on_chain_id.in_(listing_ids)):
+                self.listings[listing.on_chain_id] = listing
+        if wallets:
+            for user in db.query(User).filter(User.wallet_address.in_(wallets)):
+                self.users[user.wallet_address] = user
+        if created:
+            rows = db.query(Listing, User.wallet_address).join(User).filter(
+                User.wallet_address.in_({seller for seller, _ in created}),
+                Listing.asset_name.in_({title for _, title in created})
+            )
+            for listing, wallet in rows:
+                self.unlinked_listings.setdefault((wallet, listing.asset_name), listing)
+
+    def claim(self, event) -> bool:
+        """Mark an event processed; False if it already was.
+
+        Uses INSERT ... ON CONFLICT DO NOTHING so a duplicate costs one probe of
+        the unique index, even if another writer committed it after the preload.
+        """
+        key = _event_key(event)
+        if key in self.processed:
+            return False
+
+        insert = _UPSERT_INSERTS[self.db.get_bind().dialect.name]
+        result = self.db.execute(
+            insert(ProcessedEvent).values(
+                chain_id=self.chain_id,
+                tx_hash=key[0],
+                log_index=key[1],
+                block_number=event["blockNumber"]
+            ).on_conflict_do_nothing(index_elements=["chain_id", "tx_hash", "log_index"])
+        )
+        self.processed.add(key)
+        return result.rowcount > 0
+
+    def apply(self, handler, event):
+        """Run a handler once per event, journaling how to undo it if it is near head."""
+        if not self.claim(event):
+            EVENTS_DUPLICATE.inc(event=event["event"])
+            logger.debug(f"Indexer: Skipping already processed {event['event']} {_event_key(event)}")
+            return
+
+        if self.recorder is None or event["blockNumber"] < self.journal_from:
+            self._run(handler, event)
+            return
+
+        # Flush earlier handlers first so undo values capture only this event's changes
+        self.db.flush()
+        self.recorder.begin()
+        try:
+            self._run(handler, event)
+            self.db.flush()
+        finally:
+            undo = self.recorder.end()
+        self.db.add(IndexerJournalEntry(
+            chain_id=self.chain_id,
+            block_number=event["blockNumber"],
+            block_hash=AsyncWeb3.to_hex(event["blockHash"]),
+            log_index=event["logIndex"],
+            tx_hash=AsyncWeb3.to_hex(event["transactionHash"]),
+            event_name=event["event"],
+            undo=undo
+        ))
+
+    def _run(self, handler, event):
+        with HANDLER_SECONDS.time(event=event["event"]):
+            handler(self, event)
+
+
 class IndexerService:
-    def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(settings.base_rpc_url))
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or SessionLocal
+        self.w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(settings.base_rpc_url))
+        self.chain_id = settings.base_chain_id
+        self.block_window = settings.indexer_block_window
+        self.lease = LeaderLease(
+            f"valyra-indexer:{self.chain_id}",
+            engine=self.session_factory.kw.get("bind"),
+        )
         
         # Initialize Escrow Contract
         self.escrow_contract_address = settings.escrow_contract_address
@@ -122,7 +295,7 @@ class IndexerService:
             logger.warning("Indexer: ESCROW_CONTRACT_ADDRESS not set. Escrow indexing paused.")
         else:
             try:
-                addr = Web3.to_checksum_address(self.escrow_contract_address)
+                addr = AsyncWeb3.to_checksum_address(self.escrow_contract_address)
                 self.escrow_contract = self.w3.eth.contract(address=addr, abi=ESCROW_ABI)
             except Exception as e:
                 logger.error(f"Indexer: Invalid Escrow address or ABI: {e}")
@@ -134,94 +307,531 @@ class IndexerService:
             logger.warning("Indexer: MARKETPLACE_CONTRACT_ADDRESS not set. Marketplace indexing paused.")
         else:
             try:
-                addr = Web3.to_checksum_address(self.marketplace_contract_address)
+                addr = AsyncWeb3.to_checksum_address(self.marketplace_contract_address)
                 self.marketplace_contract = self.w3.eth.contract(address=addr, abi=MARKETPLACE_ABI)
             except Exception as e:
                 logger.error(f"Indexer: Invalid Marketplace address or ABI: {e}")
 
+    def _watched_contracts(self) -> list:
+        """Return (contract, {event_name: handler}) pairs for every configured contract."""
+        watched = []
+        if self.escrow_contract:
+            watched.append((self.escrow_contract, {
+                "EscrowCreated": self.process_escrow_created,
+                "ReceiptConfirmed": self.process_receipt_confirmed,
+                "DisputeRaised": self.process_dispute_raised,
+            }))
+        if self.marketplace_contract:
+            watched.append((self.marketplace_contract, {
+                "ListingCreated": self.process_listing_created,
+                "ListingUpdated": self.process_listing_updated,
+                "ListingCancelled": self.process_listing_cancelled,
+                "SellerStaked": self.process_seller_staked,
+                "StakeWithdrawn": self.process_stake_withdrawn,
+                "GenesisSellerJoined": self.process_genesis_seller_joined,
+            }))
+        return watched
+
     async def start(self):
+        """Index as leader, or stand by until the current leader goes away.
+
+        Every API worker and standalone indexer process may call this; the
+        advisory-lock lease guarantees only one of them polls the chain at a time.
+        """
         if not self.escrow_contract and not self.marketplace_contract:
             logger.info("Indexer: No contracts to watch.")
             return
 
-        logger.info(f"Indexer: Starting polling on {settings.base_rpc_url}")
-        
         while True:
             try:
-                await self.check_events()
-                await asyncio.sleep(15)
+                acquired = await asyncio.to_thread(self.lease.try_acquire)
             except Exception as e:
-                logger.error(f"Indexer Error: {e}")
-                await asyncio.sleep(15)
+                logger.error(f"Indexer: Leader election failed: {e}")
+                acquired = False
+
+            if not acquired:
+                await asyncio.sleep(settings.indexer_leader_retry_interval)
+                continue
+
+            try:
+                await self.run_as_leader()
+            finally:
+                await asyncio.to_thread(self.lease.release)
+
+    async def run_as_leader(self):
+        """Index events for as long as this instance holds the lease.
+
+        With `base_ws_url` set, a log subscription wakes the loop as soon as a
+        watched contract emits an event; the poll interval remains the fallback
+        whenever the socket is down. Either way each pass catches up from the
+        stored cursors, so logs missed while disconnected are backfilled.
+        """
+        wake = asyncio.Event()
+        subscriber = None
+        if settings.base_ws_url:
+            logger.info(f"Indexer: Subscribing to logs on {settings.base_ws_url}")
+            subscriber = asyncio.create_task(self.subscribe_logs(wake))
+        else:
+            logger.info(f"Indexer: Starting polling on {settings.base_rpc_url}")
+
+        try:
+            while await asyncio.to_thread(self.lease.is_held):
+                # Logs that arrive while we're indexing trigger another pass right away
+                wake.clear()
+                try:
+                    await self.check_events()
+                except Exception as e:
+                    logger.error(f"Indexer Error: {e}")
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=settings.indexer_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if subscriber:
+                subscriber.cancel()
+                await asyncio.gather(subscriber, return_exceptions=True)
+
+        logger.warning("Indexer: Lost leadership, returning to standby.")
+
+    def connect_ws(self) -> AsyncWeb3:
+        return AsyncWeb3(WebSocketProvider(settings.base_ws_url))
+
+    async def subscribe_logs(self, wake: asyncio.Event):
+        """Set `wake` on every log from a watched contract, reconnecting on failure.
+
+        Notifications only signal that there is something new; events are still
+        fetched and applied by range from the cursors, which keeps confirmation
+        depth, reorg handling and idempotency in one code path.
+        """
+        addresses = [contract.address for contract, _ in self._watched_contracts()]
+        while True:
+            try:
+                async with self.connect_ws() as w3:
+                    await w3.eth.subscribe("logs", {"address": addresses})
+                    # Catch up on anything emitted while we weren't subscribed
+                    wake.set()
+                    async for _ in w3.socket.process_subscriptions():
+                        wake.set()
+                logger.warning("Indexer: Log subscription closed, falling back to polling")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Indexer: Log subscription failed, falling back to polling: {e}")
+            await asyncio.sleep(settings.indexer_ws_reconnect_interval)
+
+    def _event_routes(self) -> Dict[tuple, tuple]:
+        """Map (contract address, topic0) to the event used for decoding and its handler."""
+        routes = {}
+        for contract, handlers in self._watched_contracts():
+            for event_name, handler in handlers.items():
+                event = getattr(contract.events, event_name)
+                routes[(contract.address, HexBytes(event.topic))] = (event, handler)
+        return routes
 
     async def check_events(self):
-        # Poll recent blocks (Naive implementation)
+        """Scan all watched contracts from their stored cursors up to the confirmed head."""
         try:
-            current_block = self.w3.eth.block_number
-            from_block = max(0, current_block - 10) # Look back 10 blocks
+            head = await self.call_rpc("eth_blockNumber", self.w3.eth.block_number)
         except Exception as e:
             logger.error(f"Indexer: Failed to get block number: {e}")
             return
+        CHAIN_HEAD.set(head)
+
+        try:
+            await self.handle_reorg()
+            await self.catch_up(head - settings.indexer_confirmations)
+        except Exception as e:
+            logger.error(f"Indexer: Catch-up stopped: {e}")
+
+    async def catch_up(self, head: int):
+        """Walk forward from the stored cursors to `head` in bounded block windows.
+
+        Each window is a single eth_getLogs call covering every watched address and
+        topic. The window halves whenever the RPC rejects a range (too many results,
+        timeouts) and doubles back towards `indexer_block_window` after each success.
+        Cursors are only advanced once every log in a window has been handled.
+
+        RPC calls are awaited on the event loop; handlers and cursor writes use
+        blocking SQLAlchemy sessions and run in the default thread pool.
+        """
+        routes = self._event_routes()
+        addresses = list(dict.fromkeys(address for address, _ in routes))
+        topics = list(dict.fromkeys(topic for _, topic in routes))
+        cursors = {
+            address: await asyncio.to_thread(self.get_cursor, address, head)
+            for address in addresses
+        }
+        cursor = min(cursors.values())
+        journal_from = head - settings.indexer_reorg_window + 1
+
+        while cursor < head:
+            from_block = cursor + 1
+            to_block = min(cursor + self.block_window, head)
 
-        # 1. Process Escrow Events
-        if self.escrow_contract:
             try:
-                # EscrowCreated
-                events = self.escrow_contract.events.EscrowCreated.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_escrow_created(event)
-                
-                # ReceiptConfirmed
-                events = self.escrow_contract.events.ReceiptConfirmed.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_receipt_confirmed(event)
-                
-                # DisputeRaised
-                events = self.escrow_contract.events.DisputeRaised.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_dispute_raised(event)
+                logs = await self.fetch_logs(addresses, topics, from_block, to_block)
             except Exception as e:
-                 logger.error(f"Indexer (Escrow) Error: {e}")
+                if self.block_window <= settings.indexer_min_block_window:
+                    raise
+                self.block_window = max(settings.indexer_min_block_window, self.block_window // 2)
+                logger.warning(
+                    f"Indexer: getLogs {from_block}-{to_block} failed ({e}), "
+                    f"retrying with {self.block_window} block window"
+                )
+                continue
 
-        # 2. Process Marketplace Events
-        if self.marketplace_contract:
+            # Remember the hash of blocks that could still be reorged out
+            block_hash = None
+            if to_block >= journal_from:
+                block_hash = await self.get_block_hash(to_block)
+
+            behind = [address for address in addresses if cursors[address] < to_block]
+            changed = await asyncio.to_thread(
+                self.apply_window, logs, routes, cursors, behind, to_block, block_hash, journal_from
+            )
+            if changed:
+                await listing_cache.invalidate(changed, source="indexer")
+            for address in behind:
+                cursors[address] = to_block
+            self.record_progress(cursors)
+            cursor = to_block
+            self.block_window = min(settings.indexer_block_window, self.block_window * 2)
+
+            # Yield between windows so a long catch-up doesn't starve other tasks
+            await asyncio.sleep(0)
+
+    async def backfill(
+        self,
+        from_block: Optional[int] = None,
+        to_block: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_rps: Optional[float] = None,
+    ):
+        """Replay chain history through the regular handlers.
+
+        Windows are fetched by up to `workers` concurrent eth_getLogs calls,
+        throttled to `max_rps`, but applied strictly in chain order together with
+        their cursor update. An interrupted backfill therefore resumes from the
+        last applied window; `from_block` only applies to contracts that have no
+        cursor yet.
+
+        Holds the indexer lease, so it never races a live leader over cursors.
+        """
+        workers = workers or settings.indexer_backfill_workers
+        limiter = RpcRateLimiter(max_rps if max_rps is not None else settings.indexer_backfill_max_rps)
+
+        if not await asyncio.to_thread(self.lease.try_acquire):
+            raise RuntimeError("Another indexer holds the lease; stop it before backfilling")
+        try:
+            await limiter.wait()
+            chain_head = await self.call_rpc("eth_blockNumber", self.w3.eth.block_number)
+            CHAIN_HEAD.set(chain_head)
+            head = chain_head - settings.indexer_confirmations
+            end = head if to_block is None else min(to_block, head)
+
+            routes = self._event_routes()
+            addresses = list(dict.fromkeys(address for address, _ in routes))
+            topics = list(dict.fromkeys(topic for _, topic in routes))
+            cursors = {
+                address: await asyncio.to_thread(self.get_cursor, address, head, from_block)
+                for address in addresses
+            }
+            start = min(cursors.values(), default=end) + 1
+            journal_from = head - settings.indexer_reorg_window + 1
+            logger.info(f"Indexer: Backfilling blocks {start}-{end} with {workers} workers")
+
+            windows = (
+                (block, min(block + self.block_window - 1, end))
+                for block in range(start, end + 1, self.block_window)
+            )
+            pending = deque()
+
+            def schedule():
+                for window in windows:
+                    pending.append((window, asyncio.create_task(
+                        self.fetch_range(addresses, topics, *window, limiter)
+                    )))
+                    if len(pending) >= workers:
+                        return
+
+            schedule()
             try:
-                # ListingCreated
-                events = self.marketplace_contract.events.ListingCreated.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_listing_created(event)
-
-                # ListingUpdated
-                events = self.marketplace_contract.events.ListingUpdated.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_listing_updated(event)
-
-                # ListingCancelled
-                events = self.marketplace_contract.events.ListingCancelled.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_listing_cancelled(event)
-                
-                # SellerStaked
-                events = self.marketplace_contract.events.SellerStaked.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_seller_staked(event)
-                
-                # StakeWithdrawn
-                events = self.marketplace_contract.events.StakeWithdrawn.get_logs(fromBlock=from_block)
-                for event in events:
-                    self.process_stake_withdrawn(event)
-                
-                # GenesisSellerJoined
-                events = self.marketplace_contract.events.GenesisSellerJoined.get_logs(fromBlock=from_block)
-                for event in events:
-                     self.process_genesis_seller_joined(event)
+                while pending:
+                    (window_start, window_end), task = pending.popleft()
+                    logs = await task
+                    schedule()
 
-            except Exception as e:
-                logger.error(f"Indexer (Marketplace) Error: {e}")
+                    block_hash = None
+                    if window_end >= journal_from:
+                        await limiter.wait()
+                        block_hash = await self.get_block_hash(window_end)
+
+                    behind = [address for address in addresses if cursors[address] < window_end]
+                    changed = await asyncio.to_thread(
+                        self.apply_window, logs, routes, cursors, behind, window_end, block_hash, journal_from
+                    )
+                    if changed:
+                        await listing_cache.invalidate(changed, source="indexer")
+                    for address in behind:
+                        cursors[address] = window_end
+                    self.record_progress(cursors)
+                    logger.info(f"Indexer: Backfilled {window_start}-{window_end} ({len(logs)} logs)")
+            finally:
+                for _, task in pending:
+                    task.cancel()
+        finally:
+            await asyncio.to_thread(self.lease.release)
+
+    async def fetch_range(
+        self, addresses: list, topics: list, from_block: int, to_block: int, limiter: RpcRateLimiter
+    ) -> list:
+        """Fetch logs for a range, splitting it in halves whenever the RPC rejects it."""
+        await limiter.wait()
+        try:
+            return await self.fetch_logs(addresses, topics, from_block, to_block)
+        except Exception as e:
+            if to_block - from_block + 1 <= settings.indexer_min_block_window:
+                raise
+            middle = (from_block + to_block) // 2
+            logger.warning(f"Indexer: getLogs {from_block}-{to_block} failed ({e}), splitting range")
+            return (
+                await self.fetch_range(addresses, topics, from_block, middle, limiter)
+                + await self.fetch_range(addresses, topics, middle + 1, to_block, limiter)
+            )
+
+    async def fetch_logs(self, addresses: list, topics: list, from_block: int, to_block: int) -> list:
+        """Fetch raw logs for all watched contracts in a block range, in chain order."""
+        logs = await self.call_rpc("eth_getLogs", self.w3.eth.get_logs({
+            "address": addresses,
+            "topics": [topics],
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        }))
+        return sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+    async def get_block_hash(self, block_number: int) -> str:
+        block = await self.call_rpc("eth_getBlockByNumber", self.w3.eth.get_block(block_number))
+        return AsyncWeb3.to_hex(block["hash"])
+
+    async def call_rpc(self, method: str, request):
+        """Await an RPC request, recording its count, latency and failures."""
+        RPC_REQUESTS.inc(method=method)
+        started = time.perf_counter()
+        try:
+            return await request
+        except Exception:
+            RPC_ERRORS.inc(method=method)
+            raise
+        finally:
+            RPC_SECONDS.observe(time.perf_counter() - started, method=method)
+
+    def record_progress(self, cursors: Dict[str, int]):
+        """Export cursor positions and lag after a window is committed."""
+        for address, block in cursors.items():
+            CURSOR_BLOCK.set(block, contract=address)
+        head = CHAIN_HEAD.get()
+        if head is not None and cursors:
+            BLOCKS_BEHIND.set(max(0, head - min(cursors.values())))
+        LAST_PROGRESS.set(time.time())
+
+    def apply_window(
+        self,
+        logs: list,
+        routes: Dict[tuple, tuple],
+        cursors: Dict[str, int],
+        advance: list,
+        to_block: int,
+        block_hash: Optional[str] = None,
+        journal_from: Optional[int] = None,
+    ):
+        """Apply a window of raw logs and advance cursors in a single transaction.
+
+        Logs are decoded and dispatched in chain order, skipping blocks a contract
+        has already indexed. If any handler fails nothing is committed, so the
+        window is retried as a whole on the next poll. Events at or above
+        `journal_from` get undo journal entries; older entries are pruned.
+
+        Returns:
+            Ids of the listings the window changed.
+        """
+        decoded = []
+        for log in logs:
+            address = AsyncWeb3.to_checksum_address(log["address"])
+            if log["blockNumber"] <= cursors[address]:
+                # Contract was already indexed past this block
+                continue
+            route = routes.get((address, HexBytes(log["topics"][0])))
+            if not route:
+                continue
+            event, handler = route
+            decoded.append((handler, event.process_log(log)))
+            EVENTS_DECODED.inc(event=event.event_name)
+
+        with self.session_factory() as db:
+            batch = EventBatch(db, [event for _, event in decoded], self.chain_id, journal_from)
+            for handler, event in decoded:
+                batch.apply(handler, event)
+            self.save_cursors(db, advance, to_block, block_hash)
+            if journal_from is not None:
+                db.query(IndexerJournalEntry).filter(
+                    IndexerJournalEntry.chain_id == self.chain_id,
+                    IndexerJournalEntry.block_number < journal_from
+                ).delete(synchronize_session=False)
+            with DB_COMMIT_SECONDS.time():
+                db.commit()
+        return batch.changed_listings
+
+    # --- Reorgs ---
+
+    async def handle_reorg(self) -> bool:
+        """Detect a reorg below the stored cursors and roll back to a common ancestor.
+
+        The stored cursor hashes and the newest journaled block are compared with
+        the canonical chain. On a mismatch, journaled events above the last block
+        that is still canonical are reverted and the cursors rewound, so the next
+        catch-up re-applies only the affected range.
+
+        Returns:
+            True if a reorg was found and rolled back.
+        """
+        checkpoints = await asyncio.to_thread(self.load_checkpoints)
+        orphaned = [
+            block_number for block_number, block_hash in checkpoints
+            if await self.get_block_hash(block_number) != block_hash
+        ]
+        if not orphaned:
+            return False
+
+        fork_block = min(orphaned)
+        ancestor = await self.find_common_ancestor(fork_block)
+        REORGS.inc()
+        logger.warning(f"Indexer: Reorg detected at block {fork_block}, reverting to block {ancestor}")
+        reverted = await asyncio.to_thread(self.revert_to, ancestor)
+        await listing_cache.invalidate(reverted, source="reorg")
+        return True
+
+    def load_checkpoints(self) -> list:
+        """(block_number, block_hash) pairs recorded for the latest indexed blocks."""
+        with self.session_factory() as db:
+            checkpoints = {
+                (cursor.last_block, cursor.last_block_hash)
+                for cursor in db.query(IndexerCursor).filter(
+                    IndexerCursor.chain_id == self.chain_id,
+                    IndexerCursor.last_block_hash.isnot(None)
+                )
+            }
+            latest = db.query(IndexerJournalEntry).filter(
+                IndexerJournalEntry.chain_id == self.chain_id
+            ).order_by(IndexerJournalEntry.block_number.desc()).first()
+            if latest:
+                checkpoints.add((latest.block_number, latest.block_hash))
+        return sorted(checkpoints)
+
+    async def find_common_ancestor(self, fork_block: int) -> int:
+        """Highest journaled block below `fork_block` that is still canonical.
+
+        Never goes deeper than the reorg window: anything older was indexed without
+        a journal and is treated as final. If no journaled block qualifies, the
+        rewind can reach below the oldest journal entry; `revert_to` keeps the
+        markers of unjournaled events so rescanning them doesn't apply them twice.
+        """
+        floor = fork_block - settings.indexer_reorg_window
+        journaled = await asyncio.to_thread(self.load_journaled_blocks, floor, fork_block)
+
+        for block_number, block_hash in journaled:
+            if await self.get_block_hash(block_number) == block_hash:
+                return block_number
+        return max(-1, floor)
+
+    def load_journaled_blocks(self, above: int, below: int) -> list:
+        """Distinct journaled (block_number, block_hash) pairs in a range, newest first."""
+        with self.session_factory() as db:
+            return db.query(
+                IndexerJournalEntry.block_number, IndexerJournalEntry.block_hash
+            ).filter(
+                IndexerJournalEntry.chain_id == self.chain_id,
+                IndexerJournalEntry.block_number < below,
+                IndexerJournalEntry.block_number > above
+            ).distinct().order_by(IndexerJournalEntry.block_number.desc()).all()
+
+    def revert_to(self, ancestor: int) -> set:
+        """Revert journaled events above `ancestor`, forget them and rewind cursors, atomically.
+
+        Only the reverted events lose their processed markers. Unjournaled events
+        above `ancestor` (older than the reorg window when indexed, or with
+        pruned journal entries) are final and stay marked, so the rescan skips them.
+
+        Returns:
+            Ids of the listings the reverted events had changed.
+        """
+        listing_ids = set()
+        with self.session_factory() as db:
+            entries = db.query(IndexerJournalEntry).filter(
+                IndexerJournalEntry.chain_id == self.chain_id,
+                IndexerJournalEntry.block_number > ancestor
+            ).order_by(IndexerJournalEntry.id.desc()).all()
+            reverted = set()
+            for entry in entries:
+                revert_entry(db, entry)
+                db.delete(entry)
+                reverted.add((entry.tx_hash, entry.log_index))
+                listing_ids.update(
+                    op["pk"][0] for op in entry.undo if op["table"] == Listing.__tablename__
+                )
+            # Orphaned events must be applied again if they reappear on the new branch
+            if reverted:
+                db.query(ProcessedEvent).filter(
+                    ProcessedEvent.chain_id == self.chain_id,
+                    tuple_(ProcessedEvent.tx_hash, ProcessedEvent.log_index).in_(reverted)
+                ).delete(synchronize_session=False)
+
+            for cursor in db.query(IndexerCursor).filter(IndexerCursor.chain_id == self.chain_id):
+                if cursor.last_block > ancestor:
+                    cursor.last_block = ancestor
+                cursor.last_block_hash = None
+            db.commit()
+        return listing_ids
+
+    # --- Cursor ---
+
+    def get_cursor(self, contract_address: str, head: int, start_block: Optional[int] = None) -> int:
+        """Return the last fully processed block for a contract.
+
+        Falls back to the block before `start_block` (default
+        `indexer_deployment_block`), or to a short lookback from `head` when the
+        contract has never been indexed.
+        """
+        with self.session_factory() as db:
+            cursor = db.get(IndexerCursor, (self.chain_id, contract_address))
+            if cursor:
+                return cursor.last_block
+
+        if start_block is None:
+            start_block = settings.indexer_deployment_block
+        if start_block is not None:
+            return start_block - 1
+        return max(-1, head - DEFAULT_LOOKBACK_BLOCKS - 1)
+
+    def save_cursors(
+        self, db: Session, contract_addresses: list, block_number: int, block_hash: Optional[str] = None
+    ):
+        """Stage cursor updates in `db`; the caller commits them with the window."""
+        for contract_address in contract_addresses:
+            cursor = db.get(IndexerCursor, (self.chain_id, contract_address))
+            if cursor:
+                cursor.last_block = block_number
+                cursor.last_block_hash = block_hash
+            else:
+                db.add(IndexerCursor(
+                    chain_id=self.chain_id,
+                    contract_address=contract_address,
+                    last_block=block_number,
+                    last_block_hash=block_hash
+                ))
 
     # --- Escrow Handlers ---
 
-    def process_escrow_created(self, event):
+    def process_escrow_created(self, batch: EventBatch, event):
         args = event['args']
         escrow_id = args['escrowId']
         listing_id = args['listingId']
@@ -232,64 +842,65 @@ class IndexerService:
         
         logger.info(f"Processing EscrowCreated: ID={escrow_id} Listing={listing_id}")
         
-        with SessionLocal() as db:
-            # Check if processed
-            existing = db.query(Escrow).filter(Escrow.contract_address == settings.escrow_contract_address, Escrow.escrow_state == EscrowState.CREATED).all() # This query seems suspicious logic but keeping as original
-            
-            # Find Listing
-            listing = db.query(Listing).filter(Listing.on_chain_id == listing_id).first()
-            if not listing:
-                logger.warning(f"Listing not found for on_chain_id {listing_id}")
-                return
-
-            # JIT Verification
-            from app.services.ledger_service import LedgerService
-            
-            user = db.query(User).filter(User.wallet_address == buyer).first()
-            if user:
-                ledger = LedgerService(db)
-                display_amount = float(amount) / 1e18
-                try:
+        db = batch.db
+
+        # Find Listing
+        listing = batch.listings.get(listing_id)
+        if not listing:
+            logger.warning(f"Listing not found for on_chain_id {listing_id}")
+            return
+
+        # JIT Verification
+        from app.services.ledger_service import LedgerService
+
+        user = batch.users.get(buyer)
+        if user:
+            ledger = LedgerService(db)
+            display_amount = float(amount) / 1e18
+            try:
+                # Savepoint so a failed deposit doesn't abort the whole window
+                with db.begin_nested():
                     deposit_result = ledger.process_deposit(
                         user_id=str(user.id),
                         amount=display_amount,
-                        tx_hash=tx_hash
+                        tx_hash=tx_hash,
+                        commit=False
                     )
-                    logger.info(f"JIT Verification Result for {buyer}: {deposit_result}")
-                    if deposit_result.get("status") == "HELD":
-                        logger.warning(f"Escrow {escrow_id} involves risky buyer {buyer}. Deposit held internally.")
-                except Exception as e:
-                    logger.error(f"Error checking JIT verification: {e}")
-            else:
-                logger.warning(f"Buyer {buyer} not found in Users table. Skipping JIT check.")
-
-            # Create Escrow record
-            new_escrow = Escrow(
-                contract_address=settings.escrow_contract_address, 
-                buyer_address=buyer,
-                seller_address=seller,
-                amount=float(amount) / 1e18, 
-                platform_fee=(float(amount) / 1e18) * 0.025,
-                escrow_state=EscrowState.FUNDED
-            )
-            db.add(new_escrow)
-            
-            # Update Listing
-            listing.status = ListingStatus.SOLD
-            db.commit()
-            logger.info(f"Created Escrow record for {escrow_id}")
+                logger.info(f"JIT Verification Result for {buyer}: {deposit_result}")
+                if deposit_result.get("status") == "HELD":
+                    logger.warning(f"Escrow {escrow_id} involves risky buyer {buyer}. Deposit held internally.")
+            except Exception as e:
+                logger.error(f"Error checking JIT verification: {e}")
+        else:
+            logger.warning(f"Buyer {buyer} not found in Users table. Skipping JIT check.")
 
-    def process_receipt_confirmed(self, event):
+        # Create Escrow record
+        new_escrow = Escrow(
+            contract_address=settings.escrow_contract_address, 
+            buyer_address=buyer,
+            seller_address=seller,
+            amount=float(amount) / 1e18, 
+            platform_fee=(float(amount) / 1e18) * 0.025,
+            escrow_state=EscrowState.FUNDED
+        )
+        db.add(new_escrow)
+
+        # Update Listing
+        listing.status = ListingStatus.SOLD
+        batch.changed_listings.add(listing.id)
+        logger.info(f"Created Escrow record for {escrow_id}")
+
+    def process_receipt_confirmed(self, batch: EventBatch, event):
         # Update state to RELEASED/TRANSITION
         pass
 
-    def process_dispute_raised(self, event):
+    def process_dispute_raised(self, batch: EventBatch, event):
         # Update state to DISPUTED
         pass
 
     # --- Marketplace Handlers ---
 
-    def process_listing_created(self, event):
+    def process_listing_created(self, batch: EventBatch, event):
         args = event['args']
         listing_id = args['listingId']
         seller_addr = args['seller']
@@ -298,31 +909,28 @@ class IndexerService:
         
         logger.info(f"Processing ListingCreated: ID={listing_id} Title={title}")
 
-        with SessionLocal() as db:
-            # Try to match existing DRAFT listing by seller and title
-            listing = db.query(Listing).join(User).filter(
-                User.wallet_address == seller_addr,
-                Listing.asset_name == title
-                # Could also check status OR asking_price
-            ).first()
-
-            if listing:
-                # Update existing
-                listing.on_chain_id = listing_id
-                listing.status = ListingStatus.ACTIVE
-                # asking_price in event is Wei, DB is Unit
-                # Only update if meaningful, or trust the event
-                # listing.asking_price = float(asking_price) / 1e18
-                logger.info(f"Linked Listing {listing.id} to on_chain_id {listing_id}")
-            else:
-                # Create new listing if not found??
-                # For robust indexing, we might want to create it, but we lack metadata.
-                # We will log warning for now.
-                logger.warning(f"No matching local listing found for ListingCreated {listing_id}")
-            
-            db.commit()
+        # Try to match existing DRAFT listing by seller and title
+        # Could also check status OR asking_price
+        listing = batch.unlinked_listings.get((seller_addr, title))
 
-    def process_listing_updated(self, event):
+        if listing:
+            # Update existing
+            listing.on_chain_id = listing_id
+            listing.status = ListingStatus.ACTIVE
+            batch.changed_listings.add(listing.id)
+            # Later events in this batch can now find it by on-chain id
+            batch.listings[listing_id] = listing
+            # asking_price in event is Wei, DB is Unit
+            # Only update if meaningful, or trust the event
+            # listing.asking_price = float(asking_price) / 1e18
+            logger.info(f"Linked Listing {listing.id} to on_chain_id {listing_id}")
+        else:
+            # Create new listing if not found??
+            # For robust indexing, we might want to create it, but we lack metadata.
+            # We will log warning for now.
+            logger.warning(f"No matching local listing found for ListingCreated {listing_id}")
+
+    def process_listing_updated(self, batch: EventBatch, event):
         args = event['args']
         listing_id = args['listingId']
         new_price = args['newPrice']
@@ -330,41 +938,39 @@ class IndexerService:
         
         logger.info(f"Processing ListingUpdated: ID={listing_id}")
 
-        with SessionLocal() as db:
-            listing = db.query(Listing).filter(Listing.on_chain_id == listing_id).first()
-            if listing:
-                listing.asking_price = float(new_price) / 1e18
-                # If we parsed IPFS, we could update description etc.
-                logger.info(f"Updated Listing {listing.id} Price to {listing.asking_price}")
-                db.commit()
+        listing = batch.listings.get(listing_id)
+        if listing:
+            listing.asking_price = float(new_price) / 1e18
+            batch.changed_listings.add(listing.id)
+            # If we parsed IPFS, we could update description etc.
+            logger.info(f"Updated Listing {listing.id} Price to {listing.asking_price}")
 
-    def process_listing_cancelled(self, event):
+    def process_listing_cancelled(self, batch: EventBatch, event):
         args = event['args']
         listing_id = args['listingId']
         
         logger.info(f"Processing ListingCancelled: ID={listing_id}")
 
-        with SessionLocal() as db:
-            listing = db.query(Listing).filter(Listing.on_chain_id == listing_id).first()
-            if listing:
-                listing.status = ListingStatus.PAUSED # Or specialized status
-                logger.info(f"Cancelled/Paused Listing {listing.id}")
-                db.commit()
+        listing = batch.listings.get(listing_id)
+        if listing:
+            listing.status = ListingStatus.PAUSED # Or specialized status
+            batch.changed_listings.add(listing.id)
+            logger.info(f"Cancelled/Paused Listing {listing.id}")
 
-    def process_seller_staked(self, event):
+    def process_seller_staked(self, batch: EventBatch, event):
         args = event['args']
         seller = args['seller']
         amount = args['amount']
         logger.info(f"SellerStaked: {seller} staked {amount} Wei")
         # TODO: Update user model with staked amount
 
-    def process_stake_withdrawn(self, event):
+    def process_stake_withdrawn(self, batch: EventBatch, event):
         args = event['args']
         seller = args['seller']
         amount = args['amount']
         logger.info(f"StakeWithdrawn: {seller} withdrew {amount} Wei")
 
-    def process_genesis_seller_joined(self, event):
+    def process_genesis_seller_joined(self, batch: EventBatch, event):
         args = event['args']
         seller = args['seller']
         num = args['genesisNumber']
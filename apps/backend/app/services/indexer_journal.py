@@ -0,0 +1,136 @@
+"""Undo journal for indexer writes that may be orphaned by a chain reorg."""
+
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum as PyEnum
+from typing import Any, Optional
+
+from sqlalchemy import Enum, Numeric, DateTime, event, inspect
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.indexer import IndexerCursor, IndexerJournalEntry, ProcessedEvent
+
+logger = logging.getLogger(__name__)
+
+# Indexer bookkeeping is reverted explicitly, never through the journal
+UNJOURNALED = (IndexerCursor, IndexerJournalEntry, ProcessedEvent)
+
+
+def _encode(value: Any) -> Any:
+    """Convert a column value to something JSON can store."""
+    if isinstance(value, PyEnum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _decode(column, value: Any) -> Any:
+    """Inverse of `_encode`, driven by the column type."""
+    if value is None:
+        return None
+    if isinstance(column.type, Enum) and column.type.enum_class is not None:
+        return column.type.enum_class(value)
+    if isinstance(column.type, Numeric):
+        return Decimal(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, UUID):
+        return uuid.UUID(value)
+    return value
+
+
+def _model_for_table(table_name: str):
+    for mapper in Base.registry.mappers:
+        if mapper.local_table.name == table_name:
+            return mapper
+    raise LookupError(f"No mapped model for table {table_name}")
+
+
+def _primary_key(state) -> list:
+    # state.identity isn't assigned to new objects until after the flush completes
+    return [_encode(value) for value in state.mapper.primary_key_from_instance(state.obj())]
+
+
+class JournalRecorder:
+    """Collects undo operations for everything a session flushes.
+
+    Attach to a session, call `begin()` before running a handler, flush, then
+    `end()` to get the ordered undo list for just that handler's changes.
+    """
+
+    def __init__(self, db: Session):
+        self._ops: Optional[list] = None
+        event.listen(db, "after_flush", self._after_flush)
+
+    def begin(self) -> None:
+        self._ops = []
+
+    def end(self) -> list:
+        ops, self._ops = self._ops or [], None
+        return ops
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        # Session collections and attribute history still reflect pre-flush state here
+        if self._ops is None:
+            return
+
+        for obj in session.new:
+            if isinstance(obj, UNJOURNALED):
+                continue
+            state = inspect(obj)
+            self._ops.append({
+                "op": "delete",
+                "table": state.mapper.local_table.name,
+                "pk": _primary_key(state),
+            })
+
+        for obj in session.dirty:
+            if isinstance(obj, UNJOURNALED):
+                continue
+            state = inspect(obj)
+            values = {}
+            for attr in state.mapper.column_attrs:
+                history = state.attrs[attr.key].history
+                if history.has_changes() and history.deleted:
+                    values[attr.key] = _encode(history.deleted[0])
+            if values:
+                self._ops.append({
+                    "op": "update",
+                    "table": state.mapper.local_table.name,
+                    "pk": _primary_key(state),
+                    "values": values,
+                })
+
+
+def _load(db: Session, mapper, encoded_pk: list):
+    pk = tuple(
+        _decode(column, value) for column, value in zip(mapper.primary_key, encoded_pk)
+    )
+    return db.get(mapper.class_, pk if len(pk) > 1 else pk[0])
+
+
+def revert_entry(db: Session, entry: IndexerJournalEntry) -> None:
+    """Undo one journaled event, newest operation first."""
+    for op in reversed(entry.undo):
+        mapper = _model_for_table(op["table"])
+        obj = _load(db, mapper, op["pk"])
+        if obj is None:
+            continue
+        if op["op"] == "delete":
+            db.delete(obj)
+        elif op["op"] == "update":
+            for key, value in op["values"].items():
+                setattr(obj, key, _decode(mapper.columns[key], value))
+        # Flush per op so deletes and updates hit the DB in reverse order
+        db.flush()
+
+    logger.info(f"Reverted {entry.event_name} at block {entry.block_number} (log {entry.log_index})")
@@ -1,27 +1,125 @@
 """IPFS client for retrieving decentralized content."""
 
+import asyncio
 import logging
-from typing import Optional
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
 
 import httpx
 
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import Counter
 
 logger = logging.getLogger(__name__)
 
+GATEWAY_REQUESTS = Counter(
+    "valyra_ipfs_gateway_requests", "IPFS gateway fetches by gateway and result", ["gateway", "result"]
+)
+HEDGED_REQUESTS = Counter(
+    "valyra_ipfs_hedged_requests", "Extra gateway requests started while an earlier one was pending"
+)
+
+
+@dataclass
+class GatewayScore:
+    """Smoothed health of one gateway."""
+
+    latency: Optional[float] = None  # EWMA of successful fetch time in seconds
+    error_rate: float = 0.0  # EWMA of failures, 0..1
+    samples: deque = field(default_factory=lambda: deque(maxlen=100))
+
+
+class GatewayScoreboard:
+    """Tracks gateway latency and error rate to order and hedge fetches.
+
+    A gateway's expected cost is its EWMA latency plus its EWMA error rate
+    times `error_penalty` seconds, so a fast but flaky gateway ranks below a
+    slightly slower reliable one. Gateways with no history are assumed to take
+    `prior_latency`, so a newly added gateway is tried ahead of slow ones and
+    earns a score. A request cancelled because another gateway won counts as
+    a lower bound on latency, so a gateway that always loses the race still
+    drops down the order. Recent successful latencies are kept to pick the
+    hedge delay.
+    """
+
+    def __init__(
+        self, alpha: float = 0.2, error_penalty: float = 10.0, min_samples: int = 5, prior_latency: float = 0.5
+    ):
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.min_samples = min_samples
+        self.prior_latency = prior_latency
+        self._scores: Dict[str, GatewayScore] = {}
+
+    def get(self, gateway: str) -> GatewayScore:
+        return self._scores.setdefault(gateway, GatewayScore())
+
+    def record(self, gateway: str, latency: float, ok: bool) -> None:
+        score = self.get(gateway)
+        score.error_rate += self.alpha * ((0.0 if ok else 1.0) - score.error_rate)
+        if ok:
+            score.latency = latency if score.latency is None else (
+                score.latency + self.alpha * (latency - score.latency)
+            )
+            score.samples.append(latency)
+
+    def record_cancelled(self, gateway: str, elapsed: float) -> None:
+        """Record a fetch abandoned after `elapsed` seconds, which it would have exceeded."""
+        score = self.get(gateway)
+        if score.latency is None:
+            score.latency = elapsed
+        elif elapsed > score.latency:
+            score.latency += self.alpha * (elapsed - score.latency)
+
+    def cost(self, gateway: str) -> float:
+        score = self.get(gateway)
+        latency = self.prior_latency if score.latency is None else score.latency
+        return latency + score.error_rate * self.error_penalty
+
+    def hedge_delay(self, gateway: str, percentile: float, default: float) -> float:
+        """Latency percentile of recent successes, or `default` until enough are seen."""
+        samples = sorted(self.get(gateway).samples)
+        if len(samples) < self.min_samples:
+            return default
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+
+# Shared so every client instance learns from the same observations
+gateway_scores = GatewayScoreboard()
+
+
+def _content_url(gateway_url: str, cid: str) -> str:
+    return f"{gateway_url}/{cid.strip('/')}"
+
 
 class IPFSClient:
     """Client for retrieving content from IPFS via gateway."""
 
-    def __init__(self, gateway_url: Optional[str] = None):
+    def __init__(
+        self,
+        gateway_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        scoreboard: Optional[GatewayScoreboard] = None,
+    ):
         """Initialize IPFS client.
 
         Args:
             gateway_url: IPFS gateway URL. If None, uses settings.
+            http_client: HTTP client to send requests with. If None, uses the shared pool.
+            scoreboard: Gateway health tracker. If None, uses the shared one.
         """
         self.gateway_url = (gateway_url or settings.ipfs_gateway_url).rstrip("/")
         self.timeout = 30.0  # seconds
         self.max_retries = 3
+        self._http_client = http_client
+        self.scores = scoreboard if scoreboard is not None else gateway_scores
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
 
     async def get_content(self, cid: str) -> bytes:
         """Retrieve content from IPFS by CID.
@@ -38,31 +136,64 @@ class IPFSClient:
         """
         url = self.get_content_url(cid)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    logger.info(f"Fetching IPFS content: {cid} (attempt {attempt + 1})")
-                    response = await client.get(url)
-                    response.raise_for_status()
-
-                    logger.info(f"Successfully retrieved IPFS content: {cid}")
-                    return response.content
-
-                except httpx.TimeoutException as e:
-                    logger.warning(
-                        f"Timeout fetching IPFS content (attempt {attempt + 1}): {e}"
+        for attempt in range(self.max_retries):
+            try:
+                logger.info(f"Fetching IPFS content: {cid} (attempt {attempt + 1})")
+                response = await self.http.get(url, timeout=self.timeout)
+                response.raise_for_status()
+
+                logger.info(f"Successfully retrieved IPFS content: {cid}")
+                return response.content
+
+            except httpx.TimeoutException as e:
+                logger.warning(
+                    f"Timeout fetching IPFS content (attempt {attempt + 1}): {e}"
+                )
+                if attempt == self.max_retries - 1:
+                    raise TimeoutError(
+                        f"Failed to fetch IPFS content after {self.max_retries} attempts"
                     )
-                    if attempt == self.max_retries - 1:
-                        raise TimeoutError(
-                            f"Failed to fetch IPFS content after {self.max_retries} attempts"
-                        )
 
-                except httpx.HTTPError as e:
-                    logger.error(f"HTTP error fetching IPFS content: {e}")
-                    raise
+            except httpx.HTTPError as e:
+                logger.error(f"HTTP error fetching IPFS content: {e}")
+                raise
 
         raise RuntimeError("Failed to retrieve IPFS content")
 
+    async def open_stream(self, cid: str, range_header: Optional[str] = None) -> httpx.Response:
+        """Start a streaming GET for content without buffering the body.
+
+        The caller reads the body with `response.aiter_bytes()` and must close
+        it with `response.aclose()` to return the connection to the pool.
+
+        Args:
+            cid: IPFS Content Identifier
+            range_header: Optional HTTP Range header forwarded to the gateway
+
+        Returns:
+            Response with headers received and body unread
+
+        Raises:
+            httpx.HTTPStatusError: If the gateway answers with an error status
+            httpx.HTTPError: If the request fails
+        """
+        # Ask for the raw bytes so Content-Length and Content-Range match what we relay
+        headers = {"Accept-Encoding": "identity"}
+        if range_header:
+            headers["Range"] = range_header
+
+        request = self.http.build_request(
+            "GET", self.get_content_url(cid), headers=headers, timeout=self.timeout
+        )
+        logger.info(f"Streaming IPFS content: {cid}")
+        response = await self.http.send(request, stream=True)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            await response.aclose()
+            raise
+        return response
+
     def get_content_url(self, cid: str) -> str:
         """Generate public URL for IPFS content.
 
@@ -72,14 +203,7 @@ class IPFSClient:
         Returns:
             Public URL to access the content
         """
-        # Remove any leading/trailing slashes from CID
-        cid = cid.strip("/")
-
-        # If gateway URL already ends with /ipfs/, don't add it again
-        if self.gateway_url.endswith("/ipfs"):
-            return f"{self.gateway_url}/{cid}"
-
-        return f"{self.gateway_url}/{cid}"
+        return _content_url(self.gateway_url, cid)
 
     async def check_availability(self, cid: str) -> bool:
         """Check if content is available on IPFS.
@@ -93,22 +217,31 @@ class IPFSClient:
         url = self.get_content_url(cid)
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.head(url)
-                return response.status_code == 200
+            response = await self.http.head(url, timeout=10.0)
+            return response.status_code == 200
 
         except Exception as e:
             logger.warning(f"Failed to check IPFS availability for {cid}: {e}")
             return False
 
     async def get_content_with_fallback(
-        self, cid: str, fallback_gateways: Optional[list[str]] = None
+        self,
+        cid: str,
+        fallback_gateways: Optional[list[str]] = None,
+        validate: Optional[Callable[[bytes], Awaitable[None]]] = None,
     ) -> bytes:
-        """Retrieve content with fallback to alternative gateways.
+        """Retrieve content by racing the primary and fallback gateways.
+
+        Gateways are tried best-scored first. If a request hasn't finished
+        after that gateway's usual latency (`ipfs_hedge_percentile` of recent
+        fetches), or it fails, the next gateway is started alongside it. The
+        first successful response wins and the others are cancelled.
 
         Args:
             cid: IPFS Content Identifier
-            fallback_gateways: List of alternative gateway URLs to try
+            fallback_gateways: Alternative gateway URLs. If None, uses settings.
+            validate: Awaited with each response body; raising rejects that
+                gateway's response and counts as a gateway error.
 
         Returns:
             File content as bytes
@@ -116,21 +249,65 @@ class IPFSClient:
         Raises:
             RuntimeError: If all gateways fail
         """
-        # Try primary gateway first
+        if fallback_gateways is None:
+            fallback_gateways = settings.ipfs_fallback_gateways_list
+        gateways = [self.gateway_url]
+        for gateway in fallback_gateways:
+            gateway = gateway.rstrip("/")
+            if gateway not in gateways:
+                gateways.append(gateway)
+        # Stable sort keeps the primary first among equally scored gateways
+        waiting = sorted(gateways, key=self.scores.cost)
+
+        pending: set = set()
         try:
-            return await self.get_content(cid)
-        except Exception as e:
-            logger.warning(f"Primary gateway failed: {e}")
-
-        # Try fallback gateways
-        if fallback_gateways:
-            for gateway in fallback_gateways:
-                try:
-                    logger.info(f"Trying fallback gateway: {gateway}")
-                    temp_client = IPFSClient(gateway_url=gateway)
-                    return await temp_client.get_content(cid)
-                except Exception as e:
-                    logger.warning(f"Fallback gateway {gateway} failed: {e}")
-                    continue
+            while waiting or pending:
+                delay = None
+                if waiting:
+                    gateway = waiting.pop(0)
+                    if pending:
+                        HEDGED_REQUESTS.inc()
+                    pending.add(asyncio.create_task(self._fetch_from(gateway, cid, validate)))
+                    if waiting:
+                        delay = self.scores.hedge_delay(
+                            gateway, settings.ipfs_hedge_percentile, settings.ipfs_hedge_delay
+                        )
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    logger.warning(f"Gateway failed for {cid}: {task.exception()}")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
 
         raise RuntimeError(f"Failed to retrieve IPFS content {cid} from all gateways")
+
+    async def _fetch_from(
+        self, gateway: str, cid: str, validate: Optional[Callable[[bytes], Awaitable[None]]] = None
+    ) -> bytes:
+        """Fetch once from a gateway, recording the outcome in the scoreboard."""
+        started = time.perf_counter()
+        try:
+            logger.info(f"Fetching IPFS content from {gateway}: {cid}")
+            response = await self.http.get(_content_url(gateway, cid), timeout=self.timeout)
+            response.raise_for_status()
+            if validate is not None:
+                await validate(response.content)
+        except asyncio.CancelledError:
+            GATEWAY_REQUESTS.inc(gateway=gateway, result="cancelled")
+            self.scores.record_cancelled(gateway, time.perf_counter() - started)
+            raise
+        except Exception:
+            GATEWAY_REQUESTS.inc(gateway=gateway, result="error")
+            self.scores.record(gateway, time.perf_counter() - started, ok=False)
+            raise
+
+        GATEWAY_REQUESTS.inc(gateway=gateway, result="success")
+        self.scores.record(gateway, time.perf_counter() - started, ok=True)
+        return response.content
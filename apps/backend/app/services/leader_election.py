@@ -0,0 +1,117 @@
+"""Leader election backed by Postgres session-level advisory locks."""
+
+import hashlib
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """Exclusive lease held through a dedicated connection's advisory lock.
+
+    Postgres releases session-level advisory locks as soon as the owning
+    connection goes away, so a crashed leader frees the lease immediately and
+    a standby polling `try_acquire` takes over on its next attempt.
+    """
+
+    def __init__(self, name: str, engine: Optional[Engine] = None):
+        """Initialize the lease.
+
+        Args:
+            name: Lease name. Every instance using the same name competes for one lock.
+            engine: SQLAlchemy engine. If None, uses the application engine.
+        """
+        self.name = name
+        self.engine = engine or default_engine
+        # pg advisory locks take a signed 64-bit key
+        self.key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+        self._connection: Optional[Connection] = None
+        self._held = False
+
+    @property
+    def _supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def try_acquire(self) -> bool:
+        """Try to become leader without blocking.
+
+        Returns:
+            True if this instance holds the lease.
+        """
+        if self._held:
+            return True
+
+        if not self._supported:
+            # Single-process setups (SQLite tests, local dev) are always leader
+            self._held = True
+            return True
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+            # Don't leave the connection idle in transaction while we hold the lock
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+
+        self._connection = connection
+        self._held = True
+        logger.info(f"Acquired leader lease '{self.name}'")
+        return True
+
+    def is_held(self) -> bool:
+        """Check that the lease connection, and therefore the lock, is still alive."""
+        if not self._held:
+            return False
+        if self._connection is None:
+            return True
+
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Lost leader lease '{self.name}': {e}")
+            self._discard()
+            return False
+
+    def release(self) -> None:
+        """Give up the lease so a standby can take over."""
+        if not self._held:
+            return
+
+        if self._connection is not None:
+            try:
+                self._connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self.key}
+                )
+                self._connection.commit()
+                logger.info(f"Released leader lease '{self.name}'")
+            except Exception as e:
+                logger.warning(f"Failed to release leader lease '{self.name}': {e}")
+        self._discard()
+
+    def _discard(self) -> None:
+        if self._connection is not None:
+            try:
+                # Drop the DBAPI connection instead of returning it to the pool,
+                # so a lock we failed to unlock can't outlive the lease
+                self._connection.invalidate()
+                self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+        self._held = False
@@ -12,12 +12,15 @@ class LedgerService:
         self.db = db
         self.kyc_service = IdentityVerificationService()
 
-    def process_deposit(self, user_id: str, amount: float, tx_hash: str) -> dict:
+    def process_deposit(self, user_id: str, amount: float, tx_hash: str, commit: bool = True) -> dict:
         """
         Process a user deposit.
         1. Check JIT verification status.
         2. If OK -> Credit Balance.
         3. If RISKY -> Create Hold and PendingDeposit (status=HELD).
+
+        With commit=False changes are only flushed, leaving the commit to the
+        caller's surrounding transaction (e.g. an indexer batch).
         """
         # Check for existing processed tx to avoid double spend
         existing_deposit = self.db.query(PendingDeposit).filter(PendingDeposit.tx_hash == tx_hash).first()
@@ -50,7 +53,7 @@ class LedgerService:
             deposit_record.status = DepositStatus.HELD
             
             self.db.add(hold)
-            self.db.commit()
+            self._finish(commit)
             
             # Emit Alert (simulated log)
             logger.error(f"[ALERT] High Risk Deposit HELD: User {user_id}, Amount {amount}, Tx {tx_hash}")
@@ -72,7 +75,7 @@ class LedgerService:
             
             balance.amount += Decimal(str(amount)) # Use Decimal for precision
             
-            self.db.commit()
+            self._finish(commit)
             
             logger.info(f"Deposit processed successfully for user {user_id}. Amount: {amount}")
             return {
@@ -80,3 +83,9 @@ class LedgerService:
                 "detail": "Deposit credited to balance.",
                 "new_balance": float(balance.amount)
             }
+
+    def _finish(self, commit: bool) -> None:
+        if commit:
+            self.db.commit()
+        else:
+            self.db.flush()
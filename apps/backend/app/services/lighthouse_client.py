@@ -1,113 +1,236 @@
 """Lighthouse Web3 client for permanent file storage."""
 
+import asyncio
+import io
+import json
 import logging
 import os
-from tempfile import NamedTemporaryFile
-from typing import Optional
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Optional
 
-try:
-    from lighthouseweb3 import Lighthouse
-except ImportError:
-    Lighthouse = None
+import httpx
 
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import Counter, Gauge, Histogram
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from the source file per worker-thread call while streaming
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+UPLOADS_QUEUED = Gauge("valyra_lighthouse_uploads_queued", "Uploads waiting for a free upload slot")
+UPLOADS_IN_FLIGHT = Gauge("valyra_lighthouse_uploads_in_flight", "Uploads currently being sent")
+UPLOAD_QUEUE_SECONDS = Histogram(
+    "valyra_lighthouse_upload_queue_seconds", "Time uploads waited for a free slot"
+)
+UPLOAD_SECONDS = Histogram(
+    "valyra_lighthouse_upload_seconds", "Duration of Lighthouse uploads",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+UPLOADS = Counter("valyra_lighthouse_uploads", "Lighthouse uploads by result", ["result"])
+
+
+def _remaining_size(fileobj: BinaryIO) -> Optional[int]:
+    """Bytes left from the current position, or None if the file can't seek."""
+    try:
+        position = fileobj.tell()
+        end = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return end - position
 
-class LighthouseClient:
-    """Client for interacting with Lighthouse Web3 storage."""
 
-    def __init__(self, api_key: Optional[str] = None):
+class LighthouseClient:
+    """Client for interacting with Lighthouse Web3 storage.
+
+    Files are posted to the Lighthouse node's ``/api/v0/add`` endpoint as
+    multipart bodies read from a file object in chunks, so an upload never
+    needs the whole file in memory. The ``lighthouseweb3`` SDK reads the entire
+    file before sending it, which is why it isn't used here.
+
+    Everything runs on the event loop except file reads, which go through
+    worker threads because a spooled upload may have rolled over to disk. At
+    most `max_concurrent_uploads` uploads are sent at once; the rest wait
+    their turn, which the queue metrics expose.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        node_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_concurrent_uploads: Optional[int] = None,
+    ):
         """Initialize Lighthouse client.
 
         Args:
             api_key: Lighthouse API Key. If None, uses settings.
+            node_url: Lighthouse node URL. If None, uses settings.
+            http_client: HTTP client to send requests with. If None, uses the shared pool.
+            max_concurrent_uploads: Uploads sent at once. If None, uses settings.
         """
         self.api_key = api_key or settings.lighthouse_api_key
-        self.client = None
-        self._initialized = False
-
-        if Lighthouse is None:
-            logger.warning(
-                "lighthouseweb3 not installed. Lighthouse functionality disabled."
-            )
-            return
-
-        if self.api_key:
-            self.client = Lighthouse(token=self.api_key)
-            self._initialized = True
-            logger.info("Lighthouse client initialized successfully")
-        else:
+        self.node_url = (node_url or settings.lighthouse_node_url).rstrip("/")
+        self.timeout = settings.lighthouse_upload_timeout
+        self.max_concurrent_uploads = max_concurrent_uploads or settings.lighthouse_max_concurrent_uploads
+        self._http_client = http_client
+        self._slots = asyncio.Semaphore(self.max_concurrent_uploads)
+        self._queued = 0
+        self._in_flight = 0
+
+        if not self.api_key:
             logger.warning("Lighthouse API Key not configured")
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
     def is_configured(self) -> bool:
         """Check if Lighthouse client is properly configured.
 
         Returns:
             True if client is initialized and ready to use.
         """
-        return self._initialized and self.client is not None
+        return bool(self.api_key)
 
     async def upload_file(
         self, file_bytes: bytes, filename: str = "upload"
     ) -> dict:
-        """Upload file to Lighthouse.
+        """Upload in-memory content to Lighthouse.
 
         Args:
             file_bytes: File content as bytes
-            filename: Name of the file (used for temporary file)
+            filename: Name of the file
+
+        Returns:
+            Dictionary containing upload info (Hash, Name, Size)
+        """
+        return await self.upload_stream(io.BytesIO(file_bytes), filename)
+
+    async def upload_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str = "upload",
+        content_type: str = "application/octet-stream",
+    ) -> dict:
+        """Upload a file object to Lighthouse, streaming it from its current position.
+
+        Args:
+            fileobj: Readable binary file, e.g. an upload's spooled temp file
+            filename: Name of the file
+            content_type: MIME type sent with the multipart part
 
         Returns:
             Dictionary containing upload info (Hash, Name, Size)
 
         Raises:
             RuntimeError: If Lighthouse is not configured
+            httpx.HTTPError: If the upload request fails
         """
         if not self.is_configured():
             raise RuntimeError(
                 "Lighthouse client not configured. Please set LIGHTHOUSE_API_KEY."
             )
 
-        try:
-            # Lighthouse SDK usually expects a file path
-            # Create a temporary file to upload
-            with NamedTemporaryFile(delete=False, prefix="lighthouse_", suffix=f"_{filename}") as temp_file:
-                temp_file.write(file_bytes)
-                temp_path = temp_file.name
-
+        async with self._upload_slot():
+            logger.info(f"Uploading file to Lighthouse: {filename}")
+            started = time.perf_counter()
             try:
-                logger.info(f"Uploading file to Lighthouse: {filename}")
-                response = self.client.upload(source=temp_path)
-                
-                # Response format from SDK:
-                # {
-                #   'data': {
-                #     'Name': 'filename',
-                #     'Hash': 'QmW...',
-                #     'Size': '123'
-                #   }
-                # }
-                # Or sometimes just the dict directly depending on version
-                
-                logger.info(f"Upload successful: {response}")
-                
-                data = response.get("data", response)
-                return data
-
+                headers, body = await self._multipart(fileobj, filename, content_type)
+                headers["Authorization"] = f"Bearer {self.api_key}"
+                response = await self.http.post(
+                    f"{self.node_url}/api/v0/add",
+                    headers=headers,
+                    content=body,
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                UPLOADS.inc(result="error")
+                logger.error(f"Failed to upload file to Lighthouse: {e}")
+                raise
             finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-
-        except Exception as e:
-            logger.error(f"Failed to upload file to Lighthouse: {e}")
-            raise
+                UPLOAD_SECONDS.observe(time.perf_counter() - started)
+
+        UPLOADS.inc(result="success")
+        data = self._parse_add_response(response.text)
+        logger.info(f"Upload successful: {data}")
+        return data
+
+    @asynccontextmanager
+    async def _upload_slot(self):
+        """Wait for one of the concurrent upload slots, tracking queue metrics."""
+        self._queued += 1
+        UPLOADS_QUEUED.set(self._queued)
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+            UPLOADS_QUEUED.set(self._queued)
+        UPLOAD_QUEUE_SECONDS.observe(time.perf_counter() - started)
+
+        self._in_flight += 1
+        UPLOADS_IN_FLIGHT.set(self._in_flight)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            UPLOADS_IN_FLIGHT.set(self._in_flight)
+            self._slots.release()
+
+    @staticmethod
+    async def _multipart(
+        fileobj: BinaryIO, filename: str, content_type: str
+    ) -> tuple[dict, AsyncIterator[bytes]]:
+        """Headers and a streaming body for a single-file multipart/form-data request.
+
+        httpx reads file objects given as `files=` synchronously on the event
+        loop, so the body is built here and each chunk is read in a worker thread.
+        """
+        boundary = os.urandom(16).hex()
+        quoted = filename.replace("\\", "\\\\").replace('"', '\\"')
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{quoted}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        size = await asyncio.to_thread(_remaining_size, fileobj)
+        if size is not None:
+            headers["Content-Length"] = str(len(head) + size + len(tail))
+
+        async def body() -> AsyncIterator[bytes]:
+            yield head
+            while chunk := await asyncio.to_thread(fileobj.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+            yield tail
+
+        return headers, body()
+
+    @staticmethod
+    def _parse_add_response(text: str) -> dict:
+        """Read the added file's entry from an ``/api/v0/add`` response.
+
+        The node answers with one JSON object per added entry (newline
+        delimited). The uploaded file comes first, before any wrapping directory.
+        """
+        lines = [line for line in text.splitlines() if line.strip()]
+        if not lines:
+            raise RuntimeError("Upload failed: empty response from Lighthouse")
+        data = json.loads(lines[0])
+        # Older SDK-style responses wrap the entry in "data"
+        return data.get("data", data)
 
     def get_file_info(self, cid: str) -> dict:
         """Get information about a file on Lighthouse.
-        
-        Note: The Python SDK might not have a direct 'get_info' method readily available 
+
+        Note: The Python SDK might not have a direct 'get_info' method readily available
         in all versions, but we can implement basic status checks if needed.
         For now, we'll assume availability via gateway check.
         """
@@ -0,0 +1,239 @@
+"""Redis read-through cache for listing responses.
+
+GET /listings pages and listing details are cached as serialized JSON bodies,
+so a hit skips both the database and Pydantic. Pages are keyed on their
+normalized query parameters, details on the listing id.
+
+Every entry is tagged with a generation counter: a detail with its listing's
+counter, a page with one counter shared by all pages (any listing change can
+move listings in or out of any page). Invalidating bumps the counters. A
+lookup reads the entry together with its counter in one MGET and ignores
+entries from an older generation, so a response built from rows read before
+an invalidation is never served after it.
+
+Entries are fresh for `listing_cache_ttl` seconds. For `listing_cache_stale_ttl`
+seconds after that they are still served while one request rebuilds them in
+the background. Redis failures never fail a request: lookups fall through to
+the database and Redis is skipped for a short while.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional
+
+from fastapi import Response
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LIST_GENERATION_KEY = "listings:generation:list"
+# Seconds Redis is skipped after an error
+RETRY_AFTER = 30
+# Seconds one background refresh of an entry may take before another can start
+REFRESH_LOCK_SECONDS = 30
+
+CACHE_REQUESTS = Counter(
+    "valyra_listing_cache_requests", "Listing response cache lookups by result", ["endpoint", "result"]
+)
+CACHE_INVALIDATIONS = Counter(
+    "valyra_listing_cache_invalidations", "Listing response cache invalidations by source", ["source"]
+)
+
+
+@dataclass
+class CachedResponse:
+    """A JSON response body with the headers that go with it."""
+
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def to_response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+@dataclass
+class _Entry:
+    generation: int
+    fresh_until: float
+    response: CachedResponse
+
+    def encode(self) -> bytes:
+        meta = {"generation": self.generation, "fresh_until": self.fresh_until, "headers": self.response.headers}
+        return json.dumps(meta).encode() + b"\n" + self.response.body
+
+    @classmethod
+    def decode(cls, raw: Optional[bytes]) -> Optional["_Entry"]:
+        if raw is None:
+            return None
+        meta, _, body = raw.partition(b"\n")
+        meta = json.loads(meta)
+        return cls(meta["generation"], meta["fresh_until"], CachedResponse(body, meta["headers"]))
+
+
+def list_key(params: dict) -> str:
+    """Cache key of a GET /listings page; list parameters match in any order."""
+    normalized = {
+        name: sorted(value) if isinstance(value, list) else value
+        for name, value in params.items() if value is not None
+    }
+    digest = hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    return f"listings:list:{digest}"
+
+
+def detail_key(listing_id) -> str:
+    return f"listings:detail:{listing_id}"
+
+
+def _generation_key(listing_id) -> str:
+    return f"listings:generation:{listing_id}"
+
+
+Build = Callable[[Session], CachedResponse]
+
+
+class ListingCache:
+    """Read-through cache of listing responses, shared through Redis."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        session_factory=None,
+        client: Optional[Redis] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            redis_url: Redis to store entries in. If None, uses settings.
+            ttl: Seconds an entry is fresh. If None, uses settings.
+            stale_ttl: Seconds a stale entry is still served. If None, uses settings.
+            session_factory: Sessions for background refreshes. Defaults to SessionLocal.
+            client: Redis client to use. If None, one is created on first use.
+        """
+        self.redis_url = redis_url or settings.redis_url
+        self.ttl = settings.listing_cache_ttl if ttl is None else ttl
+        self.stale_ttl = settings.listing_cache_stale_ttl if stale_ttl is None else stale_ttl
+        self.session_factory = session_factory or SessionLocal
+        self._client = client
+        self._retry_at = 0.0
+        self._refreshes: set = set()
+
+    @property
+    def client(self) -> Redis:
+        if self._client is None:
+            self._client = Redis.from_url(self.redis_url, socket_connect_timeout=1, socket_timeout=1)
+        return self._client
+
+    def is_enabled(self) -> bool:
+        return settings.listing_cache_enabled
+
+    async def get_list(self, params: dict, build: Build, db: Session) -> CachedResponse:
+        """A GET /listings page, from the cache or built with `build(db)` and stored."""
+        return await self._get("list", list_key(params), LIST_GENERATION_KEY, build, db)
+
+    async def get_detail(self, listing_id, build: Build, db: Session) -> CachedResponse:
+        """A listing's detail response, from the cache or built with `build(db)` and stored."""
+        return await self._get("detail", detail_key(listing_id), _generation_key(listing_id), build, db)
+
+    async def invalidate(self, listing_ids: Iterable = (), source: str = "api") -> None:
+        """Drop every cached page and the details of `listing_ids`.
+
+        Call after the change is committed. If Redis can't be reached the
+        error is logged and entries may be served until they expire.
+        """
+        if not self.is_enabled():
+            return
+        keys = [LIST_GENERATION_KEY, *(_generation_key(listing_id) for listing_id in listing_ids)]
+        # Outlives every entry tagged with the previous value, so an expired
+        # counter can't make an old entry current again
+        expiry = 2 * (self.ttl + self.stale_ttl)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(key)
+                    pipe.expire(key, expiry)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to invalidate listing cache: {e}")
+            return
+        CACHE_INVALIDATIONS.inc(source=source)
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get(self, endpoint: str, key: str, generation_key: str, build: Build, db: Session) -> CachedResponse:
+        if not self.is_enabled() or time.monotonic() < self._retry_at:
+            CACHE_REQUESTS.inc(endpoint=endpoint, result="bypass")
+            return build(db)
+
+        try:
+            raw, generation = await self.client.mget(key, generation_key)
+        except RedisError as e:
+            self._fail(e)
+            CACHE_REQUESTS.inc(endpoint=endpoint, result="bypass")
+            return build(db)
+
+        generation = int(generation or 0)
+        entry = _Entry.decode(raw)
+        if entry is not None and entry.generation == generation:
+            if time.time() < entry.fresh_until:
+                CACHE_REQUESTS.inc(endpoint=endpoint, result="hit")
+            else:
+                CACHE_REQUESTS.inc(endpoint=endpoint, result="stale")
+                self._start_refresh(key, generation_key, build)
+            return entry.response
+
+        CACHE_REQUESTS.inc(endpoint=endpoint, result="miss")
+        response = build(db)
+        await self._store(key, generation, response)
+        return response
+
+    async def _store(self, key: str, generation: int, response: CachedResponse) -> None:
+        entry = _Entry(generation, time.time() + self.ttl, response)
+        try:
+            await self.client.set(key, entry.encode(), ex=self.ttl + self.stale_ttl)
+        except RedisError as e:
+            self._fail(e)
+
+    def _start_refresh(self, key: str, generation_key: str, build: Build) -> None:
+        task = asyncio.create_task(self._refresh(key, generation_key, build))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _refresh(self, key: str, generation_key: str, build: Build) -> None:
+        """Rebuild a stale entry unless another request already is."""
+        try:
+            if not await self.client.set(f"{key}:refresh", 1, nx=True, ex=REFRESH_LOCK_SECONDS):
+                return
+            generation = int(await self.client.get(generation_key) or 0)
+            response = await asyncio.to_thread(self._build_detached, build)
+            await self._store(key, generation, response)
+        except Exception as e:
+            logger.warning(f"Failed to refresh listing cache entry {key}: {e}")
+
+    def _build_detached(self, build: Build) -> CachedResponse:
+        # The request's session is closed by the time a refresh runs
+        with self.session_factory() as db:
+            return build(db)
+
+    def _fail(self, error: Exception) -> None:
+        logger.warning(f"Listing cache unavailable, using the database for {RETRY_AFTER}s: {error}")
+        self._retry_at = time.monotonic() + RETRY_AFTER
+
+
+listing_cache = ListingCache()
@@ -0,0 +1,152 @@
+"""Gemini text embeddings for listings.
+
+Each listing is embedded from its name, description and tech stack into
+``Listing.embedding``, which an HNSW index serves for similar-listing lookups
+and the semantic half of hybrid search. Embeddings are computed in the
+background after a listing is created or edited, and in bulk by
+``python -m app.embeddings backfill``.
+"""
+
+import logging
+from typing import List, Optional
+from uuid import UUID
+
+import google.generativeai as genai
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.database import SessionLocal
+from app.models.listing import EMBEDDING_DIMENSIONS, Listing
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS = Counter(
+    "valyra_listing_embeddings", "Listing embedding requests by kind and result", ["kind", "result"]
+)
+
+# Fields whose changes make a listing's embedding stale
+EMBEDDED_FIELDS = ("asset_name", "description", "tech_stack")
+
+
+def embedding_text(listing: Listing) -> str:
+    """Text a listing is embedded from."""
+    parts = [listing.asset_name, listing.description]
+    if listing.tech_stack:
+        stack = []
+        for key, value in listing.tech_stack.items():
+            if isinstance(value, (list, tuple)):
+                value = ", ".join(map(str, value))
+            stack.append(f"{key}: {value}")
+        parts.append("Tech stack: " + "; ".join(stack))
+    return "\n\n".join(part for part in parts if part)
+
+
+class ListingEmbedder:
+    """Computes and stores listing embeddings.
+
+    Database work happens in short sessions of its own, so no connection is
+    held while waiting on the embedding API.
+    """
+
+    def __init__(self, model: Optional[str] = None, session_factory=None):
+        self.model = model or settings.listing_embedding_model
+        self.session_factory = session_factory or SessionLocal
+        self._configured = False
+
+    def is_enabled(self) -> bool:
+        return settings.listing_embeddings_enabled
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embedding of a search query, comparable with listing embeddings."""
+        try:
+            (embedding,) = await self._embed([text], "retrieval_query")
+        except Exception:
+            EMBEDDINGS.inc(kind="query", result="error")
+            raise
+        EMBEDDINGS.inc(kind="query", result="success")
+        return embedding
+
+    async def refresh(self, listing_id: UUID) -> bool:
+        """Re-embed one listing. Meant to run as a background task, so errors are logged.
+
+        Returns:
+            True if an embedding was stored.
+        """
+        try:
+            with self.session_factory() as db:
+                listing = db.get(Listing, listing_id)
+                if listing is None:
+                    return False
+                text = embedding_text(listing)
+
+            (embedding,) = await self._embed([text], "retrieval_document")
+
+            with self.session_factory() as db:
+                self._store(db, listing_id, embedding)
+                db.commit()
+        except Exception as e:
+            EMBEDDINGS.inc(kind="listing", result="error")
+            logger.error(f"Failed to embed listing {listing_id}: {e}")
+            return False
+
+        EMBEDDINGS.inc(kind="listing", result="success")
+        return True
+
+    async def backfill(self, batch_size: Optional[int] = None, force: bool = False) -> int:
+        """Embed every listing that has no embedding yet, or all of them with `force`.
+
+        Listings are walked in id order and embedded one request per batch.
+
+        Returns:
+            Number of listings embedded.
+        """
+        batch_size = batch_size or settings.listing_embedding_batch_size
+        embedded = 0
+        after: Optional[UUID] = None
+        while True:
+            with self.session_factory() as db:
+                query = db.query(Listing).order_by(Listing.id)
+                if not force:
+                    query = query.filter(Listing.embedding.is_(None))
+                if after is not None:
+                    query = query.filter(Listing.id > after)
+                batch = [(listing.id, embedding_text(listing)) for listing in query.limit(batch_size)]
+            if not batch:
+                return embedded
+
+            embeddings = await self._embed([text for _, text in batch], "retrieval_document")
+            with self.session_factory() as db:
+                for (listing_id, _), embedding in zip(batch, embeddings):
+                    self._store(db, listing_id, embedding)
+                db.commit()
+
+            EMBEDDINGS.inc(len(batch), kind="listing", result="success")
+            embedded += len(batch)
+            after = batch[-1][0]
+            logger.info(f"Embedded {embedded} listings")
+
+    @staticmethod
+    def _store(db, listing_id: UUID, embedding: List[float]) -> None:
+        # Keep updated_at: a new embedding isn't an edit of the listing
+        db.query(Listing).filter(Listing.id == listing_id).update(
+            {Listing.embedding: embedding, Listing.updated_at: Listing.updated_at},
+            synchronize_session=False,
+        )
+
+    async def _embed(self, contents: List[str], task_type: str) -> List[List[float]]:
+        if not self._configured:
+            genai.configure(api_key=settings.gemini_api_key.get_secret_value())
+            self._configured = True
+        result = await genai.embed_content_async(
+            model=self.model,
+            content=contents,
+            task_type=task_type,
+            output_dimensionality=EMBEDDING_DIMENSIONS,
+        )
+        embeddings = result["embedding"]
+        if len(embeddings) != len(contents) or any(len(e) != EMBEDDING_DIMENSIONS for e in embeddings):
+            raise ValueError(f"Unexpected embedding response from {self.model}")
+        return embeddings
+
+
+listing_embedder = ListingEmbedder()
@@ -0,0 +1,323 @@
+"""Filtering, sorting, keyset pagination and full-text search for listing queries."""
+import html
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Float, case, func, literal_column, or_, tuple_
+from sqlalchemy.orm import Query, Session, undefer
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.listing import Listing
+from app.schemas.listing import ListingFilters, ListingSort
+
+# sort -> (column, descending, parse a cursor value back into the column's type)
+SORT_KEYS = {
+    ListingSort.NEWEST: (Listing.created_at, True, datetime.fromisoformat),
+    ListingSort.PRICE_ASC: (Listing.asking_price, False, Decimal),
+    ListingSort.PRICE_DESC: (Listing.asking_price, True, Decimal),
+    ListingSort.MRR_DESC: (Listing.mrr, True, Decimal),
+    ListingSort.REVENUE_DESC: (Listing.annual_revenue, True, Decimal),
+}
+
+_RANGES = (
+    ("price", Listing.asking_price),
+    ("mrr", Listing.mrr),
+    ("annual_revenue", Listing.annual_revenue),
+)
+_FLAGS = ("domain_included", "source_code_included", "customer_data_included")
+
+SEARCH_CONFIG = "english"
+# Config for the unstemmed form of prefix terms
+PREFIX_CONFIG = "simple"
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+# Matches are first delimited with private-use characters, which html.escape
+# leaves alone, and only turned into tags once the text has been escaped
+_MATCH_START, _MATCH_STOP = "\ue000", "\ue001"
+_HEADLINE_OPTIONS = f"StartSel={_MATCH_START}, StopSel={_MATCH_STOP}"
+_DESCRIPTION_HEADLINE_OPTIONS = _HEADLINE_OPTIONS + ", MaxFragments=2, MinWords=8, MaxWords=24"
+# Generated tsvector column, Postgres only (added by migration cf3a4b5c6d7e,
+# not mapped on the model so SQLite test databases can still be created)
+_SEARCH_VECTOR = literal_column("listings.search_vector")
+
+# Reciprocal rank fusion constant for hybrid search, and how many candidates
+# each side contributes per requested result
+RRF_K = 60
+HYBRID_CANDIDATES_PER_RESULT = 3
+
+
+def apply_filters(query: Query, filters: ListingFilters) -> Query:
+    """Narrow a Listing query to rows matching every set filter."""
+    if filters.status:
+        query = query.filter(Listing.status == filters.status)
+    if filters.asset_type:
+        query = query.filter(Listing.asset_type.in_(filters.asset_type))
+    if filters.revenue_trend:
+        query = query.filter(Listing.revenue_trend.in_(filters.revenue_trend))
+
+    for name, column in _RANGES:
+        low, high = getattr(filters, f"min_{name}"), getattr(filters, f"max_{name}")
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+
+    for flag in _FLAGS:
+        value = getattr(filters, flag)
+        if value is not None:
+            query = query.filter(getattr(Listing, flag) == value)
+    return query
+
+
+def paginate(
+    query: Query, sort: ListingSort, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Listing], Optional[str]]:
+    """Fetch one page in `sort` order, starting after `cursor`.
+
+    Rows are ordered by the sort column with id as a tie-breaker, and the
+    cursor holds both for the last row, so each page is an index range scan.
+
+    Returns:
+        The page and the cursor for the next one, or None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    column, descending, parse = SORT_KEYS[sort]
+    key = tuple_(column, Listing.id)
+
+    if cursor:
+        try:
+            cursor_sort, value, listing_id = decode_cursor(cursor)
+            if cursor_sort != sort.value:
+                raise ValueError("Cursor belongs to a different sort")
+            # Only tokens from encode_cursor are valid; they hold strings
+            if not isinstance(value, str) or not isinstance(listing_id, str):
+                raise ValueError("Invalid cursor")
+            after = (parse(value), UUID(listing_id))
+        except (TypeError, ArithmeticError) as e:
+            raise ValueError("Invalid cursor") from e
+        query = query.filter(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(column.desc(), Listing.id.desc())
+    else:
+        query = query.order_by(column.asc(), Listing.id.asc())
+
+    # One extra row tells whether another page follows
+    listings = query.limit(limit + 1).all()
+    if len(listings) <= limit:
+        return listings, None
+
+    listings = listings[:limit]
+    last = listings[-1]
+    value = getattr(last, column.key)
+    value = value.isoformat() if isinstance(value, datetime) else str(value)
+    return listings, encode_cursor([sort.value, value, str(last.id)])
+
+
+@dataclass
+class SearchHit:
+    """A listing matched by `search`, with its relevance and highlighted fields."""
+
+    listing: Listing
+    rank: float
+    highlights: Dict[str, str]
+
+
+def search_terms(text: str) -> List[str]:
+    """Words of a search query, lowercased and stripped of tsquery syntax."""
+    return re.findall(r"\w+", text.lower())
+
+
+def search(
+    db: Session,
+    text: str,
+    filters: ListingFilters,
+    limit: int,
+    embedding: Optional[List[float]] = None,
+) -> List[SearchHit]:
+    """Listings matching every word of `text`, best match first.
+
+    Each word also matches as a prefix, so partial words typed into a search
+    box find results. On Postgres the query is answered from the GIN index
+    on the weighted `search_vector` column, where asset name matches (weight
+    A) outrank description matches (weight B). Other databases fall back to
+    a substring scan ranked in Python, which is only meant for tests and
+    local development.
+
+    With the query's `embedding`, the search is hybrid: keyword matches and
+    the listings nearest to the embedding are merged by reciprocal rank
+    fusion, so listings about the same thing in other words are found too.
+    Their `rank` is then the fused score, and listings found only by meaning
+    have no highlights.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    if embedding is None:
+        return _keyword_search(db, terms, filters, limit)
+
+    candidates = limit * HYBRID_CANDIDATES_PER_RESULT
+    keyword_hits = _keyword_search(db, terms, filters, candidates)
+    neighbours = nearest(db, embedding, filters, candidates)
+
+    scores: Dict[UUID, float] = {}
+    hits: Dict[UUID, SearchHit] = {}
+    for position, hit in enumerate(keyword_hits):
+        scores[hit.listing.id] = 1 / (RRF_K + position + 1)
+        hits[hit.listing.id] = hit
+    for position, (listing, _) in enumerate(neighbours):
+        scores[listing.id] = scores.get(listing.id, 0) + 1 / (RRF_K + position + 1)
+        hits.setdefault(listing.id, SearchHit(listing=listing, rank=0, highlights={}))
+
+    ranked = sorted(hits, key=lambda listing_id: (-scores[listing_id], str(listing_id)))[:limit]
+    return [
+        SearchHit(listing=hits[listing_id].listing, rank=scores[listing_id], highlights=hits[listing_id].highlights)
+        for listing_id in ranked
+    ]
+
+
+def nearest(
+    db: Session,
+    embedding: List[float],
+    filters: ListingFilters,
+    limit: int,
+    exclude_id: Optional[UUID] = None,
+) -> List[Tuple[Listing, float]]:
+    """Embedded listings closest to `embedding`, with their cosine similarity.
+
+    On Postgres this is an approximate search over the HNSW index. Filters
+    are applied to the index's candidates, so a very selective filter can
+    return fewer than `limit` listings. Other databases compare every
+    embedding in Python, which is only meant for tests and local development.
+    """
+    query = apply_filters(db.query(Listing), filters).filter(Listing.embedding.isnot(None))
+    if exclude_id is not None:
+        query = query.filter(Listing.id != exclude_id)
+
+    if db.get_bind().dialect.name == "postgresql":
+        distance = Listing.embedding.op("<=>", return_type=Float)(embedding).label("distance")
+        rows = query.add_columns(distance).order_by(distance).limit(limit).all()
+        return [(listing, 1 - float(d)) for listing, d in rows]
+
+    matches = [
+        (listing, _cosine_similarity(embedding, listing.embedding))
+        for listing in query.options(undefer(Listing.embedding))
+    ]
+    matches.sort(key=lambda match: -match[1])
+    return matches[:limit]
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+def _render_highlight(marked: str) -> str:
+    """HTML-escape text with delimited matches and wrap the matches in tags."""
+    return html.escape(marked).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_STOP, HIGHLIGHT_STOP)
+
+
+def _keyword_search(
+    db: Session, terms: List[str], filters: ListingFilters, limit: int
+) -> List[SearchHit]:
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, terms, filters, limit)
+    return _search_fallback(db, terms, filters, limit)
+
+
+def _prefix_tsquery(terms: List[str]):
+    """tsquery matching documents with a word starting with each term.
+
+    Stemming a prefix can change it into something that no longer prefixes
+    the stems it should match ("analy" becomes "anali", missing "analyt"),
+    so each term matches either its stemmed or its unstemmed prefix.
+
+    Stopwords ("for", "the") stay optional as with a plain english tsquery:
+    their english query is empty, so they get no unstemmed alternative, and
+    && ignores an empty operand. The search vector holds no stopwords, so an
+    unstemmed 'for':* would otherwise be required and never match.
+    """
+    tsquery = None
+    for term in terms:
+        prefix = f"{term}:*"
+        stemmed = func.to_tsquery(SEARCH_CONFIG, prefix)
+        either = case(
+            (func.numnode(stemmed) > 0, stemmed.op("||")(func.to_tsquery(PREFIX_CONFIG, prefix))),
+            else_=stemmed,
+        )
+        tsquery = either if tsquery is None else tsquery.op("&&")(either)
+    return tsquery
+
+
+def _search_postgres(
+    db: Session, terms: List[str], filters: ListingFilters, limit: int
+) -> List[SearchHit]:
+    tsquery = _prefix_tsquery(terms)
+    # Normalization 32 maps the rank into [0, 1)
+    rank = func.ts_rank_cd(_SEARCH_VECTOR, tsquery, 32).label("rank")
+    name = func.ts_headline(
+        SEARCH_CONFIG, Listing.asset_name, tsquery, _HEADLINE_OPTIONS + ", HighlightAll=true"
+    ).label("name_highlight")
+    description = func.ts_headline(
+        SEARCH_CONFIG, Listing.description, tsquery, _DESCRIPTION_HEADLINE_OPTIONS
+    ).label("description_highlight")
+
+    query = apply_filters(db.query(Listing, rank, name, description), filters)
+    rows = (
+        query.filter(_SEARCH_VECTOR.op("@@")(tsquery))
+        .order_by(rank.desc(), Listing.id)
+        .limit(limit)
+        .all()
+    )
+    return [
+        SearchHit(
+            listing=listing,
+            rank=float(score),
+            highlights={
+                "asset_name": _render_highlight(name_highlight),
+                "description": _render_highlight(description_highlight),
+            },
+        )
+        for listing, score, name_highlight, description_highlight in rows
+    ]
+
+
+def _search_fallback(
+    db: Session, terms: List[str], filters: ListingFilters, limit: int
+) -> List[SearchHit]:
+    query = apply_filters(db.query(Listing), filters)
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(or_(Listing.asset_name.ilike(pattern), Listing.description.ilike(pattern)))
+
+    # Prefix match at a word start, mirroring the `term:*` tsquery
+    word = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\w*", re.IGNORECASE)
+
+    def highlight(value: str) -> str:
+        value = value.replace(_MATCH_START, "").replace(_MATCH_STOP, "")
+        return _render_highlight(word.sub(lambda m: f"{_MATCH_START}{m.group(0)}{_MATCH_STOP}", value))
+
+    hits = []
+    for listing in query.all():
+        words = set(re.findall(r"\w+", f"{listing.asset_name} {listing.description}".lower()))
+        if not all(any(w.startswith(term) for w in words) for term in terms):
+            continue
+        name_matches = len(word.findall(listing.asset_name))
+        description_matches = len(word.findall(listing.description))
+        score = name_matches + 0.4 * description_matches
+        hits.append(SearchHit(
+            listing=listing,
+            rank=score / (score + 1),
+            highlights={
+                "asset_name": highlight(listing.asset_name),
+                "description": highlight(listing.description),
+            },
+        ))
+    hits.sort(key=lambda hit: (-hit.rank, str(hit.listing.id)))
+    return hits[:limit]
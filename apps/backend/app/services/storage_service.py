@@ -1,13 +1,125 @@
 """Unified storage service utilizing Lighthouse Web3 and IPFS."""
 
+import asyncio
+import io
 import logging
-from typing import Optional
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Optional
 
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.services.cid import CidBuilder, verify_cid
+from app.services.content_cache import ContentCache, DiskContentCache
+from app.services.content_index import ContentIndex
 from app.services.lighthouse_client import LighthouseClient
 from app.services.ipfs_client import IPFSClient
 
 logger = logging.getLogger(__name__)
 
+# Chunk size used when streaming content that is already in memory
+STREAM_CHUNK_SIZE = 64 * 1024
+# Chunk size used when reading an upload to compute its CID
+HASH_CHUNK_SIZE = 1024 * 1024
+
+UPLOADS_DEDUPLICATED = Counter(
+    "valyra_storage_uploads_deduplicated", "Uploads skipped because the CID was already pinned"
+)
+UPLOAD_CID_MISMATCHES = Counter(
+    "valyra_storage_upload_cid_mismatches", "Uploads Lighthouse pinned under a different CID than computed locally"
+)
+VERIFICATION_FAILURES = Counter(
+    "valyra_storage_verification_failures", "Downloaded content that didn't match its CID"
+)
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Leading bytes of the file types accepted for upload
+_SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+class ContentVerificationError(Exception):
+    """Content returned by a gateway doesn't hash to the requested CID."""
+
+
+class RangeNotSatisfiable(Exception):
+    """Requested byte range lies outside the content."""
+
+    def __init__(self, size: Optional[int] = None):
+        super().__init__(f"Range not satisfiable for content of size {size}")
+        self.size = size
+
+
+@dataclass
+class ContentStream:
+    """Status, headers and body iterator for a streamed download."""
+
+    body: AsyncIterator[bytes]
+    status_code: int = 200
+    media_type: str = "application/octet-stream"
+    headers: dict = field(default_factory=dict)
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """Resolve a single-range `Range` header to inclusive (start, end) offsets.
+
+    Returns None for headers we don't honour (other units, multiple ranges), in
+    which case the full content is served, as RFC 9110 allows.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the content
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable(size)
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+def sniff_content_type(content: bytes) -> str:
+    """Guess a MIME type from leading bytes, for content served from cache."""
+    for signature, media_type in _SIGNATURES:
+        if content.startswith(signature):
+            return media_type
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def _cid_of_file(fileobj: BinaryIO) -> tuple[str, int]:
+    """CID and size of a file from its current position, which is restored."""
+    position = fileobj.tell()
+    builder = CidBuilder()
+    while chunk := fileobj.read(HASH_CHUNK_SIZE):
+        builder.update(chunk)
+    fileobj.seek(position)
+    return builder.cid(), builder.size
+
+
+async def _iter_chunks(content: memoryview) -> AsyncIterator[bytes]:
+    for offset in range(0, len(content), STREAM_CHUNK_SIZE):
+        yield bytes(content[offset:offset + STREAM_CHUNK_SIZE])
+
 
 class StorageService:
     """Unified service for decentralized file storage and retrieval."""
@@ -16,16 +128,38 @@ class StorageService:
         self,
         lighthouse_client: Optional[LighthouseClient] = None,
         ipfs_client: Optional[IPFSClient] = None,
+        cache: Optional[ContentCache] = None,
+        disk_cache: Optional[DiskContentCache] = None,
+        content_index: Optional[ContentIndex] = None,
     ):
         """Initialize storage service.
 
         Args:
             lighthouse_client: LighthouseClient instance. If None, creates new instance.
             ipfs_client: IPFSClient instance. If None, creates new instance.
+            cache: Content cache keyed by CID. If None, creates one sized from settings.
+            disk_cache: Second cache tier on local disk. If None, one is created when
+                `storage_disk_cache_dir` is set.
+            content_index: Index of CIDs already uploaded. If None, uses the database.
         """
         self.lighthouse = lighthouse_client or LighthouseClient()
         self.ipfs = ipfs_client or IPFSClient()
-        self._cache: dict[str, bytes] = {}
+        # CIDs address immutable content, so cached bytes never go stale
+        if cache is None:
+            cache = ContentCache(
+                max_bytes=settings.storage_cache_max_bytes,
+                ttl=settings.storage_cache_ttl,
+                max_entry_bytes=settings.storage_cache_max_entry_bytes,
+            )
+        self.cache = cache
+
+        if disk_cache is None and settings.storage_disk_cache_dir:
+            disk_cache = DiskContentCache(
+                directory=settings.storage_disk_cache_dir,
+                max_bytes=settings.storage_disk_cache_max_bytes,
+            )
+        self.disk_cache = disk_cache
+        self.index = content_index or ContentIndex()
 
     async def upload(
         self, file_bytes: bytes, filename: str, content_type: str = "application/octet-stream"
@@ -45,6 +179,45 @@ class StorageService:
                 - size: File size in bytes
                 - content_type: MIME type
 
+        Raises:
+            RuntimeError: If Lighthouse is not configured
+        """
+        result = await self.upload_stream(
+            io.BytesIO(file_bytes), filename, content_type, size=len(file_bytes)
+        )
+        # The bytes are already in memory, so warm the caches for later downloads
+        await self._cache_content(result["cid"], file_bytes)
+        return result
+
+    async def upload_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        content_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        cid: Optional[str] = None,
+    ) -> dict:
+        """Upload a file object to Lighthouse without reading it into memory.
+
+        The content is streamed from the file's current position. It isn't
+        cached, since that would mean holding the whole file; the first
+        download fills the caches instead.
+
+        The CID is computed locally first. Content whose CID is already in the
+        index isn't sent again, and the result has ``deduplicated`` set. The
+        index is keyed on the local CID and records the CID Lighthouse pinned,
+        which is what the result holds.
+
+        Args:
+            fileobj: Readable binary file
+            filename: Original filename
+            content_type: MIME type
+            size: File size in bytes, if already known
+            cid: Locally computed CID, if already known (see `CidBuilder`)
+
+        Returns:
+            Same dictionary as `upload`, plus ``deduplicated``.
+
         Raises:
             RuntimeError: If Lighthouse is not configured
         """
@@ -53,28 +226,42 @@ class StorageService:
                 "Lighthouse storage not configured. Please set LIGHTHOUSE_API_KEY."
             )
 
-        logger.info(f"Uploading file to Lighthouse: {filename} ({len(file_bytes)} bytes)")
+        if cid is None or size is None:
+            cid, size = await asyncio.to_thread(_cid_of_file, fileobj)
+
+        pinned_cid = await asyncio.to_thread(self.index.lookup, cid)
+        deduplicated = pinned_cid is not None
+        if deduplicated:
+            logger.info(f"Skipping upload of {filename}: {cid} is already stored")
+            UPLOADS_DEDUPLICATED.inc()
+        else:
+            logger.info(f"Uploading file to Lighthouse: {filename} ({size} bytes)")
+
+            # Upload to Lighthouse
+            # Returns dict with 'Hash', 'Name', 'Size'
+            result = await self.lighthouse.upload_stream(fileobj, filename, content_type)
+            pinned_cid = result.get("Hash")
+
+            if not pinned_cid:
+                raise RuntimeError("Upload failed: No CID returned from Lighthouse")
 
-        # Upload to Lighthouse
-        # Returns dict with 'Hash', 'Name', 'Size'
-        result = await self.lighthouse.upload_file(file_bytes, filename)
-        cid = result.get("Hash")
-        
-        if not cid:
-            raise RuntimeError("Upload failed: No CID returned from Lighthouse")
+            if pinned_cid != cid:
+                # Different chunking on Lighthouse's side; the pinned CID is authoritative
+                logger.warning(f"Lighthouse returned {pinned_cid} for {filename}, expected {cid}")
+                UPLOAD_CID_MISMATCHES.inc()
+            await asyncio.to_thread(self.index.add, cid, pinned_cid, size, content_type)
+        cid = pinned_cid
 
         # Generate public URL via IPFS gateway
         url = self.ipfs.get_content_url(cid)
 
-        # Cache the content
-        self._cache[cid] = file_bytes
-
         return {
             "cid": cid,
             "url": url,
             "filename": filename,
-            "size": len(file_bytes),
+            "size": size,
             "content_type": content_type,
+            "deduplicated": deduplicated,
         }
 
     async def download(self, cid: str, use_cache: bool = True) -> bytes:
@@ -88,22 +275,161 @@ class StorageService:
             File content as bytes
         """
         # Check cache first
-        if use_cache and cid in self._cache:
-            logger.info(f"Returning cached content for: {cid}")
-            return self._cache[cid]
+        if use_cache:
+            cached = self.cache.get(cid)
+            if cached is not None:
+                logger.info(f"Returning cached content for: {cid}")
+                return cached
+
+            if self.disk_cache:
+                cached = await asyncio.to_thread(self.disk_cache.get, cid)
+                if cached is not None:
+                    logger.info(f"Returning disk-cached content for: {cid}")
+                    self.cache.set(cid, cached)
+                    return cached
 
         try:
             logger.info(f"Downloading from IPFS: {cid}")
-            content = await self.ipfs.get_content(cid)
+            if settings.ipfs_fallback_gateways_list:
+                # A gateway returning the wrong bytes loses the race to one that doesn't
+                content = await self.ipfs.get_content_with_fallback(
+                    cid, validate=lambda content: self._verify(cid, content)
+                )
+            else:
+                content = await self.ipfs.get_content(cid)
+                await self._verify(cid, content)
             
             if use_cache:
-                self._cache[cid] = content
+                await self._cache_content(cid, content)
                 
             return content
         except Exception as e:
             logger.error(f"Failed to download {cid}: {e}")
             raise
 
+    async def open_stream(
+        self, cid: str, range_header: Optional[str] = None, use_cache: bool = True
+    ) -> ContentStream:
+        """Open a download that yields content in chunks as it arrives.
+
+        Cached content is sliced and served locally. Otherwise gateway chunks
+        are relayed as they arrive, with any Range header forwarded. When
+        `use_cache` is set, full responses small enough to cache are teed into
+        the cache tiers once the last chunk has been sent.
+
+        Args:
+            cid: IPFS Content Identifier
+            range_header: Optional HTTP Range header from the client
+            use_cache: Whether to serve from and fill the content cache
+
+        Returns:
+            ContentStream ready to hand to a StreamingResponse
+
+        Raises:
+            RangeNotSatisfiable: If the range lies outside the content
+            httpx.HTTPError: If the gateway request fails
+        """
+        if use_cache:
+            content = self.cache.get(cid)
+            if content is None and self.disk_cache:
+                content = await asyncio.to_thread(self.disk_cache.get, cid)
+                if content is not None:
+                    self.cache.set(cid, content)
+            if content is not None:
+                logger.info(f"Streaming cached content for: {cid}")
+                return self._stream_bytes(content, range_header)
+
+        try:
+            response = await self.ipfs.open_stream(cid, range_header)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 416:
+                raise RangeNotSatisfiable() from e
+            raise
+
+        headers = {"Accept-Ranges": "bytes"}
+        for name in ("Content-Length", "Content-Range", "ETag"):
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        media_type = response.headers.get("Content-Type", "application/octet-stream")
+
+        # Only a complete body can be cached under its CID
+        tee = use_cache and response.status_code == 200
+        return ContentStream(
+            body=self._relay(cid, response, tee),
+            status_code=response.status_code,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    def _stream_bytes(self, content: bytes, range_header: Optional[str]) -> ContentStream:
+        size = len(content)
+        headers = {"Accept-Ranges": "bytes"}
+        byte_range = parse_byte_range(range_header, size) if range_header else None
+        view = memoryview(content)
+        status_code = 200
+        if byte_range:
+            start, end = byte_range
+            view = view[start:end + 1]
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(len(view))
+        return ContentStream(
+            body=_iter_chunks(view),
+            status_code=status_code,
+            media_type=sniff_content_type(content),
+            headers=headers,
+        )
+
+    async def _relay(self, cid: str, response, tee: bool) -> AsyncIterator[bytes]:
+        """Yield gateway chunks, optionally collecting them for the cache."""
+        chunks: Optional[list] = [] if tee else None
+        received = 0
+        try:
+            async for chunk in response.aiter_bytes():
+                if chunks is not None:
+                    received += len(chunk)
+                    if received > self.cache.max_entry_bytes:
+                        # Too big to cache; stop buffering but keep streaming
+                        chunks = None
+                    else:
+                        chunks.append(chunk)
+                yield chunk
+        finally:
+            await response.aclose()
+
+        # Reached only when the client consumed the whole body
+        if chunks is not None:
+            content = b"".join(chunks)
+            try:
+                await self._verify(cid, content)
+            except ContentVerificationError as e:
+                # Already sent, but keep it out of the cache
+                logger.error(str(e))
+                return
+            await self._cache_content(cid, content)
+
+    async def _verify(self, cid: str, content: bytes) -> None:
+        """Check downloaded content against its CID when verification is enabled.
+
+        Raises:
+            ContentVerificationError: If the content hashes to a different CID
+        """
+        if not settings.storage_verify_downloads:
+            return
+        if await asyncio.to_thread(verify_cid, cid, content) is False:
+            VERIFICATION_FAILURES.inc()
+            raise ContentVerificationError(f"Content received for {cid} does not match its CID")
+
+    async def _cache_content(self, cid: str, content: bytes) -> None:
+        """Store content in every cache tier."""
+        self.cache.set(cid, content)
+        if self.disk_cache:
+            try:
+                await asyncio.to_thread(self.disk_cache.set, cid, content)
+            except OSError as e:
+                # A full or read-only disk shouldn't fail the request
+                logger.warning(f"Failed to write {cid} to disk cache: {e}")
+
     def get_url(self, cid: str) -> str:
         """Get public URL for content.
 
@@ -116,8 +442,17 @@ class StorageService:
         return self.ipfs.get_content_url(cid)
 
     def clear_cache(self) -> None:
-        """Clear the content cache."""
-        self._cache.clear()
+        """Clear the in-memory and on-disk content caches."""
+        self.cache.clear()
+        if self.disk_cache:
+            self.disk_cache.clear()
+
+    def cache_stats(self) -> dict:
+        """Get hit, miss and eviction statistics for each cache tier."""
+        stats = {"memory": self.cache.stats()}
+        if self.disk_cache:
+            stats["disk"] = self.disk_cache.stats()
+        return stats
 
 # Global storage service instance
 storage_service = StorageService()
@@ -1,16 +1,275 @@
-"""Benchmark script for Storage Service."""
+"""Benchmark script for Storage Service.
 
+By default runs offline against an in-process stand-in for the Lighthouse
+upload API and an IPFS gateway, so it needs no API key or network. It sweeps
+file sizes, concurrency levels and cache modes, and reports latency
+percentiles, throughput and peak RSS for ``StorageService.upload`` and
+``download``::
+
+    python benchmark_storage.py --sizes 64K,1M,8M --concurrency 1,8,32 \\
+        --output results.json --baseline previous.json
+
+``--live`` keeps the original single upload/download against Lighthouse,
+which needs ``LIGHTHOUSE_API_KEY``.
+"""
+
+import argparse
 import asyncio
-import time
-import os
+import json
 import logging
-from app.services.storage_service import storage_service
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.services.cid import compute_cid
+from app.services.content_cache import ContentCache, DiskContentCache
+from app.services.ipfs_client import GatewayScoreboard, IPFSClient
+from app.services.lighthouse_client import LighthouseClient
+from app.services.storage_service import StorageService, storage_service
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-async def benchmark():
+CACHE_MODES = ("off", "memory", "disk")
+_UNITS = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+
+
+class FakeIPFS:
+    """In-process Lighthouse node and IPFS gateway sharing one content store.
+
+    Each request waits `latency` seconds plus the time to move its body at
+    `bandwidth` bytes per second, so results resemble a remote service
+    without depending on one.
+    """
+
+    def __init__(self, latency: float = 0.02, bandwidth: float = 50 * 1024 * 1024):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.store: Dict[str, bytes] = {}
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST" and request.url.path == "/api/v0/add":
+            body = await request.aread()
+            content = self._file_part(request, body)
+            await self._delay(len(body))
+            cid = compute_cid(content)
+            self.store[cid] = content
+            return httpx.Response(200, json={"Name": "file", "Hash": cid, "Size": str(len(content))})
+
+        if request.method == "GET" and request.url.path.startswith("/ipfs/"):
+            content = self.store.get(request.url.path.removeprefix("/ipfs/"))
+            if content is None:
+                return httpx.Response(404)
+            await self._delay(len(content))
+            return httpx.Response(200, content=content)
+
+        return httpx.Response(404)
+
+    async def _delay(self, size: int) -> None:
+        await asyncio.sleep(self.latency + size / self.bandwidth)
+
+    @staticmethod
+    def _file_part(request: httpx.Request, body: bytes) -> bytes:
+        boundary = request.headers["Content-Type"].split("boundary=", 1)[1].encode()
+        start = body.index(b"\r\n\r\n") + 4
+        end = body.rindex(b"\r\n--" + boundary + b"--")
+        return body[start:end]
+
+
+class MemoryContentIndex:
+    """Dedup index kept in memory, standing in for the database table."""
+
+    def __init__(self):
+        self._pinned: Dict[str, str] = {}
+
+    def lookup(self, cid: str) -> Optional[str]:
+        return self._pinned.get(cid)
+
+    def add(self, cid: str, pinned_cid: str, size: int, content_type: Optional[str] = None) -> None:
+        self._pinned[cid] = pinned_cid
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper().removesuffix("B")
+    if text[-1:] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of unsorted samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """Process high-water mark RSS; ru_maxrss is bytes on macOS, KiB elsewhere."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_service(fake: FakeIPFS, cache_mode: str, cache_dir: str) -> StorageService:
+    http = fake.client()
+    memory_bytes = 256 * 1024 * 1024 if cache_mode == "memory" else 0
+    disk_cache = None
+    if cache_mode == "disk":
+        disk_cache = DiskContentCache(tempfile.mkdtemp(dir=cache_dir), max_bytes=1024 * 1024 * 1024)
+    return StorageService(
+        lighthouse_client=LighthouseClient(
+            api_key="benchmark", node_url="https://lighthouse.bench", http_client=http
+        ),
+        ipfs_client=IPFSClient(
+            gateway_url="https://gateway.bench/ipfs/", http_client=http, scoreboard=GatewayScoreboard()
+        ),
+        cache=ContentCache(max_bytes=memory_bytes, max_entry_bytes=memory_bytes),
+        disk_cache=disk_cache,
+        content_index=MemoryContentIndex(),
+    )
+
+
+async def run_operations(operations, concurrency: int) -> List[float]:
+    """Run coroutine factories with at most `concurrency` in flight; return latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def timed(operation):
+        async with semaphore:
+            started = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(timed(operation) for operation in operations))
+    return latencies
+
+
+def summarize(latencies: List[float], elapsed: float, size: int) -> dict:
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ops_per_s": len(latencies) / elapsed,
+        "mb_per_s": len(latencies) * size / elapsed / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_scenario(
+    operation: str, size: int, concurrency: int, cache_mode: str, requests: int,
+    fake: FakeIPFS, cache_dir: str,
+) -> dict:
+    service = build_service(fake, cache_mode, cache_dir)
+
+    if operation == "upload":
+        # Distinct content per request, otherwise dedup would skip the uploads
+        payloads = [os.urandom(size) for _ in range(requests)]
+        operations = [
+            lambda payload=payload, i=i: service.upload(payload, f"bench-{i}.bin")
+            for i, payload in enumerate(payloads)
+        ]
+    else:
+        # A small working set downloaded repeatedly, so caching has something to hit
+        objects = max(1, requests // 4)
+        cids = [fake_cid(fake, os.urandom(size)) for _ in range(objects)]
+        operations = [lambda cid=cids[i % objects]: service.download(cid) for i in range(requests)]
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    latencies = await run_operations(operations, concurrency)
+    elapsed = time.perf_counter() - started
+
+    if service.disk_cache:
+        service.disk_cache.clear()
+    return {
+        "operation": operation,
+        "size_bytes": size,
+        "concurrency": concurrency,
+        "cache": cache_mode,
+        **summarize(latencies, elapsed, size),
+        # The process peak never goes down, so also record how much this scenario raised it
+        "peak_rss_growth_mb": peak_rss_mb() - rss_before,
+    }
+
+
+def fake_cid(fake: FakeIPFS, content: bytes) -> str:
+    """Seed content straight into the fake store, as if uploaded earlier."""
+    cid = compute_cid(content)
+    fake.store[cid] = content
+    return cid
+
+
+async def run_suite(
+    sizes: List[int],
+    concurrency_levels: List[int],
+    cache_modes: List[str],
+    requests: int,
+    latency: float,
+    bandwidth: float,
+) -> dict:
+    """Run every combination of operation, size, concurrency and cache mode."""
+    fake = FakeIPFS(latency=latency, bandwidth=bandwidth)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="storage-bench-") as cache_dir:
+        for operation in ("upload", "download"):
+            for size in sizes:
+                for concurrency in concurrency_levels:
+                    for cache_mode in cache_modes:
+                        result = await run_scenario(
+                            operation, size, concurrency, cache_mode, requests, fake, cache_dir
+                        )
+                        results.append(result)
+                        print(format_result(result))
+                fake.store.clear()
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests_per_scenario": requests,
+            "latency_s": latency,
+            "bandwidth_bytes_per_s": bandwidth,
+        },
+        "results": results,
+    }
+
+
+def scenario_key(result: dict) -> tuple:
+    return result["operation"], result["size_bytes"], result["concurrency"], result["cache"]
+
+
+def format_result(result: dict, baseline: Optional[dict] = None) -> str:
+    line = (
+        f"{result['operation']:<8} {result['size_bytes']:>10}B c={result['concurrency']:<3} "
+        f"cache={result['cache']:<6} p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms "
+        f"p99={result['p99_ms']:8.1f}ms {result['mb_per_s']:8.1f}MB/s rss={result['peak_rss_mb']:.0f}MB"
+    )
+    if baseline:
+        change = (result["p95_ms"] - baseline["p95_ms"]) / baseline["p95_ms"] * 100
+        line += f"  p95 {change:+.1f}% vs baseline"
+    return line
+
+
+def compare(report: dict, baseline_report: dict) -> None:
+    """Print each scenario next to the matching one from an earlier run."""
+    baseline = {scenario_key(result): result for result in baseline_report["results"]}
+    print("\nCompared with baseline:")
+    for result in report["results"]:
+        previous = baseline.get(scenario_key(result))
+        if previous:
+            print(format_result(result, previous))
+
+
+async def benchmark_live():
     print("=" * 60)
     print("Storage Service Benchmark (Lighthouse)")
     print("=" * 60)
@@ -24,7 +283,7 @@ async def benchmark():
     file_size_mb = 1
     file_bytes = os.urandom(file_size_mb * 1024 * 1024)
     filename = f"benchmark_{int(time.time())}.bin"
-    
+
     print(f"File size: {file_size_mb} MB")
 
     # Benchmark Upload
@@ -46,10 +305,10 @@ async def benchmark():
     print("\nStarting Download (Gateway)...")
     # Clear cache to force network request
     storage_service.clear_cache()
-    
+
     start_time = time.time()
     try:
-        # Note: Gateway might take time to propagate. 
+        # Note: Gateway might take time to propagate.
         # In a real benchmark we might retry loop here.
         content = await storage_service.download(cid)
         duration = time.time() - start_time
@@ -60,5 +319,47 @@ async def benchmark():
     except Exception as e:
         print(f"✗ Download Failed: {e}")
 
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark StorageService uploads and downloads")
+    parser.add_argument("--live", action="store_true", help="Run once against live Lighthouse instead")
+    parser.add_argument("--sizes", default="64K,1M,8M", help="Comma-separated file sizes")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--cache", default=",".join(CACHE_MODES), help="Cache modes: off, memory, disk")
+    parser.add_argument("--requests", type=int, default=32, help="Operations per scenario")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated round trip in seconds")
+    parser.add_argument("--bandwidth", default="50M", help="Simulated bytes per second")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    args.sizes = [parse_size(size) for size in args.sizes.split(",")]
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    args.cache = [mode.strip() for mode in args.cache.split(",")]
+    unknown = set(args.cache) - set(CACHE_MODES)
+    if unknown:
+        parser.error(f"unknown cache modes: {', '.join(sorted(unknown))}")
+    args.bandwidth = parse_size(args.bandwidth)
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.live:
+        asyncio.run(benchmark_live())
+        return
+
+    report = asyncio.run(run_suite(
+        args.sizes, args.concurrency, args.cache, args.requests, args.latency, args.bandwidth
+    ))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
 if __name__ == "__main__":
-    asyncio.run(benchmark())
+    main()
@@ -1,17 +1,26 @@
 """Pytest configuration and fixtures."""
+import os
 import sys
 from unittest.mock import MagicMock
 
+# Tests opt in to the listing cache with a fake Redis
+os.environ.setdefault("LISTING_CACHE_ENABLED", "false")
+
 # PATCH: Mock google-generativeai and protobuf to prevent Python 3.14 crash
 # This allows tests to run even if the environment has incompatible dependencies
 sys.modules["google.protobuf"] = MagicMock()
 sys.modules["google.generativeai"] = MagicMock()
 sys.modules["app.services.gemini_service"] = MagicMock()
 
+import importlib.util
+from pathlib import Path
+
 import pytest
 from typing import Generator
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from app.main import app
 from app.database import Base, get_db
@@ -28,6 +37,13 @@ engine = create_engine(
 # Create test session
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Postgres-only behaviour (full-text search) runs against this database when set
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+SEARCH_VECTOR_MIGRATION = (
+    Path(__file__).parent.parent / "alembic" / "versions"
+    / "20261017_1500_cf3a4b5c6d7e_add_listings_search_vector.py"
+)
+
 
 @pytest.fixture(scope="function")
 def db() -> Generator[Session, None, None]:
@@ -41,6 +57,31 @@ def db() -> Generator[Session, None, None]:
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def pg_db() -> Generator[Session, None, None]:
+    """Create a fresh Postgres schema, including the unmapped search vector, for each test."""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+
+    spec = importlib.util.spec_from_file_location("search_vector_migration", SEARCH_VECTOR_MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    pg_engine = create_engine(TEST_POSTGRES_URL)
+    with pg_engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        Base.metadata.create_all(bind=conn)
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=pg_engine)
+        pg_engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def client(db: Session) -> Generator[TestClient, None, None]:
     """Create a test client with database dependency override."""
@@ -0,0 +1,35 @@
+"""Smoke tests for the offline storage benchmark."""
+
+import pytest
+
+import benchmark_storage
+
+
+def test_parse_args():
+    """Test sizes and bandwidth accept unit suffixes."""
+    args = benchmark_storage.parse_args(["--sizes", "64K,1M,100", "--concurrency", "1,4", "--bandwidth", "10M"])
+
+    assert args.sizes == [64 * 1024, 1024 * 1024, 100]
+    assert args.concurrency == [1, 4]
+    assert args.bandwidth == 10 * 1024 * 1024
+    assert args.cache == ["off", "memory", "disk"]
+
+
+@pytest.mark.asyncio
+async def test_run_suite_offline():
+    """Test a small sweep runs against the in-process fakes and reports every scenario."""
+    report = await benchmark_storage.run_suite(
+        sizes=[1024], concurrency_levels=[1, 2], cache_modes=["off", "memory"],
+        requests=8, latency=0.001, bandwidth=1024 * 1024 * 1024,
+    )
+
+    results = report["results"]
+    assert len(results) == 2 * 2 * 2
+    for result in results:
+        assert result["requests"] == 8
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["mb_per_s"] > 0
+
+    # Downloads cycle over a small working set, so the memory cache serves most of them
+    downloads = {r["cache"]: r for r in results if r["operation"] == "download" and r["concurrency"] == 1}
+    assert downloads["memory"]["p50_ms"] < downloads["off"]["p50_ms"]
@@ -0,0 +1,83 @@
+"""Tests for local IPFS CID computation."""
+
+import pytest
+
+from app.services.cid import CHUNK_SIZE, MAX_LINKS, CidBuilder, compute_cid, is_cid, verify_cid
+
+HELLO = b"hello world\n"
+
+
+class TestComputeCid:
+    """Test cases for compute_cid and CidBuilder."""
+
+    @pytest.mark.parametrize("content,expected", [
+        (b"", "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"),
+        (HELLO, "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"),
+    ])
+    def test_matches_ipfs_add(self, content, expected):
+        """Test CIDs match what `ipfs add` assigns to well-known files."""
+        assert compute_cid(content) == expected
+
+    def test_incremental_updates_match_one_shot(self):
+        """Test feeding pieces that straddle chunk boundaries gives the same CID."""
+        content = bytes(range(256)) * (CHUNK_SIZE // 256 * 3 + 7)
+        builder = CidBuilder()
+        for offset in range(0, len(content), 100_000):
+            builder.update(content[offset:offset + 100_000])
+
+        assert builder.cid() == compute_cid(content)
+        assert builder.size == len(content)
+
+    def test_multi_chunk_files_get_a_root_node(self):
+        """Test files over one chunk and over one node's links hash differently from their parts."""
+        one_chunk = b"a" * CHUNK_SIZE
+        assert compute_cid(one_chunk + b"a") != compute_cid(one_chunk)
+
+        builder = CidBuilder()
+        for _ in range(MAX_LINKS + 1):
+            builder.update(one_chunk)
+        assert builder.cid().startswith("Qm")
+        assert builder.size == CHUNK_SIZE * (MAX_LINKS + 1)
+
+
+class TestIsCid:
+    """Test cases for is_cid."""
+
+    @pytest.mark.parametrize("cid", [
+        "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o",
+        "bafybeicg2rebjoofv4kbyovkw7af3rpiitvnl6i7ckcywaq6xjcxnc2mby",
+        "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2devei4",
+    ])
+    def test_accepts_cids(self, cid):
+        assert is_cid(cid)
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "../../anything",
+        "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o/../x",
+        "ipfs://QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o",
+        "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5",
+        "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2deve",
+        "BAFKREIFJJCIE6LYPI6NY7AMXNFFTAGCLBUXNDQONFIPMB64F2KM2DEVEI4",
+    ])
+    def test_rejects_everything_else(self, text):
+        assert not is_cid(text)
+
+
+class TestVerifyCid:
+    """Test cases for verify_cid."""
+
+    @pytest.mark.parametrize("cid", [
+        "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o",
+        "bafybeicg2rebjoofv4kbyovkw7af3rpiitvnl6i7ckcywaq6xjcxnc2mby",
+        "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2devei4",
+    ])
+    def test_accepts_matching_and_rejects_tampered_content(self, cid):
+        """Test CIDv0, dag-pb CIDv1 and raw CIDv1 are all checked."""
+        assert verify_cid(cid, HELLO) is True
+        assert verify_cid(cid, b"hello w0rld\n") is False
+
+    @pytest.mark.parametrize("cid", ["zdj7W", "QmShort", "not-a-cid"])
+    def test_unsupported_cids_are_not_judged(self, cid):
+        """Test CIDs that can't be decoded return None instead of failing."""
+        assert verify_cid(cid, HELLO) is None
@@ -1,6 +1,11 @@
 """Tests for health check endpoints."""
+from unittest.mock import MagicMock, PropertyMock
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
+from app.models.indexer import IndexerCursor
+from app.services.indexer import indexer
+
 
 def test_health_check(client: TestClient):
     """Test basic health check endpoint."""
@@ -31,3 +36,49 @@ def test_root_endpoint(client: TestClient):
     assert "message" in data
     assert "version" in data
     assert data["docs"] == "/docs"
+
+
+def watch_chain(monkeypatch, head):
+    """Point the module-level indexer at a fake node reporting `head`."""
+    async def block_number():
+        return head
+
+    w3 = MagicMock()
+    type(w3.eth).block_number = PropertyMock(side_effect=block_number)
+    monkeypatch.setattr(indexer, "w3", w3)
+    monkeypatch.setattr(indexer, "marketplace_contract", MagicMock())
+
+
+def test_health_check_indexer_reports_lag(client: TestClient, db, monkeypatch):
+    """Test indexer health reports cursor position and blocks behind head."""
+    watch_chain(monkeypatch, 1010)
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address="0xMarket", last_block=1000))
+    db.commit()
+
+    response = client.get("/api/v1/health/indexer")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["head_block"] == 1010
+    assert data["contracts"]["0xMarket"]["last_block"] == 1000
+    assert data["blocks_behind"] == 10
+
+
+def test_health_check_indexer_stalled(client: TestClient, db, monkeypatch):
+    """Test indexer health fails once the cursor falls too far behind."""
+    monkeypatch.setattr(settings, "indexer_max_lag_blocks", 50)
+    watch_chain(monkeypatch, 2000)
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address="0xMarket", last_block=1000))
+    db.commit()
+
+    response = client.get("/api/v1/health/indexer")
+    assert response.status_code == 503
+    assert response.json()["status"] == "lagging"
+
+
+def test_metrics_endpoint(client: TestClient):
+    """Test Prometheus metrics are exposed as text."""
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE valyra_indexer_blocks_behind gauge" in response.text
@@ -0,0 +1,97 @@
+"""Tests for the shared outbound HTTP client."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import http
+from app.core.http import PerHostLimitTransport
+from app.services.auth_service import GoogleAuthService
+from app.services.identity_verification import IdentityVerificationService
+from app.services.ipfs_client import IPFSClient
+
+
+class TestSharedHttpClient:
+    """Test cases for the pooled HTTP client."""
+
+    @pytest.mark.asyncio
+    async def test_shared_client_is_reused_until_closed(self):
+        """Test that callers share one client and a closed one is replaced."""
+        client = http.get_http_client()
+        assert http.get_http_client() is client
+
+        await http.close_http_client()
+
+        replacement = http.get_http_client()
+        assert replacement is not client
+        await http.close_http_client()
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit_caps_concurrency(self):
+        """Test that requests to one host wait for a free slot while others proceed."""
+        active = {"a.example": 0, "b.example": 0}
+        peak = {"a.example": 0, "b.example": 0}
+
+        async def handler(request):
+            host = request.url.host
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+            return httpx.Response(200, stream=httpx.ByteStream(b"ok"))
+
+        transport = PerHostLimitTransport(httpx.MockTransport(handler), max_per_host=2)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(
+                *(client.get("https://a.example/x") for _ in range(6)),
+                *(client.get("https://b.example/x") for _ in range(2)),
+            )
+
+        assert peak == {"a.example": 2, "b.example": 2}
+
+    @pytest.mark.asyncio
+    async def test_streamed_response_holds_slot_until_closed(self):
+        """Test that a streamed body keeps its slot until the response is closed."""
+        transport = PerHostLimitTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(b"ok"))),
+            max_per_host=1,
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://a.example/x") as response:
+                second = asyncio.create_task(client.get("https://a.example/y"))
+                await asyncio.sleep(0.01)
+                assert not second.done()
+                await response.aread()
+            assert (await second).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_services_use_injected_client(self):
+        """Test that an injected client is used instead of opening a new one."""
+        seen = []
+
+        def handler(request):
+            seen.append(str(request.url))
+            return httpx.Response(200, content=b"content")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            ipfs = IPFSClient(gateway_url="https://gw.example/ipfs/", http_client=client)
+            assert await ipfs.get_content("QmTest") == b"content"
+            assert await ipfs.check_availability("QmTest") is True
+
+        assert seen == ["https://gw.example/ipfs/QmTest"] * 2
+
+    @pytest.mark.asyncio
+    async def test_auth_provider_calls_keep_short_timeout(self):
+        """Test GitHub and Google calls don't inherit the shared client's longer timeout."""
+        timeouts = []
+
+        def handler(request):
+            timeouts.append(request.extensions["timeout"]["read"])
+            return httpx.Response(200, json={"id": "1"})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), timeout=30.0) as client:
+            await IdentityVerificationService(http_client=client).fetch_github_user("octocat")
+            await GoogleAuthService(http_client=client).get_user_info("token")
+
+        assert timeouts == [5.0, 5.0]
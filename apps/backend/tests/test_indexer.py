@@ -0,0 +1,610 @@
+"""Tests for the on-chain event indexer."""
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock, PropertyMock
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.escrow import Escrow, EscrowState
+from app.models.indexer import IndexerCursor, IndexerJournalEntry, ProcessedEvent
+from app.models.listing import Listing, ListingStatus, AssetType, RevenueTrend
+from app.models.user import User
+from app.services.indexer import IndexerService, RpcRateLimiter, ESCROW_ABI, MARKETPLACE_ABI
+from app.services import indexer as indexer_module
+from app.indexer import parse_args
+
+MARKETPLACE = "0x00000000000000000000000000000000000000AA"
+ESCROW = "0x00000000000000000000000000000000000000bb"
+
+marketplace_contract = Web3().eth.contract(address=MARKETPLACE, abi=MARKETPLACE_ABI)
+escrow_contract = Web3().eth.contract(address=ESCROW, abi=ESCROW_ABI)
+
+
+def make_log(contract, name, block, log_index=0, block_hash=None, **args):
+    """Encode a raw eth_getLogs entry for `contract.events.<name>`."""
+    event = getattr(contract.events, name)
+    inputs = event.abi["inputs"]
+    topics = [HexBytes(event.topic)] + [
+        HexBytes(encode([i["type"]], [args[i["name"]]])) for i in inputs if i["indexed"]
+    ]
+    data = [i for i in inputs if not i["indexed"]]
+    return {
+        "address": contract.address,
+        "topics": topics,
+        "data": HexBytes(encode([i["type"] for i in data], [args[i["name"]] for i in data])),
+        "blockNumber": block,
+        "logIndex": log_index,
+        "transactionIndex": 0,
+        "transactionHash": HexBytes(f"{block:060x}{log_index:04x}"),
+        "blockHash": HexBytes(block_hash or f"{block:064x}"),
+    }
+
+
+def serve_logs(indexer, logs):
+    """Answer eth_getLogs from a canned list, honouring the requested block range."""
+    calls = []
+
+    def get_logs(params):
+        calls.append(params)
+        return [
+            log for log in logs
+            if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+        ]
+
+    indexer.w3.eth.get_logs = AsyncMock(side_effect=get_logs)
+    return calls
+
+
+def set_head(indexer, head):
+    """Make `await w3.eth.block_number` return `head`."""
+    async def block_number():
+        return head
+
+    type(indexer.w3.eth).block_number = PropertyMock(side_effect=block_number)
+
+
+@pytest.fixture
+def indexer(db, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_block_window", 100)
+    monkeypatch.setattr(settings, "indexer_deployment_block", 1000)
+    service = IndexerService(session_factory=sessionmaker(bind=db.get_bind()))
+    service.escrow_contract = None
+    service.marketplace_contract = None
+    service.w3 = MagicMock()
+    service.forked_blocks = {}
+
+    async def get_block(number):
+        return {"hash": HexBytes(service.forked_blocks.get(number, f"{number:064x}"))}
+
+    service.w3.eth.get_block = AsyncMock(side_effect=get_block)
+    return service
+
+
+@pytest.fixture
+def listing(db):
+    seller = User(wallet_address="0xSeller")
+    db.add(seller)
+    db.commit()
+    listing = Listing(
+        seller_id=seller.id,
+        on_chain_id=7,
+        asset_name="Indexed Asset",
+        asset_type=AssetType.SAAS,
+        business_url="https://example.com",
+        description="Desc",
+        asking_price=1000,
+        mrr=100,
+        annual_revenue=1200,
+        monthly_profit=50,
+        monthly_expenses=50,
+        revenue_trend=RevenueTrend.STABLE,
+        status=ListingStatus.ACTIVE,
+    )
+    db.add(listing)
+    db.commit()
+    return listing
+
+
+async def test_catch_up_walks_windows_and_persists_cursor(indexer, db, listing, monkeypatch):
+    invalidate = AsyncMock()
+    monkeypatch.setattr(indexer_module.listing_cache, "invalidate", invalidate)
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1299)
+    calls = serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1050, listingId=7, newPrice=2 * 10**18, ipfsMetadata=""),
+        make_log(marketplace_contract, "ListingUpdated", 1250, listingId=7, newPrice=3 * 10**18, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    assert [(c["fromBlock"], c["toBlock"]) for c in calls] == [(1000, 1099), (1100, 1199), (1200, 1299)]
+    cursor = db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE))
+    assert cursor.last_block == 1299
+    db.refresh(listing)
+    assert float(listing.asking_price) == 3.0
+    # Cached listing responses are dropped after each window that changed the listing
+    assert invalidate.await_count == 2
+    invalidate.assert_awaited_with({listing.id}, source="indexer")
+
+
+async def test_check_events_resumes_from_cursor(indexer, db):
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address=MARKETPLACE, last_block=5000))
+    db.commit()
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 5020)
+    calls = serve_logs(indexer, [])
+
+    await indexer.check_events()
+
+    assert [(c["fromBlock"], c["toBlock"]) for c in calls] == [(5001, 5020)]
+
+
+async def test_window_shrinks_on_rpc_error(indexer, db):
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1099)
+    calls = serve_logs(indexer, [])
+    answer = indexer.w3.eth.get_logs.side_effect
+
+    def flaky(params):
+        if params["toBlock"] - params["fromBlock"] + 1 > 50:
+            calls.append(params)
+            raise ValueError("query returned more than 10000 results")
+        return answer(params)
+
+    indexer.w3.eth.get_logs.side_effect = flaky
+
+    await indexer.check_events()
+
+    assert [(c["fromBlock"], c["toBlock"]) for c in calls[:2]] == [(1000, 1099), (1000, 1049)]
+    cursor = db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE))
+    assert cursor.last_block == 1099
+
+
+async def test_single_get_logs_covers_all_contracts_in_chain_order(indexer, db, listing):
+    indexer.escrow_contract = escrow_contract
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1010)
+    handled = []
+    indexer.process_listing_updated = lambda batch, event: handled.append((event["event"], event["logIndex"]))
+    indexer.process_escrow_created = lambda batch, event: handled.append((event["event"], event["logIndex"]))
+    calls = serve_logs(indexer, [
+        make_log(escrow_contract, "EscrowCreated", 1005, 3, escrowId=1, listingId=7,
+                 buyer="0x" + "11" * 20, seller="0x" + "22" * 20, amount=10**18),
+        make_log(marketplace_contract, "ListingUpdated", 1005, 1, listingId=7, newPrice=1, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    assert len(calls) == 1
+    assert set(calls[0]["address"]) == {MARKETPLACE, ESCROW}
+    assert len(calls[0]["topics"][0]) == 9
+    assert handled == [("ListingUpdated", 1), ("EscrowCreated", 3)]
+
+
+async def test_contract_ahead_of_others_skips_already_indexed_logs(indexer, db, listing):
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address=MARKETPLACE, last_block=1008))
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address=ESCROW, last_block=1000))
+    db.commit()
+    indexer.escrow_contract = escrow_contract
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1010)
+    handled = []
+    indexer.process_listing_updated = lambda batch, event: handled.append(event["blockNumber"])
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1005, listingId=7, newPrice=1, ipfsMetadata=""),
+        make_log(marketplace_contract, "ListingUpdated", 1009, listingId=7, newPrice=1, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    assert handled == [1009]
+
+
+async def test_handlers_run_off_the_event_loop_thread(indexer, db, listing):
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1000)
+    threads = []
+    indexer.process_listing_updated = lambda batch, event: threads.append(threading.current_thread())
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1000, listingId=7, newPrice=1, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    assert threads and threads[0] is not threading.main_thread()
+
+
+async def test_run_as_leader_stops_when_lease_is_lost(indexer, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_poll_interval", 0)
+    indexer.lease = MagicMock()
+    indexer.lease.is_held.side_effect = [True, True, False]
+    indexer.check_events = AsyncMock()
+
+    await indexer.run_as_leader()
+
+    assert indexer.check_events.await_count == 2
+
+
+async def test_log_subscription_wakes_leader_before_poll_interval(indexer, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_poll_interval", 3600)
+    monkeypatch.setattr(settings, "base_ws_url", "ws://node")
+    indexer.lease = MagicMock()
+    indexer.lease.is_held.side_effect = [True, True, True, False]
+    indexer.check_events = AsyncMock()
+
+    async def notify(wake):
+        while True:
+            wake.set()
+            await asyncio.sleep(0)
+
+    indexer.subscribe_logs = notify
+
+    await asyncio.wait_for(indexer.run_as_leader(), timeout=5)
+
+    assert indexer.check_events.await_count == 3
+
+
+async def test_subscribe_logs_resubscribes_after_disconnect(indexer, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_ws_reconnect_interval", 0)
+    indexer.marketplace_contract = marketplace_contract
+    connections = []
+
+    def connect_ws():
+        w3 = MagicMock()
+        w3.__aenter__.return_value = w3
+        w3.eth.subscribe = AsyncMock()
+
+        async def notifications():
+            yield {"removed": False}
+            raise ConnectionError("socket closed")
+
+        w3.socket.process_subscriptions = notifications
+        connections.append(w3)
+        return w3
+
+    indexer.connect_ws = connect_ws
+    wake = asyncio.Event()
+    task = asyncio.create_task(indexer.subscribe_logs(wake))
+    while len(connections) < 2:
+        await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert wake.is_set()
+    connections[0].eth.subscribe.assert_awaited_once_with("logs", {"address": [MARKETPLACE]})
+
+
+async def test_standby_waits_for_lease_before_indexing(indexer, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_leader_retry_interval", 0)
+    indexer.marketplace_contract = marketplace_contract
+    indexer.lease = MagicMock()
+    indexer.lease.try_acquire.side_effect = [False, False, True]
+
+    class Stop(Exception):
+        pass
+
+    indexer.run_as_leader = AsyncMock(side_effect=Stop)
+
+    with pytest.raises(Stop):
+        await indexer.start()
+
+    assert indexer.lease.try_acquire.call_count == 3
+    indexer.lease.release.assert_called_once()
+
+
+async def test_escrow_created_links_and_sells_listing_in_one_window(indexer, db):
+    seller = User(wallet_address="0xSeller")
+    buyer = User(wallet_address="0x" + "11" * 20)
+    db.add_all([seller, buyer])
+    db.commit()
+    draft = Listing(
+        seller_id=seller.id, asset_name="Fresh Asset", asset_type=AssetType.SAAS,
+        business_url="https://example.com", description="Desc", asking_price=1000,
+        mrr=100, annual_revenue=1200, monthly_profit=50, monthly_expenses=50,
+        revenue_trend=RevenueTrend.STABLE,
+    )
+    db.add(draft)
+    db.commit()
+    indexer.escrow_contract = escrow_contract
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1001)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingCreated", 1000, listingId=9, seller="0x" + "22" * 20,
+                 title="Fresh Asset", askingPrice=10**21, verificationLevel=0),
+        make_log(escrow_contract, "EscrowCreated", 1001, escrowId=1, listingId=9,
+                 buyer="0x" + "11" * 20, seller="0x" + "22" * 20, amount=10**21),
+    ])
+    # The seller wallet in the event must match the stored user
+    seller.wallet_address = "0x" + "22" * 20
+    db.commit()
+
+    await indexer.check_events()
+
+    db.refresh(draft)
+    assert draft.on_chain_id == 9
+    assert draft.status == ListingStatus.SOLD
+    escrow = db.query(Escrow).one()
+    assert escrow.escrow_state == EscrowState.FUNDED
+
+
+async def test_redelivered_escrow_created_is_applied_once(indexer, db, listing):
+    indexer.escrow_contract = escrow_contract
+    set_head(indexer, 1010)
+    serve_logs(indexer, [
+        make_log(escrow_contract, "EscrowCreated", 1005, escrowId=1, listingId=7,
+                 buyer="0x" + "11" * 20, seller="0x" + "22" * 20, amount=10**18),
+    ])
+
+    await indexer.check_events()
+    # Losing the cursor makes the same log get delivered again
+    db.query(IndexerCursor).delete()
+    db.commit()
+    await indexer.check_events()
+
+    assert db.query(Escrow).count() == 1
+    processed = db.query(ProcessedEvent).one()
+    assert (processed.block_number, processed.log_index) == (1005, 0)
+
+
+async def test_window_preloads_listings_with_one_query(indexer, db, listing):
+    others = []
+    for on_chain_id in (8, 9):
+        other = Listing(
+            seller_id=listing.seller_id, on_chain_id=on_chain_id, asset_name=f"Asset {on_chain_id}",
+            asset_type=AssetType.SAAS, business_url="https://example.com", description="Desc",
+            asking_price=1000, mrr=100, annual_revenue=1200, monthly_profit=50,
+            monthly_expenses=50, revenue_trend=RevenueTrend.STABLE,
+        )
+        db.add(other)
+        others.append(other)
+    db.commit()
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1000)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1000, i, listingId=on_chain_id,
+                 newPrice=5 * 10**18, ipfsMetadata="")
+        for i, on_chain_id in enumerate((7, 8, 9))
+    ])
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    sa_event.listen(engine, "before_cursor_execute", record)
+    try:
+        await indexer.check_events()
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", record)
+
+    listing_selects = [s for s in statements if s.startswith("SELECT") and "FROM listings" in s]
+    assert len(listing_selects) == 1
+    for row in [listing, *others]:
+        db.refresh(row)
+        assert float(row.asking_price) == 5.0
+
+
+async def test_failed_handler_rolls_back_window_and_cursor(indexer, db, listing):
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1001)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1000, listingId=7, newPrice=5 * 10**18, ipfsMetadata=""),
+        make_log(marketplace_contract, "ListingCancelled", 1001, listingId=7),
+    ])
+
+    def explode(batch, event):
+        raise RuntimeError("boom")
+
+    indexer.process_listing_cancelled = explode
+
+    await indexer.check_events()
+
+    db.refresh(listing)
+    assert float(listing.asking_price) == 1000.0
+    assert db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE)) is None
+
+
+async def test_window_records_event_and_progress_metrics(indexer, db, listing):
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1050)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1000, listingId=7, newPrice=1, ipfsMetadata=""),
+    ])
+    decoded = indexer_module.EVENTS_DECODED.get(event="ListingUpdated")
+    handled = indexer_module.HANDLER_SECONDS.count(event="ListingUpdated")
+    get_logs = indexer_module.RPC_REQUESTS.get(method="eth_getLogs")
+
+    await indexer.check_events()
+
+    assert indexer_module.EVENTS_DECODED.get(event="ListingUpdated") == decoded + 1
+    assert indexer_module.HANDLER_SECONDS.count(event="ListingUpdated") == handled + 1
+    assert indexer_module.RPC_REQUESTS.get(method="eth_getLogs") == get_logs + 1
+    assert indexer_module.CURSOR_BLOCK.get(contract=MARKETPLACE) == 1050
+    assert indexer_module.BLOCKS_BEHIND.get() == 0
+
+
+async def test_confirmation_depth_keeps_cursor_behind_head(indexer, db, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_confirmations", 3)
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1010)
+    serve_logs(indexer, [])
+
+    await indexer.check_events()
+
+    cursor = db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE))
+    assert cursor.last_block == 1007
+    assert cursor.last_block_hash == "0x" + f"{1007:064x}"
+
+
+async def test_only_events_inside_reorg_window_are_journaled(indexer, db, listing, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_reorg_window", 10)
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1099)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1010, listingId=7, newPrice=1, ipfsMetadata=""),
+        make_log(marketplace_contract, "ListingUpdated", 1095, listingId=7, newPrice=2, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    entries = db.query(IndexerJournalEntry).all()
+    assert [(e.block_number, e.event_name) for e in entries] == [(1095, "ListingUpdated")]
+    # Undo restores the price set by the earlier, unjournaled event in the same window
+    (op,) = entries[0].undo
+    assert (op["op"], op["table"], op["pk"]) == ("update", "listings", [str(listing.id)])
+    assert float(op["values"]["asking_price"]) == 1e-18
+
+
+async def test_reorg_reverts_orphaned_events_and_reapplies_new_branch(indexer, db, listing):
+    indexer.escrow_contract = escrow_contract
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1010)
+    serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1005, listingId=7, newPrice=2 * 10**18, ipfsMetadata=""),
+        make_log(escrow_contract, "EscrowCreated", 1008, escrowId=1, listingId=7,
+                 buyer="0x" + "11" * 20, seller="0x" + "22" * 20, amount=10**18),
+    ])
+
+    await indexer.check_events()
+
+    db.refresh(listing)
+    assert listing.status == ListingStatus.SOLD
+    assert db.query(Escrow).count() == 1
+    assert db.query(IndexerJournalEntry).count() == 2
+
+    # Blocks from 1006 onwards are replaced by a branch that cancels the listing instead
+    indexer.forked_blocks = {n: f"ff{n:062x}" for n in range(1006, 1013)}
+    set_head(indexer, 1012)
+    calls = serve_logs(indexer, [
+        make_log(marketplace_contract, "ListingUpdated", 1005, listingId=7, newPrice=2 * 10**18, ipfsMetadata=""),
+        make_log(marketplace_contract, "ListingCancelled", 1007, block_hash=f"ff{1007:062x}", listingId=7),
+    ])
+
+    await indexer.check_events()
+
+    assert calls[0]["fromBlock"] == 1006
+    db.expire_all()
+    assert db.query(Escrow).count() == 0
+    assert listing.status == ListingStatus.PAUSED
+    assert float(listing.asking_price) == 2.0
+    journal = db.query(IndexerJournalEntry).order_by(IndexerJournalEntry.block_number).all()
+    assert [(e.block_number, e.event_name) for e in journal] == [
+        (1005, "ListingUpdated"), (1007, "ListingCancelled"),
+    ]
+    assert [p.block_number for p in db.query(ProcessedEvent).order_by(ProcessedEvent.block_number)] == [1005, 1007]
+    cursor = db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE))
+    assert cursor.last_block == 1012
+    assert cursor.last_block_hash == "0x" + f"ff{1012:062x}"
+
+
+async def test_reorg_deeper_than_journal_keeps_unjournaled_events(indexer, db, listing, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_reorg_window", 5)
+    indexer.escrow_contract = escrow_contract
+    indexer.marketplace_contract = marketplace_contract
+    set_head(indexer, 1010)
+    escrow_created = make_log(escrow_contract, "EscrowCreated", 1004, escrowId=1, listingId=7,
+                              buyer="0x" + "11" * 20, seller="0x" + "22" * 20, amount=10**18)
+    serve_logs(indexer, [
+        escrow_created,
+        make_log(marketplace_contract, "ListingUpdated", 1008, listingId=7, newPrice=2 * 10**18, ipfsMetadata=""),
+    ])
+
+    await indexer.check_events()
+
+    assert [e.block_number for e in db.query(IndexerJournalEntry)] == [1008]
+
+    # The fork is older than any journaled block, so the rewind reaches below
+    # the journal and rescans the unjournaled EscrowCreated
+    indexer.forked_blocks = {n: f"ff{n:062x}" for n in range(1005, 1013)}
+    set_head(indexer, 1012)
+    calls = serve_logs(indexer, [escrow_created])
+
+    await indexer.check_events()
+
+    assert calls[0]["fromBlock"] == 1004
+    db.expire_all()
+    assert db.query(Escrow).count() == 1
+    assert float(listing.asking_price) == 1000.0
+    assert db.query(IndexerJournalEntry).count() == 0
+    assert [p.block_number for p in db.query(ProcessedEvent)] == [1004]
+
+
+async def test_backfill_fetches_concurrently_and_applies_in_order(indexer, db, listing):
+    indexer.marketplace_contract = marketplace_contract
+    indexer.block_window = 10
+    set_head(indexer, 1049)
+    in_flight, peak = 0, 0
+    prices = []
+
+    async def get_logs(params):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later windows answer first
+        await asyncio.sleep((1050 - params["fromBlock"]) / 10000)
+        in_flight -= 1
+        return [make_log(marketplace_contract, "ListingUpdated", params["fromBlock"], listingId=7,
+                         newPrice=params["fromBlock"], ipfsMetadata="")]
+
+    indexer.w3.eth.get_logs = AsyncMock(side_effect=get_logs)
+    indexer.process_listing_updated = lambda batch, event: prices.append(event["args"]["newPrice"])
+
+    await indexer.backfill(from_block=1000, workers=3, max_rps=0)
+
+    assert prices == [1000, 1010, 1020, 1030, 1040]
+    assert peak == 3
+    assert db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE)).last_block == 1049
+
+
+async def test_backfill_resumes_from_cursor_and_splits_rejected_ranges(indexer, db, monkeypatch):
+    monkeypatch.setattr(settings, "indexer_min_block_window", 1)
+    indexer.marketplace_contract = marketplace_contract
+    db.add(IndexerCursor(chain_id=settings.base_chain_id, contract_address=MARKETPLACE, last_block=1019))
+    db.commit()
+    set_head(indexer, 1039)
+    calls = serve_logs(indexer, [])
+    serve = indexer.w3.eth.get_logs.side_effect
+
+    def get_logs(params):
+        if params["toBlock"] - params["fromBlock"] >= 10:
+            raise ValueError("query returned more than 10000 results")
+        return serve(params)
+
+    indexer.w3.eth.get_logs.side_effect = get_logs
+
+    await indexer.backfill(from_block=1000, max_rps=0)
+
+    ranges = [(c["fromBlock"], c["toBlock"]) for c in calls]
+    assert ranges == [(1020, 1029), (1030, 1039)]
+    assert db.get(IndexerCursor, (settings.base_chain_id, MARKETPLACE)).last_block == 1039
+
+
+async def test_backfill_refuses_to_run_alongside_leader(indexer):
+    indexer.lease = MagicMock()
+    indexer.lease.try_acquire.return_value = False
+
+    with pytest.raises(RuntimeError):
+        await indexer.backfill(from_block=1000)
+
+
+async def test_rate_limiter_spaces_requests():
+    limiter = RpcRateLimiter(max_per_second=50)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    await asyncio.gather(*(limiter.wait() for _ in range(5)))
+
+    assert loop.time() - started >= 4 / 50 - 0.005
+
+
+def test_backfill_cli_requires_a_start_block():
+    assert parse_args(["backfill", "--from-block", "5", "--workers", "2"]).workers == 2
+    assert parse_args([]).command is None
+
+    with pytest.raises(SystemExit):
+        parse_args(["backfill"])
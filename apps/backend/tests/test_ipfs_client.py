@@ -1,9 +1,14 @@
 """Tests for IPFSClient."""
 
+import asyncio
+import time
+from collections import deque
+
+import httpx
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from app.services.ipfs_client import IPFSClient
+from app.services.ipfs_client import GatewayScoreboard, IPFSClient
 
 
 class TestIPFSClient:
@@ -45,8 +50,8 @@ class TestIPFSClient:
         mock_response.content = b"test content"
         mock_response.raise_for_status = MagicMock()
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(
                 return_value=mock_response
             )
 
@@ -60,9 +65,9 @@ class TestIPFSClient:
         client = IPFSClient()
         client.max_retries = 2
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
             import httpx
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            mock_client.return_value.get = AsyncMock(
                 side_effect=httpx.TimeoutException("Timeout")
             )
 
@@ -74,9 +79,9 @@ class TestIPFSClient:
         """Test HTTP error handling."""
         client = IPFSClient()
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
             import httpx
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            mock_client.return_value.get = AsyncMock(
                 side_effect=httpx.HTTPError("404 Not Found")
             )
 
@@ -93,10 +98,10 @@ class TestIPFSClient:
         mock_response.content = b"success after retry"
         mock_response.raise_for_status = MagicMock()
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
             import httpx
             # Fail twice, then succeed
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            mock_client.return_value.get = AsyncMock(
                 side_effect=[
                     httpx.TimeoutException("Timeout 1"),
                     httpx.TimeoutException("Timeout 2"),
@@ -116,8 +121,8 @@ class TestIPFSClient:
         mock_response = MagicMock()
         mock_response.status_code = 200
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.head = AsyncMock(
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
+            mock_client.return_value.head = AsyncMock(
                 return_value=mock_response
             )
 
@@ -133,8 +138,8 @@ class TestIPFSClient:
         mock_response = MagicMock()
         mock_response.status_code = 404
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.head = AsyncMock(
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
+            mock_client.return_value.head = AsyncMock(
                 return_value=mock_response
             )
 
@@ -151,10 +156,10 @@ class TestIPFSClient:
         mock_response.content = b"fallback content"
         mock_response.raise_for_status = MagicMock()
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
             import httpx
             # Primary fails, fallback succeeds
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            mock_client.return_value.get = AsyncMock(
                 side_effect=[
                     httpx.HTTPError("Primary failed"),
                     mock_response,
@@ -171,9 +176,9 @@ class TestIPFSClient:
         """Test when all gateways fail."""
         client = IPFSClient()
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("app.services.ipfs_client.get_http_client") as mock_client:
             import httpx
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            mock_client.return_value.get = AsyncMock(
                 side_effect=httpx.HTTPError("All failed")
             )
 
@@ -181,3 +186,100 @@ class TestIPFSClient:
 
             with pytest.raises(RuntimeError, match="Failed to retrieve"):
                 await client.get_content_with_fallback("QmTest123", fallback_gateways)
+
+
+class TestHedgedFetch:
+    """Test cases for racing gateways and scoring them."""
+
+    def test_scoreboard_orders_and_hedges_by_history(self):
+        """Test costs reflect latency and errors, and hedge delay needs enough samples."""
+        scores = GatewayScoreboard(alpha=0.5, error_penalty=10.0, min_samples=3, prior_latency=0.5)
+        scores.record("https://fast", 0.1, ok=True)
+        scores.record("https://flaky", 0.05, ok=True)
+        scores.record("https://flaky", 1.0, ok=False)
+
+        assert scores.cost("https://new") == 0.5
+        assert scores.cost("https://fast") == pytest.approx(0.1)
+        assert scores.cost("https://flaky") == pytest.approx(0.05 + 0.5 * 10.0)
+
+        assert scores.hedge_delay("https://fast", 0.9, default=0.7) == 0.7
+        for latency in (0.2, 0.3, 0.4):
+            scores.record("https://fast", latency, ok=True)
+        assert scores.hedge_delay("https://fast", 0.9, default=0.7) == 0.4
+        assert scores.hedge_delay("https://fast", 0.5, default=0.7) == 0.3
+
+        # Cancelled fetches only ever raise the estimate, and aren't hedge samples
+        scores.record_cancelled("https://slow", 2.0)
+        scores.record_cancelled("https://slow", 1.0)
+        scores.record_cancelled("https://fast", 1.0)
+        assert scores.get("https://slow").latency == 2.0
+        assert scores.get("https://fast").latency > 0.4
+        assert len(scores.get("https://fast").samples) == 4
+
+    @staticmethod
+    def hedged_client(delays, requests, scoreboard=None):
+        """Client whose gateways answer after the given per-host delays (None fails)."""
+        async def handler(request):
+            requests.append(request.url.host)
+            delay = delays[request.url.host]
+            if delay is None:
+                return httpx.Response(502)
+            await asyncio.sleep(delay)
+            return httpx.Response(200, content=request.url.host.encode())
+
+        return IPFSClient(
+            gateway_url="https://primary/ipfs/",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            scoreboard=scoreboard or GatewayScoreboard(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self, monkeypatch):
+        """Test a fallback starts after the hedge delay and its answer wins."""
+        monkeypatch.setattr("app.services.ipfs_client.settings.ipfs_hedge_delay", 0.01)
+        requests = []
+        client = self.hedged_client({"primary": 5.0, "backup": 0.0}, requests)
+
+        started = time.perf_counter()
+        content = await client.get_content_with_fallback("QmTest", ["https://backup/ipfs/"])
+
+        assert content == b"backup"
+        assert time.perf_counter() - started < 1.0
+        assert requests == ["primary", "backup"]
+        assert client.scores.get("https://primary/ipfs").samples == deque()
+
+    @pytest.mark.asyncio
+    async def test_gateway_that_always_loses_drops_down_the_order(self, monkeypatch):
+        """Test a slow gateway whose requests are always cancelled stops being tried first."""
+        monkeypatch.setattr("app.services.ipfs_client.settings.ipfs_hedge_delay", 0.05)
+        requests = []
+        client = self.hedged_client({"primary": 5.0, "backup": 0.0}, requests)
+
+        for _ in range(3):
+            assert await client.get_content_with_fallback("QmTest", ["https://backup/ipfs/"]) == b"backup"
+
+        assert requests == ["primary", "backup", "backup", "backup"]
+        assert client.scores.cost("https://primary/ipfs") > client.scores.cost("https://backup/ipfs")
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, monkeypatch):
+        """Test no fallback is requested when the primary answers in time."""
+        monkeypatch.setattr("app.services.ipfs_client.settings.ipfs_hedge_delay", 1.0)
+        requests = []
+        client = self.hedged_client({"primary": 0.0, "backup": 0.0}, requests)
+
+        assert await client.get_content_with_fallback("QmTest", ["https://backup/ipfs/"]) == b"primary"
+        assert requests == ["primary"]
+
+    @pytest.mark.asyncio
+    async def test_failing_gateway_is_demoted(self, monkeypatch):
+        """Test a failure starts the next gateway at once and lowers the gateway's rank."""
+        monkeypatch.setattr("app.services.ipfs_client.settings.ipfs_hedge_delay", 5.0)
+        requests = []
+        client = self.hedged_client({"primary": None, "backup": 0.0}, requests)
+
+        first = await client.get_content_with_fallback("QmTest", ["https://backup/ipfs/"])
+        second = await client.get_content_with_fallback("QmTest", ["https://backup/ipfs/"])
+
+        assert first == second == b"backup"
+        assert requests == ["primary", "backup", "backup"]
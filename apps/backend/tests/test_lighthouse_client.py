@@ -0,0 +1,121 @@
+"""Tests for LighthouseClient."""
+
+import asyncio
+import io
+
+import httpx
+import pytest
+
+from app.services.lighthouse_client import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOADS,
+    UPLOADS_IN_FLIGHT,
+    UPLOADS_QUEUED,
+    LighthouseClient,
+)
+
+
+class ChunkedFile(io.BytesIO):
+    """BytesIO that records every read size."""
+
+    def __init__(self, content: bytes):
+        super().__init__(content)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+class TestLighthouseClient:
+    """Test cases for LighthouseClient."""
+
+    def test_not_configured_without_key(self, monkeypatch):
+        """Test a client without an API key reports itself unconfigured."""
+        monkeypatch.setattr("app.services.lighthouse_client.settings.lighthouse_api_key", None)
+        assert not LighthouseClient().is_configured()
+        assert LighthouseClient(api_key="key").is_configured()
+
+    @pytest.mark.asyncio
+    async def test_upload_stream_posts_multipart_in_chunks(self):
+        """Test the file object is streamed to the node's add endpoint."""
+        content = b"%PDF-1.7 " + b"x" * 200_000
+        requests = []
+
+        async def handler(request):
+            requests.append((request, await request.aread()))
+            return httpx.Response(200, text='{"Name":"doc.pdf","Hash":"QmDoc","Size":"200020"}\n')
+
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = LighthouseClient(api_key="key", node_url="https://node.example/", http_client=http)
+        fileobj = ChunkedFile(content)
+
+        result = await client.upload_stream(fileobj, "doc.pdf", "application/pdf")
+
+        assert result == {"Name": "doc.pdf", "Hash": "QmDoc", "Size": "200020"}
+        request, body = requests[0]
+        assert str(request.url) == "https://node.example/api/v0/add"
+        assert request.headers["Authorization"] == "Bearer key"
+        assert b'filename="doc.pdf"' in body
+        assert content in body
+        assert request.headers["Content-Length"] == str(len(body))
+        # Read in bounded chunks rather than all at once
+        assert set(fileobj.reads) == {UPLOAD_CHUNK_SIZE}
+
+    @pytest.mark.asyncio
+    async def test_upload_file_wraps_bytes(self):
+        """Test uploading in-memory bytes and unwrapping a "data" envelope."""
+        http = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"data": {"Hash": "QmBytes"}})
+        ))
+        client = LighthouseClient(api_key="key", http_client=http)
+
+        result = await client.upload_file(b"content", "a.png")
+
+        assert result == {"Hash": "QmBytes"}
+
+    @pytest.mark.asyncio
+    async def test_upload_errors(self):
+        """Test HTTP errors propagate and a missing key is rejected up front."""
+        http = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(401)))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await LighthouseClient(api_key="bad", http_client=http).upload_file(b"x")
+
+        client = LighthouseClient(api_key="key", http_client=http)
+        client.api_key = None
+        with pytest.raises(RuntimeError):
+            await client.upload_file(b"x")
+
+    @pytest.mark.asyncio
+    async def test_uploads_beyond_limit_wait_for_a_slot(self):
+        """Test concurrent uploads are capped and waiting ones are counted as queued."""
+        release = asyncio.Event()
+        started = []
+
+        async def handler(request):
+            started.append(request)
+            await request.aread()
+            await release.wait()
+            return httpx.Response(200, json={"Hash": f"Qm{len(started)}"})
+
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = LighthouseClient(api_key="key", http_client=http, max_concurrent_uploads=1)
+        successes = UPLOADS.get(result="success")
+
+        uploads = [asyncio.create_task(client.upload_file(b"x", f"{i}.png")) for i in range(2)]
+        while not started:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        assert len(started) == 1
+        assert UPLOADS_IN_FLIGHT.get() == 1
+        assert UPLOADS_QUEUED.get() == 1
+
+        release.set()
+        await asyncio.gather(*uploads)
+
+        assert len(started) == 2
+        assert UPLOADS_IN_FLIGHT.get() == 0
+        assert UPLOADS_QUEUED.get() == 0
+        assert UPLOADS.get(result="success") == successes + 2
@@ -0,0 +1,184 @@
+"""Tests for the listing response cache."""
+import time
+from datetime import datetime
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.config import settings
+from app.main import app
+from app.dependencies import get_current_user
+from app.models.listing import Listing
+from app.models.user import User
+from app.services.listing_cache import CACHE_REQUESTS, ListingCache, list_key, listing_cache
+from tests.conftest import TestingSessionLocal
+from tests.test_listings import make_listings
+
+
+class FakeRedis:
+    """The few Redis commands the cache uses, in memory. Expiry is ignored."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def incr(self, key):
+        self.calls.append(self.redis.incr(key))
+
+    def expire(self, key, seconds):
+        self.calls.append(self.redis.expire(key, seconds))
+
+    async def execute(self):
+        return [await call for call in self.calls]
+
+
+class BrokenRedis(FakeRedis):
+    async def mget(self, *keys):
+        raise RedisConnectionError("Connection refused")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(settings, "listing_cache_enabled", True)
+    monkeypatch.setattr(listing_cache, "_client", FakeRedis())
+    monkeypatch.setattr(listing_cache, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(listing_cache, "_retry_at", 0.0)
+    return listing_cache
+
+
+@pytest.fixture
+def seller(db):
+    user = User(wallet_address="0x1234567890abcdef1234567890abcdef12345678")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def names(client, **params):
+    response = client.get("/api/v1/listings/", params=params)
+    assert response.status_code == 200
+    return [item["asset_name"] for item in response.json()]
+
+
+def test_list_key_normalizes_params():
+    assert list_key({"asset_type": ["saas", "content"], "limit": 20, "cursor": None}) == \
+        list_key({"limit": 20, "asset_type": ["content", "saas"]})
+    assert list_key({"limit": 20}) != list_key({"limit": 21})
+
+
+def test_list_pages_are_cached_until_a_listing_changes(client, db, seller, cache):
+    app.dependency_overrides[get_current_user] = lambda: seller
+    (first,) = make_listings(db, seller, 1, asset_name="First")
+    hits = CACHE_REQUESTS.get(endpoint="list", result="hit")
+
+    assert names(client) == ["First"]
+    # Written behind the API's back, so only a cache miss would show it
+    make_listings(db, seller, 1, asset_name="Hidden")
+    assert names(client) == ["First"]
+    assert CACHE_REQUESTS.get(endpoint="list", result="hit") == hits + 1
+
+    # Headers are cached with the body
+    response = client.get("/api/v1/listings/", params={"limit": 1})
+    assert client.get("/api/v1/listings/", params={"limit": 1}).headers["X-Next-Cursor"] == \
+        response.headers["X-Next-Cursor"]
+
+    client.put(f"/api/v1/listings/{first.id}", json={"asset_name": "Renamed"})
+    assert sorted(names(client)) == ["Hidden", "Renamed"]
+    app.dependency_overrides.clear()
+
+
+def test_detail_is_invalidated_per_listing(client, db, seller, cache):
+    app.dependency_overrides[get_current_user] = lambda: seller
+    first, second = make_listings(db, seller, 2)
+
+    for listing in (first, second):
+        assert client.get(f"/api/v1/listings/{listing.id}").json()["asset_name"] == listing.asset_name
+    db.query(Listing).update({Listing.description: "Changed directly"})
+    db.commit()
+
+    client.put(f"/api/v1/listings/{first.id}", json={"asking_price": 5})
+    assert client.get(f"/api/v1/listings/{first.id}").json()["description"] == "Changed directly"
+    # The other listing's entry is untouched
+    assert client.get(f"/api/v1/listings/{second.id}").json()["description"] == "Desc"
+
+    missing = "00000000-0000-0000-0000-000000000000"
+    assert client.get(f"/api/v1/listings/{missing}").status_code == 404
+    assert f"listings:detail:{missing}" not in cache.client.data
+    app.dependency_overrides.clear()
+
+
+def test_stale_entries_are_served_while_refreshing(client, db, seller, cache, monkeypatch):
+    monkeypatch.setattr(cache, "ttl", 0)
+    make_listings(db, seller, 1, asset_name="First")
+    stale = CACHE_REQUESTS.get(endpoint="list", result="stale")
+
+    assert names(client) == ["First"]
+    make_listings(db, seller, 1, asset_name="Second", created_at=datetime(2026, 2, 1))
+    assert names(client) == ["First"]
+    assert CACHE_REQUESTS.get(endpoint="list", result="stale") == stale + 1
+
+    deadline = time.monotonic() + 5
+    while names(client) != ["Second", "First"]:
+        assert time.monotonic() < deadline, "background refresh never stored the new page"
+        time.sleep(0.01)
+
+
+def test_redis_errors_fall_back_to_the_database(client, db, seller, cache, monkeypatch):
+    monkeypatch.setattr(cache, "_client", BrokenRedis())
+    make_listings(db, seller, 1, asset_name="First")
+
+    assert names(client) == ["First"]
+    assert cache._retry_at > time.monotonic()
+    bypassed = CACHE_REQUESTS.get(endpoint="list", result="bypass")
+    assert names(client) == ["First"]
+    assert CACHE_REQUESTS.get(endpoint="list", result="bypass") == bypassed + 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_generations(monkeypatch):
+    monkeypatch.setattr(settings, "listing_cache_enabled", True)
+    cache = ListingCache(client=FakeRedis())
+    await cache.invalidate(["a"])
+    await cache.invalidate(["a", "b"], source="indexer")
+    assert cache.client.data == {
+        "listings:generation:list": b"2",
+        "listings:generation:a": b"2",
+        "listings:generation:b": b"1",
+    }
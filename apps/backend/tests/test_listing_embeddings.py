@@ -0,0 +1,91 @@
+"""Tests for listing embeddings."""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models.listing import EMBEDDING_DIMENSIONS, Listing
+from app.models.user import User
+from app.services.listing_embeddings import ListingEmbedder, embedding_text
+from tests.conftest import TestingSessionLocal
+
+
+def fake_embeddings(contents, task_type):
+    return [[float(len(text))] * EMBEDDING_DIMENSIONS for text in contents]
+
+
+@pytest.fixture
+def listings(db):
+    user = User(wallet_address="0x1234567890abcdef1234567890abcdef12345678")
+    db.add(user)
+    db.commit()
+    rows = [
+        Listing(
+            seller_id=user.id,
+            asset_name=f"Asset {i}",
+            asset_type="saas",
+            business_url=f"https://asset{i}.com",
+            description="Desc",
+            asking_price=1000,
+            mrr=100,
+            annual_revenue=1200,
+            monthly_profit=50,
+            monthly_expenses=50,
+            revenue_trend="stable",
+        )
+        for i in range(5)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def stored_embeddings(db):
+    db.expire_all()
+    return {
+        listing.asset_name: listing.embedding
+        for listing in db.query(Listing).order_by(Listing.asset_name)
+    }
+
+
+def test_embedding_text():
+    listing = Listing(
+        asset_name="Shop",
+        description="Sells things",
+        tech_stack={"frontend": "Next.js", "backend": ["FastAPI", "Postgres"]},
+    )
+    assert embedding_text(listing) == (
+        "Shop\n\nSells things\n\nTech stack: frontend: Next.js; backend: FastAPI, Postgres"
+    )
+    assert embedding_text(Listing(asset_name="Shop", description="Sells things")) == "Shop\n\nSells things"
+
+
+@pytest.mark.asyncio
+async def test_refresh_stores_embedding(db, listings):
+    embedder = ListingEmbedder(session_factory=TestingSessionLocal)
+    embedder._embed = AsyncMock(side_effect=fake_embeddings)
+    updated_at = listings[0].updated_at
+
+    assert await embedder.refresh(listings[0].id) is True
+    embedder._embed.assert_awaited_once_with(["Asset 0\n\nDesc"], "retrieval_document")
+    embeddings = stored_embeddings(db)
+    assert embeddings["Asset 0"] == [13.0] * EMBEDDING_DIMENSIONS
+    assert embeddings["Asset 1"] is None
+    assert db.get(Listing, listings[0].id).updated_at == updated_at
+
+    embedder._embed.side_effect = RuntimeError("quota exceeded")
+    assert await embedder.refresh(listings[1].id) is False
+
+
+@pytest.mark.asyncio
+async def test_backfill_embeds_missing_in_batches(db, listings):
+    embedder = ListingEmbedder(session_factory=TestingSessionLocal)
+    embedder._embed = AsyncMock(side_effect=fake_embeddings)
+    await embedder.refresh(listings[0].id)
+    embedder._embed.reset_mock()
+
+    assert await embedder.backfill(batch_size=2) == 4
+    assert [len(call.args[0]) for call in embedder._embed.await_args_list] == [2, 2]
+    assert all(embedding is not None for embedding in stored_embeddings(db).values())
+
+    assert await embedder.backfill(batch_size=2) == 0
+    assert await embedder.backfill(batch_size=10, force=True) == 5
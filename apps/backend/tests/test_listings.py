@@ -1,9 +1,16 @@
 import pytest
+from unittest.mock import AsyncMock
+from app.core.config import settings
 from app.main import app
 from app.models.user import User
-from app.models.listing import Listing, ListingStatus
+from app.models.listing import EMBEDDING_DIMENSIONS, Listing, ListingStatus
+from app.services.listing_embeddings import listing_embedder
 from app.dependencies import get_current_user
+from datetime import datetime, timedelta
 from uuid import uuid4
+from app.core.pagination import encode_cursor
+from app.schemas.listing import ListingFilters, ListingSort
+from app.services import listing_query
 
 @pytest.fixture
 def mock_user(db):
@@ -133,3 +140,257 @@ def test_update_listing_non_owner(client, db, mock_user, mock_user_2):
     assert response.status_code == 403
     
     app.dependency_overrides.clear()
+
+def make_listings(db, seller, count, **overrides):
+    """Create listings with distinct, increasing created_at timestamps."""
+    base = datetime(2026, 1, 1)
+    listings = []
+    for i in range(count):
+        fields = dict(
+            seller_id=seller.id,
+            asset_name=f"Asset {i}",
+            asset_type="saas",
+            business_url=f"https://asset{i}.com",
+            description="Desc",
+            asking_price=1000 + i,
+            mrr=100,
+            annual_revenue=1200,
+            monthly_profit=50,
+            monthly_expenses=50,
+            revenue_trend="stable",
+            status=ListingStatus.ACTIVE,
+            created_at=base + timedelta(minutes=i),
+        )
+        fields.update(overrides)
+        listings.append(Listing(**fields))
+    db.add_all(listings)
+    db.commit()
+    return listings
+
+def test_get_listings_cursor_pagination(client, db, mock_user):
+    make_listings(db, mock_user, 5)
+    # Two listings sharing a timestamp are still ordered by id without gaps or repeats
+    make_listings(db, mock_user, 2, created_at=datetime(2026, 1, 1, 0, 2), asset_name="Twin")
+
+    names = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/listings/", params=params)
+        assert response.status_code == 200
+        names += [item["asset_name"] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(names) == 7
+    assert names[:2] == ["Asset 4", "Asset 3"]
+    assert names[-2:] == ["Asset 1", "Asset 0"]
+
+def test_get_listings_cursor_with_status_filter(client, db, mock_user):
+    make_listings(db, mock_user, 3)
+    make_listings(db, mock_user, 2, status=ListingStatus.DRAFT, asset_name="Draft")
+
+    first = client.get("/api/v1/listings/", params={"status": "active", "limit": 2})
+    second = client.get(
+        "/api/v1/listings/", params={"status": "active", "limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    )
+
+    assert [item["asset_name"] for item in first.json() + second.json()] == ["Asset 2", "Asset 1", "Asset 0"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_get_listings_invalid_cursor(client, db):
+    response = client.get("/api/v1/listings/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    # Well-formed tokens with values of the wrong type are rejected too
+    for values in (["newest", "2024-01-01T00:00:00", 123], ["newest", None, str(uuid4())]):
+        response = client.get("/api/v1/listings/", params={"cursor": encode_cursor(values)})
+        assert response.status_code == 400
+
+@pytest.mark.parametrize("sort", list(ListingSort))
+def test_get_listings_invalid_cursor_per_sort(client, db, sort):
+    for values in ([sort.value, "not-a-value", str(uuid4())], [sort.value, "1", 123], [sort.value, 1, str(uuid4())]):
+        response = client.get("/api/v1/listings/", params={"sort": sort.value, "cursor": encode_cursor(values)})
+        assert response.status_code == 400, values
+
+def test_get_listings_filters(client, db, mock_user):
+    make_listings(db, mock_user, 4)  # saas, prices 1000..1003
+    make_listings(db, mock_user, 2, asset_type="ecommerce", asset_name="Shop", domain_included=True, mrr=900)
+    make_listings(db, mock_user, 1, asset_type="content", asset_name="Blog", revenue_trend="growing")
+
+    def names(**params):
+        response = client.get("/api/v1/listings/", params=params)
+        assert response.status_code == 200
+        return sorted(item["asset_name"] for item in response.json())
+
+    assert names(asset_type=["ecommerce", "content"]) == ["Blog", "Shop", "Shop"]
+    assert names(min_price=1001, max_price=1002) == ["Asset 1", "Asset 2", "Shop"]
+    assert names(min_mrr=500) == ["Shop", "Shop"]
+    assert names(domain_included=True, max_price=1000) == ["Shop"]
+    assert names(revenue_trend="growing") == ["Blog"]
+
+    response = client.get("/api/v1/listings/", params={"min_price": 10, "max_price": 5})
+    assert response.status_code == 422
+
+def test_get_listings_sorted_pages(client, db, mock_user):
+    make_listings(db, mock_user, 5)
+    # Equal prices fall back to id order, so pages neither skip nor repeat them
+    make_listings(db, mock_user, 3, asking_price=1002, asset_name="Same price")
+
+    prices = []
+    ids = []
+    params = {"sort": "price_desc", "limit": 3}
+    while True:
+        response = client.get("/api/v1/listings/", params=params)
+        prices += [float(item["asking_price"]) for item in response.json()]
+        ids += [item["id"] for item in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert prices == sorted(prices, reverse=True)
+    assert len(ids) == len(set(ids)) == 8
+
+    # A cursor only continues the sort it was issued for
+    first = client.get("/api/v1/listings/", params={"sort": "price_asc", "limit": 1})
+    response = client.get(
+        "/api/v1/listings/", params={"sort": "mrr_desc", "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert response.status_code == 400
+
+def test_search_listings(client, db, mock_user):
+    make_listings(db, mock_user, 2)
+    make_listings(db, mock_user, 1, asset_name="Analytics Dashboard", description="Metrics for shops")
+    make_listings(db, mock_user, 1, asset_name="Recipe Blog", description="Food posts with analytics built in")
+    make_listings(db, mock_user, 1, asset_name="Analytics Suite", status=ListingStatus.DRAFT)
+
+    response = client.get("/api/v1/listings/search", params={"q": "analy", "status": "active"})
+    assert response.status_code == 200
+    results = response.json()
+    # Prefix match, name matches ranked above description matches, status filter applied
+    assert [r["listing"]["asset_name"] for r in results] == ["Analytics Dashboard", "Recipe Blog"]
+    assert results[0]["rank"] > results[1]["rank"]
+    assert results[0]["highlights"]["asset_name"] == "<mark>Analytics</mark> Dashboard"
+    assert "<mark>analytics</mark>" in results[1]["highlights"]["description"]
+
+    # Every word has to match
+    response = client.get("/api/v1/listings/search", params={"q": "analytics food"})
+    assert [r["listing"]["asset_name"] for r in response.json()] == ["Recipe Blog"]
+
+    # Highlights are safe to render: only the <mark> tags are markup
+    make_listings(db, mock_user, 1, asset_name="<b>Widget</b> & Co",
+                  description="<script>alert('widget')</script>")
+    response = client.get("/api/v1/listings/search", params={"q": "widget"})
+    (result,) = response.json()
+    assert result["highlights"] == {
+        "asset_name": "&lt;b&gt;<mark>Widget</mark>&lt;/b&gt; &amp; Co",
+        "description": "&lt;script&gt;alert(&#x27;<mark>widget</mark>&#x27;)&lt;/script&gt;",
+    }
+
+    response = client.get("/api/v1/listings/search", params={"q": "!!"})
+    assert response.json() == []
+    assert client.get("/api/v1/listings/search").status_code == 422
+
+
+def test_search_postgres(pg_db):
+    """Full-text search against a real Postgres, with the migration's search vector."""
+    seller = User(wallet_address="0x1234567890abcdef1234567890abcdef12345678")
+    pg_db.add(seller)
+    pg_db.commit()
+    make_listings(pg_db, seller, 1, asset_name="Analytics Dashboard", description="Metrics for shops")
+    make_listings(pg_db, seller, 1, asset_name="Recipe Blog", description="Food posts with analytics built in")
+    make_listings(pg_db, seller, 1, asset_name="Developer Tools", description="Linters for developers")
+
+    def names(text):
+        return [hit.listing.asset_name for hit in listing_query.search(pg_db, text, ListingFilters(), limit=10)]
+
+    # 'english' alone stems the prefix to 'anali', which misses the indexed 'analyt'
+    assert names("analy") == ["Analytics Dashboard", "Recipe Blog"]
+    assert names("dashboards") == ["Analytics Dashboard"]
+    # Stopwords aren't in the search vector, so they mustn't be required
+    assert names("tools for developers") == ["Developer Tools"]
+    assert names("the") == []
+    assert names("analytics food") == ["Recipe Blog"]
+
+    make_listings(pg_db, seller, 1, asset_name="<b>Widget</b> & Co", description="Widgets")
+    (hit,) = listing_query.search(pg_db, "widget", ListingFilters(), limit=10)
+    assert hit.highlights == {
+        "asset_name": "&lt;b&gt;<mark>Widget</mark>&lt;/b&gt; &amp; Co",
+        "description": "<mark>Widgets</mark>",
+    }
+
+
+def embedding(*values):
+    return list(values) + [0.0] * (EMBEDDING_DIMENSIONS - len(values))
+
+
+def test_similar_listings(client, db, mock_user):
+    (source,) = make_listings(db, mock_user, 1, asset_name="Source", embedding=embedding(1.0, 0.0))
+    make_listings(db, mock_user, 1, asset_name="Close", embedding=embedding(0.9, 0.1))
+    make_listings(db, mock_user, 1, asset_name="Far", embedding=embedding(0.0, 1.0))
+    make_listings(db, mock_user, 1, asset_name="Close but sold", embedding=embedding(1.0, 0.05),
+                  status=ListingStatus.SOLD)
+    make_listings(db, mock_user, 1, asset_name="Not embedded")
+
+    response = client.get(f"/api/v1/listings/{source.id}/similar")
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["listing"]["asset_name"] for r in results] == ["Close but sold", "Close", "Far"]
+    assert results[0]["similarity"] == pytest.approx(0.9988, abs=1e-4)
+
+    response = client.get(f"/api/v1/listings/{source.id}/similar", params={"status": "active", "limit": 1})
+    assert [r["listing"]["asset_name"] for r in response.json()] == ["Close"]
+
+    (pending,) = make_listings(db, mock_user, 1, asset_name="Pending")
+    assert client.get(f"/api/v1/listings/{pending.id}/similar").json() == []
+    assert client.get(f"/api/v1/listings/{uuid4()}/similar").status_code == 404
+
+
+def test_hybrid_search(client, db, mock_user, monkeypatch):
+    make_listings(db, mock_user, 1, asset_name="Analytics Dashboard", embedding=embedding(0.0, 1.0))
+    make_listings(db, mock_user, 1, asset_name="Metrics Tracker", description="Product usage reports",
+                  embedding=embedding(1.0, 0.1))
+    make_listings(db, mock_user, 1, asset_name="Recipe Blog", embedding=embedding(-1.0, 0.0))
+
+    monkeypatch.setattr(settings, "listing_embeddings_enabled", True)
+    embed_query = AsyncMock(return_value=embedding(1.0, 0.0))
+    monkeypatch.setattr(listing_embedder, "embed_query", embed_query)
+
+    response = client.get("/api/v1/listings/search", params={"q": "analytics"})
+    assert [r["listing"]["asset_name"] for r in response.json()] == ["Analytics Dashboard"]
+    embed_query.assert_not_awaited()
+
+    response = client.get("/api/v1/listings/search", params={"q": "analytics", "hybrid": True, "limit": 2})
+    results = response.json()
+    # Keyword-only and meaning-only matches tie on fused score; only the former is highlighted
+    assert {r["listing"]["asset_name"] for r in results} == {"Analytics Dashboard", "Metrics Tracker"}
+    highlights = {r["listing"]["asset_name"]: r["highlights"] for r in results}
+    assert highlights["Metrics Tracker"] == {}
+    assert highlights["Analytics Dashboard"]["asset_name"] == "<mark>Analytics</mark> Dashboard"
+
+    # A failed query embedding degrades to keyword search
+    embed_query.side_effect = RuntimeError("quota exceeded")
+    response = client.get("/api/v1/listings/search", params={"q": "analytics", "hybrid": True})
+    assert [r["listing"]["asset_name"] for r in response.json()] == ["Analytics Dashboard"]
+
+
+def test_listing_edits_schedule_embedding(client, db, mock_user, monkeypatch):
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    refresh = AsyncMock(return_value=True)
+    monkeypatch.setattr(listing_embedder, "refresh", refresh)
+    (listing,) = make_listings(db, mock_user, 1)
+
+    client.put(f"/api/v1/listings/{listing.id}", json={"description": "New"})
+    refresh.assert_not_awaited()
+
+    monkeypatch.setattr(settings, "listing_embeddings_enabled", True)
+    client.put(f"/api/v1/listings/{listing.id}", json={"asking_price": 2000})
+    refresh.assert_not_awaited()
+    client.put(f"/api/v1/listings/{listing.id}", json={"description": "Newer"})
+    refresh.assert_awaited_once_with(listing.id)
+
+    app.dependency_overrides.clear()
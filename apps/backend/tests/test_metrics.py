@@ -0,0 +1,52 @@
+"""Tests for the in-process metrics registry."""
+import pytest
+
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_render_counters_and_gauges_in_prometheus_format():
+    registry = MetricsRegistry()
+    requests = Counter("rpc_requests", "RPC calls", ["method"], registry=registry)
+    head = Gauge("head_block", "Chain head", registry=registry)
+
+    requests.inc(method="eth_getLogs")
+    requests.inc(2, method="eth_getLogs")
+    requests.inc(method='quo"ted')
+    head.set(1234)
+
+    assert registry.render() == (
+        "# HELP rpc_requests RPC calls\n"
+        "# TYPE rpc_requests counter\n"
+        'rpc_requests_total{method="eth_getLogs"} 3\n'
+        'rpc_requests_total{method="quo\\"ted"} 1\n'
+        "# HELP head_block Chain head\n"
+        "# TYPE head_block gauge\n"
+        "head_block 1234\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1), registry=registry)
+
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.05",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_labels_must_match_declaration():
+    registry = MetricsRegistry()
+    counter = Counter("events", "Events", ["event"], registry=registry)
+
+    with pytest.raises(ValueError):
+        counter.inc(kind="x")
+    with pytest.raises(ValueError):
+        Counter("events", "Duplicate", registry=registry)
@@ -0,0 +1,289 @@
+"""Tests for StorageService and its content cache."""
+
+import io
+import os
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.services.content_cache import ContentCache, DiskContentCache
+from app.services.content_index import ContentIndex
+from app.services.storage_service import (
+    ContentVerificationError,
+    RangeNotSatisfiable,
+    StorageService,
+    UPLOAD_CID_MISMATCHES,
+    parse_byte_range,
+)
+
+
+class TestContentCache:
+    """Test cases for ContentCache."""
+
+    def test_evicts_least_recently_used_over_budget(self):
+        """Test that entries are evicted LRU-first once the byte budget is exceeded."""
+        cache = ContentCache(max_bytes=10)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+
+        cache.set("c", b"1234")
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        stats = cache.stats()
+        assert stats.evictions == 1
+        assert stats.size_bytes == 8
+
+    def test_rejects_entries_larger_than_limit(self):
+        """Test that oversized values are not cached and don't evict others."""
+        cache = ContentCache(max_bytes=10, max_entry_bytes=4)
+        cache.set("a", b"1234")
+
+        assert cache.set("big", b"12345") is False
+        assert "a" in cache
+        assert cache.stats().rejected == 1
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries past their TTL are treated as misses."""
+        cache = ContentCache(max_bytes=10, ttl=60)
+        with patch("app.services.content_cache.time.monotonic", return_value=1000.0):
+            cache.set("a", b"1234")
+        with patch("app.services.content_cache.time.monotonic", return_value=1061.0):
+            assert cache.get("a") is None
+
+        stats = cache.stats()
+        assert stats.expirations == 1
+        assert stats.misses == 1
+        assert stats.size_bytes == 0
+
+    def test_replacing_key_keeps_size_accurate(self):
+        """Test that overwriting an entry doesn't double-count its bytes."""
+        cache = ContentCache(max_bytes=10)
+        cache.set("a", b"1234")
+        cache.set("a", b"12")
+
+        assert cache.stats().size_bytes == 2
+        assert cache.get("a") == b"12"
+
+
+class TestDiskContentCache:
+    """Test cases for DiskContentCache."""
+
+    def test_round_trip_in_sharded_directory(self, tmp_path):
+        """Test that values are written under two-level shard directories."""
+        cache = DiskContentCache(str(tmp_path), max_bytes=1024)
+
+        assert cache.set("QmTest", b"content")
+        assert cache.get("QmTest") == b"content"
+        assert cache.get("QmMissing") is None
+
+        path = cache.path_for("QmTest")
+        relative = os.path.relpath(path, tmp_path).split(os.sep)
+        assert len(relative) == 3
+        assert [p for p in tmp_path.rglob(".tmp-*")] == []
+
+    def test_empty_value(self, tmp_path):
+        """Test that empty files round-trip."""
+        cache = DiskContentCache(str(tmp_path), max_bytes=1024)
+        cache.set("QmEmpty", b"")
+
+        assert cache.get("QmEmpty") == b""
+
+    def test_survives_restart(self, tmp_path):
+        """Test that a new instance sees content and size written by another."""
+        DiskContentCache(str(tmp_path), max_bytes=1024).set("QmTest", b"content")
+
+        cache = DiskContentCache(str(tmp_path), max_bytes=1024)
+
+        assert cache.get("QmTest") == b"content"
+        assert cache.stats().size_bytes == len(b"content")
+
+    def test_evicts_least_recently_used_files(self, tmp_path):
+        """Test that eviction removes the oldest files down to the low watermark."""
+        cache = DiskContentCache(str(tmp_path), max_bytes=35, low_watermark=0.6)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.set(key, b"x" * 10)
+            os.utime(cache.path_for(key), (1000 + i, 1000 + i))
+        # Reading "a" makes it the most recently used
+        cache.get("a")
+
+        cache.set("d", b"x" * 10)
+
+        assert cache.get("b") is None
+        assert cache.get("c") is None
+        assert cache.get("a") is not None
+        assert cache.get("d") is not None
+        assert cache.stats().evictions == 2
+
+
+class TestByteRanges:
+    """Test cases for Range header parsing."""
+
+    @pytest.mark.parametrize("header,expected", [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=5-", (5, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=90-200", (90, 99)),
+        ("bytes=-500", (0, 99)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ])
+    def test_parse(self, header, expected):
+        """Test resolving single ranges and ignoring unsupported forms."""
+        assert parse_byte_range(header, 100) == expected
+
+    @pytest.mark.parametrize("header", ["bytes=100-", "bytes=5-2", "bytes=-0"])
+    def test_unsatisfiable(self, header):
+        """Test ranges outside the content are rejected."""
+        with pytest.raises(RangeNotSatisfiable):
+            parse_byte_range(header, 100)
+
+
+class TestStorageService:
+    """Test cases for StorageService caching."""
+
+    @pytest.mark.asyncio
+    async def test_download_uses_cache(self):
+        """Test that a second download of a CID is served from cache."""
+        ipfs = MagicMock()
+        ipfs.get_content = AsyncMock(return_value=b"content")
+        service = StorageService(lighthouse_client=MagicMock(), ipfs_client=ipfs)
+
+        assert await service.download("QmTest") == b"content"
+        assert await service.download("QmTest") == b"content"
+
+        ipfs.get_content.assert_awaited_once_with("QmTest")
+        stats = service.cache_stats()["memory"]
+        assert (stats.hits, stats.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_cache_stays_within_budget(self):
+        """Test that downloads beyond the budget evict older content."""
+        ipfs = MagicMock()
+        ipfs.get_content = AsyncMock(side_effect=lambda cid: cid.encode() * 4)
+        service = StorageService(
+            lighthouse_client=MagicMock(), ipfs_client=ipfs, cache=ContentCache(max_bytes=64)
+        )
+
+        for i in range(10):
+            await service.download(f"Qm{i:04d}")
+
+        stats = service.cache_stats()["memory"]
+        assert stats.size_bytes <= 64
+        assert stats.evictions == 8
+
+    @pytest.mark.asyncio
+    async def test_download_falls_back_to_disk_and_promotes(self, tmp_path):
+        """Test that a memory miss is served from disk without hitting the gateway."""
+        ipfs = MagicMock()
+        ipfs.get_content = AsyncMock(return_value=b"content")
+        disk = DiskContentCache(str(tmp_path), max_bytes=1024)
+        first = StorageService(lighthouse_client=MagicMock(), ipfs_client=ipfs, disk_cache=disk)
+        await first.download("QmTest")
+
+        # A fresh process on the same host
+        second = StorageService(
+            lighthouse_client=MagicMock(),
+            ipfs_client=ipfs,
+            disk_cache=DiskContentCache(str(tmp_path), max_bytes=1024),
+        )
+
+        assert await second.download("QmTest") == b"content"
+        assert await second.download("QmTest") == b"content"
+        ipfs.get_content.assert_awaited_once()
+        stats = second.cache_stats()
+        assert stats["disk"].hits == 1
+        assert stats["memory"].hits == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_stream_skips_cache_but_upload_warms_it(self):
+        """Test streamed uploads aren't buffered into the cache, byte uploads are."""
+        lighthouse = MagicMock()
+        lighthouse.upload_stream = AsyncMock(side_effect=[{"Hash": "QmStream"}, {"Hash": "QmBytes"}])
+        ipfs = MagicMock()
+        ipfs.get_content_url = lambda cid: f"https://gw/{cid}"
+        service = StorageService(
+            lighthouse_client=lighthouse, ipfs_client=ipfs, content_index=self.sqlite_index()
+        )
+
+        streamed = await service.upload_stream(io.BytesIO(b"streamed"), "a.png", "image/png", size=8)
+        uploaded = await service.upload(b"bytes", "b.png", "image/png")
+
+        assert streamed == {
+            "cid": "QmStream", "url": "https://gw/QmStream",
+            "filename": "a.png", "size": 8, "content_type": "image/png", "deduplicated": False,
+        }
+        assert uploaded["size"] == 5
+        assert "QmStream" not in service.cache
+        assert service.cache.get("QmBytes") == b"bytes"
+
+    @staticmethod
+    def sqlite_index():
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from app.models.storage import StoredContent
+
+        # One shared in-memory database, used from worker threads
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        StoredContent.__table__.create(engine)
+        return ContentIndex(session_factory=sessionmaker(bind=engine))
+
+    @pytest.mark.asyncio
+    async def test_repeated_upload_is_deduplicated(self):
+        """Test identical content is sent to Lighthouse once and found by CID afterwards."""
+        content = b"hello world\n"
+        cid = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+        lighthouse = MagicMock()
+        lighthouse.upload_stream = AsyncMock(return_value={"Hash": cid})
+        ipfs = MagicMock()
+        ipfs.get_content_url = lambda cid: f"https://gw/{cid}"
+        service = StorageService(
+            lighthouse_client=lighthouse, ipfs_client=ipfs, content_index=self.sqlite_index()
+        )
+
+        first = await service.upload_stream(io.BytesIO(content), "a.txt")
+        second = await service.upload_stream(io.BytesIO(content), "b.txt")
+
+        assert first["cid"] == second["cid"] == cid
+        assert second["size"] == len(content)
+        assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+        lighthouse.upload_stream.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_mismatched_pin_is_indexed_under_local_cid(self):
+        """Test a CID Lighthouse computed differently is counted, returned and found by local CID."""
+        lighthouse = MagicMock()
+        lighthouse.upload_stream = AsyncMock(return_value={"Hash": "bafyOther"})
+        service = StorageService(
+            lighthouse_client=lighthouse, ipfs_client=MagicMock(), content_index=self.sqlite_index()
+        )
+        mismatches = UPLOAD_CID_MISMATCHES.get()
+
+        first = await service.upload_stream(io.BytesIO(b"data"), "a.txt")
+        second = await service.upload_stream(io.BytesIO(b"data"), "b.txt")
+
+        assert first["cid"] == second["cid"] == "bafyOther"
+        assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+        assert UPLOAD_CID_MISMATCHES.get() == mismatches + 1
+        lighthouse.upload_stream.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_download_verification_rejects_tampered_content(self, monkeypatch):
+        """Test content that doesn't hash to its CID is rejected and not cached."""
+        monkeypatch.setattr(settings, "storage_verify_downloads", True)
+        cid = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+        ipfs = MagicMock()
+        ipfs.get_content = AsyncMock(side_effect=[b"tampered\n", b"hello world\n"])
+        service = StorageService(lighthouse_client=MagicMock(), ipfs_client=ipfs)
+
+        with pytest.raises(ContentVerificationError):
+            await service.download(cid)
+        assert cid not in service.cache
+
+        assert await service.download(cid) == b"hello world\n"
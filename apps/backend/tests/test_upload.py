@@ -1,3 +1,6 @@
+import asyncio
+import hashlib
+
 import pytest
 from httpx import AsyncClient
 from fastapi import status
@@ -19,6 +22,7 @@ from httpx import AsyncClient
 from fastapi import status, FastAPI
 from unittest.mock import patch, MagicMock
 from app.routes.upload import router
+from app.services.cid import compute_cid
 
 @pytest.fixture
 async def client():
@@ -39,13 +43,16 @@ async def test_upload_file_success(client):
         "url": "https://gateway.lighthouse.storage/ipfs/QmTestHash123",
         "filename": "test_image.png",
         "size": 1234,
-        "content_type": "image/png"
+        "content_type": "image/png",
+        "deduplicated": False,
     }
 
-    # Mock the storage_service.upload method
-    with patch("app.routes.upload.storage_service.upload", new_callable=MagicMock) as mock_upload:
+    # Mock the storage_service.upload_stream method
+    with patch("app.routes.upload.storage_service.upload_stream", new_callable=MagicMock) as mock_upload:
         # Configure the mock to be awaitable
-        async def async_return(*args, **kwargs):
+        received = []
+        async def async_return(fileobj, **kwargs):
+            received.append(fileobj.read())
             return mock_result
         mock_upload.side_effect = async_return
 
@@ -57,6 +64,13 @@ async def test_upload_file_success(client):
         assert "QmTestHash123" in data["cid"]
         assert "gateway.lighthouse.storage" in data["url"]
         assert data["filename"] == "test_image.png"
+        assert data["sha256"] == hashlib.sha256(b"fake image content").hexdigest()
+        assert data["deduplicated"] is False
+
+        # The spooled upload is handed over rewound, with its size counted while hashing
+        assert received == [b"fake image content"]
+        assert mock_upload.call_args.kwargs["size"] == len(b"fake image content")
+        assert mock_upload.call_args.kwargs["cid"] == compute_cid(b"fake image content")
 
 @pytest.mark.asyncio
 async def test_upload_invalid_file_type(client):
@@ -82,7 +96,7 @@ async def test_upload_file_too_large(client):
 @pytest.mark.asyncio
 async def test_storage_service_error(client):
     """Test handling of StorageService errors."""
-    with patch("app.routes.upload.storage_service.upload", new_callable=MagicMock) as mock_upload:
+    with patch("app.routes.upload.storage_service.upload_stream", new_callable=MagicMock) as mock_upload:
         async def async_raise(*args, **kwargs):
             raise RuntimeError("Storage configuration missing")
         mock_upload.side_effect = async_raise
@@ -92,3 +106,175 @@ async def test_storage_service_error(client):
 
         assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
         assert "Storage configuration missing" in response.json()["detail"]
+
+
+DOC_CID = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+MISSING_CID = "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2devei4"
+
+
+def gateway_service(content=b"%PDF-1.7 " + b"x" * 200_000, requests=None):
+    """StorageService backed by a fake gateway that honours Range headers."""
+    import httpx
+    from app.services.content_cache import ContentCache
+    from app.services.ipfs_client import IPFSClient
+    from app.services.storage_service import StorageService
+
+    def handler(request):
+        if requests is not None:
+            requests.append(request)
+        if not request.url.path.endswith(f"/{DOC_CID}"):
+            return httpx.Response(404)
+        range_header = request.headers.get("Range")
+        if range_header:
+            start, end = (int(x) for x in range_header.removeprefix("bytes=").split("-"))
+            body = content[start:end + 1]
+            return httpx.Response(206, stream=httpx.ByteStream(body), headers={
+                "Content-Type": "application/pdf",
+                "Content-Length": str(len(body)),
+                "Content-Range": f"bytes {start}-{end}/{len(content)}",
+            })
+        return httpx.Response(200, stream=httpx.ByteStream(content), headers={
+            "Content-Type": "application/pdf", "Content-Length": str(len(content)),
+        })
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return StorageService(
+        lighthouse_client=MagicMock(),
+        ipfs_client=IPFSClient(gateway_url="https://gw.example/ipfs/", http_client=http),
+        cache=ContentCache(max_bytes=1024 * 1024),
+    )
+
+
+@pytest.mark.asyncio
+async def test_download_streams_and_fills_cache(client):
+    """Test streaming a file from the gateway, then from cache."""
+    requests = []
+    service = gateway_service(requests=requests)
+
+    with patch("app.routes.upload.storage_service", service):
+        first = await client.get(f"/api/v1/upload/{DOC_CID}")
+        second = await client.get(f"/api/v1/upload/{DOC_CID}")
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["content-type"] == "application/pdf"
+    assert first.content.startswith(b"%PDF-1.7")
+    assert len(first.content) == 200_009
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/pdf"
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_download_range_from_gateway_and_cache(client):
+    """Test Range requests are forwarded on a miss and sliced locally on a hit."""
+    requests = []
+    service = gateway_service(requests=requests)
+
+    with patch("app.routes.upload.storage_service", service):
+        partial = await client.get(f"/api/v1/upload/{DOC_CID}", headers={"Range": "bytes=0-4"})
+        # A partial response isn't cached, so the full fetch still goes to the gateway
+        await client.get(f"/api/v1/upload/{DOC_CID}")
+        cached = await client.get(f"/api/v1/upload/{DOC_CID}", headers={"Range": "bytes=-3"})
+
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert partial.content == b"%PDF-"
+    assert partial.headers["content-range"] == "bytes 0-4/200009"
+    assert requests[0].headers["Range"] == "bytes=0-4"
+    assert len(requests) == 2
+    assert cached.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert cached.content == b"xxx"
+    assert cached.headers["content-range"] == "bytes 200006-200008/200009"
+
+
+@pytest.mark.asyncio
+async def test_download_errors(client):
+    """Test missing content and unsatisfiable ranges."""
+    service = gateway_service(content=b"%PDF-1.7")
+
+    with patch("app.routes.upload.storage_service", service):
+        missing = await client.get(f"/api/v1/upload/{MISSING_CID}")
+        await client.get(f"/api/v1/upload/{DOC_CID}")
+        out_of_range = await client.get(f"/api/v1/upload/{DOC_CID}", headers={"Range": "bytes=100-"})
+
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert out_of_range.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert out_of_range.headers["content-range"] == "bytes */8"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", [
+    "%2e%2e",
+    "%2e%2e%2f%2e%2e%2fanything",
+    "..%5C..%5Canything",
+    "not-a-cid",
+    "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5",
+    f"ipfs:{DOC_CID}",
+])
+async def test_download_rejects_anything_but_a_cid(client, path):
+    """Test non-CID paths never reach the cache or the gateway."""
+    requests = []
+    service = gateway_service(requests=requests)
+    service.cache.get = MagicMock(side_effect=AssertionError("cache consulted"))
+
+    with patch("app.routes.upload.storage_service", service):
+        response = await client.get(f"/api/v1/upload/{path}")
+
+    assert response.status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_404_NOT_FOUND)
+    assert requests == []
+
+
+@pytest.mark.asyncio
+async def test_upload_batch(client):
+    """Test a batch uploads each distinct file once and reports per-file results."""
+    calls = []
+
+    async def fake_upload(fileobj, filename, content_type, size, cid):
+        calls.append(filename)
+        await asyncio.sleep(0)
+        if filename == "broken.png":
+            raise RuntimeError("Lighthouse unavailable")
+        return {
+            "cid": cid, "url": f"https://gw/{cid}", "filename": filename,
+            "size": size, "content_type": content_type, "deduplicated": False,
+        }
+
+    files = [
+        ("files", ("a.png", b"first image", "image/png")),
+        ("files", ("b.pdf", b"%PDF-1.7 doc", "application/pdf")),
+        ("files", ("a-copy.png", b"first image", "image/png")),
+    ]
+    with patch("app.routes.upload.storage_service.upload_stream", side_effect=fake_upload):
+        response = await client.post("/api/v1/upload/batch", files=files)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert (data["uploaded"], data["failed"]) == (3, 0)
+    assert [r["filename"] for r in data["results"]] == ["a.png", "b.pdf", "a-copy.png"]
+    assert data["results"][0]["cid"] == data["results"][2]["cid"] == f"ipfs://{compute_cid(b'first image')}"
+    assert sorted(calls) == ["a.png", "b.pdf"]
+
+    files.append(("files", ("broken.png", b"other image", "image/png")))
+    with patch("app.routes.upload.storage_service.upload_stream", side_effect=fake_upload):
+        response = await client.post("/api/v1/upload/batch", files=files)
+
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    data = response.json()
+    assert (data["uploaded"], data["failed"]) == (3, 1)
+    assert data["results"][3] == {
+        "filename": "broken.png", "status": "failed", "error": "Lighthouse unavailable",
+    }
+
+
+@pytest.mark.asyncio
+async def test_upload_batch_validates_everything_first(client):
+    """Test one invalid file rejects the batch before anything is uploaded."""
+    files = [
+        ("files", ("ok.png", b"image", "image/png")),
+        ("files", ("bad.exe", b"binary", "application/x-msdownload")),
+    ]
+    with patch("app.routes.upload.storage_service.upload_stream") as mock_upload:
+        response = await client.post("/api/v1/upload/batch", files=files)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"].startswith("bad.exe: Invalid file type")
+    mock_upload.assert_not_called()